@@ -0,0 +1,138 @@
+# allocation.py
+"""
+Worker and input allocation for ResourceManager.stepResources.
+
+Structures are aggregated into one TypeDemand per structure type when they
+are added or removed, so a production tick only walks the types:
+
+    allocator = ManpowerAllocator()
+    fractions, consumed, produced = allocator.solve(demands, manpower, stock, graph.stages)
+
+Manpower is handed out greedily in descending scheduling_priority; types that
+share a priority split whatever is left proportionally, so no structure
+starves another just by being built first. Inputs are then resolved stage by
+stage in production-chain order (see resource_flow.py), with the same
+proportional split inside a stage.
+"""
+
+
+class TypeDemand:
+    def __init__(self, structure_type, priority, manpower_required, production_rates, consumption_rates):
+        self.type = structure_type
+        self.priority = priority
+        self.manpower_required = manpower_required
+        self.production_rates = production_rates
+        self.consumption_rates = consumption_rates
+        self.count = 0
+        self.capacity = 0.0  # sum of run_fraction over enabled structures
+        self.output = 0.0  # the same weighted by efficiency_modifiers (terrain yield); scales production
+
+    @classmethod
+    def from_structure(cls, structure):
+        return cls(structure.type, structure.scheduling_priority, structure.manpower_required,
+                   structure.production_rates, structure.consumption_rates)
+
+    def add(self, structure):
+        self.count += 1
+        if structure.enabled:
+            self.capacity += structure.run_fraction
+            self.output += structure.run_fraction * structure.efficiency_modifiers
+
+    def add_many(self, structures):
+        self.count += len(structures)
+        self.capacity += sum(s.run_fraction for s in structures if s.enabled)
+        self.output += sum(s.run_fraction * s.efficiency_modifiers for s in structures if s.enabled)
+
+    def remove(self, structure):
+        self.count -= 1
+        if structure.enabled:
+            self.capacity -= structure.run_fraction
+            self.output -= structure.run_fraction * structure.efficiency_modifiers
+        if self.count == 0:
+            self.capacity = 0.0  # drop accumulated float error
+            self.output = 0.0
+
+
+class ManpowerAllocator:
+    def __init__(self):
+        self.run_fractions = {}  # structure type -> fraction of capacity run last tick
+
+    @staticmethod
+    def priority_groups(demands):
+        """Group demands by priority, highest first, types sorted within a group"""
+        groups = {}
+        for demand in demands:
+            if demand.capacity > 0:
+                groups.setdefault(demand.priority, []).append(demand)
+        return [sorted(groups[p], key=lambda d: d.type) for p in sorted(groups, reverse=True)]
+
+    def solve(self, demands, manpower, stock, stages=None, record=True, limits=None, scales=None):
+        """Allocate manpower and input resources to structure types
+        Args:
+            demands (dict): Structure type -> TypeDemand
+            manpower (float): Workers available this tick
+            stock (dict): Resource name -> amount available
+            stages (list): Lists of structure types in production-chain order,
+                e.g. ResourceFlowGraph.stages. Defaults to the priority groups.
+            record (bool): Keep the fractions in run_fractions (False for what-if calls)
+            limits (dict): Optional structure type -> highest fraction it may run at,
+                e.g. the powered share from PowerGrid.limits; the rest gets no workers
+            scales (dict): Optional structure type -> output multiplier, e.g. dust
+                on solar panels from Weather.solar_factor
+        Returns:
+            tuple: (run fractions by type, total consumption, total production)
+        """
+        # Pass 1: manpower, greedily by priority
+        manpower_fractions = {}
+        remaining_manpower = manpower
+        limits = limits or {}
+        scales = scales or {}
+        for group in self.priority_groups(demands.values()):
+            needed = sum(d.capacity * limits.get(d.type, 1.0) * d.manpower_required for d in group)
+            fraction = 1.0 if needed <= 0 else min(1.0, remaining_manpower / needed)
+            remaining_manpower -= needed * fraction
+            for d in group:
+                manpower_fractions[d.type] = fraction * limits.get(d.type, 1.0)
+
+        if stages is None:
+            stages = [[d.type for d in group] for group in self.priority_groups(demands.values())]
+
+        # Pass 2: inputs, stage by stage so producers run before consumers
+        available = dict(stock)
+        fractions = {}
+        consumed = {}
+        produced = {}
+        for stage in stages:
+            group = [demands[t] for t in stage if t in manpower_fractions]
+
+            # Each input is split proportionally across the stage
+            input_fraction = {}
+            for d in group:
+                for resource, rate in d.consumption_rates.items():
+                    input_fraction[resource] = input_fraction.get(resource, 0) + d.capacity * manpower_fractions[d.type] * rate
+            for resource, need in input_fraction.items():
+                have = max(0, available.get(resource, 0))
+                input_fraction[resource] = 1.0 if need <= 0 else min(1.0, have / need)
+
+            stage_produced = {}
+            for d in group:
+                scale = scales.get(d.type, 1.0)
+                fraction = manpower_fractions[d.type]
+                for resource in d.consumption_rates:
+                    fraction = min(fraction, input_fraction[resource])
+                fractions[d.type] = fraction
+                run = d.capacity * fraction
+                for resource, rate in d.consumption_rates.items():
+                    available[resource] = available.get(resource, 0) - run * rate
+                    consumed[resource] = consumed.get(resource, 0) + run * rate
+                for resource, rate in d.production_rates.items():
+                    stage_produced[resource] = stage_produced.get(resource, 0) + d.output * scale * fraction * rate
+
+            # Output becomes available to later stages
+            for resource, amount in stage_produced.items():
+                available[resource] = available.get(resource, 0) + amount
+                produced[resource] = produced.get(resource, 0) + amount
+
+        if record:
+            self.run_fractions = fractions
+        return fractions, consumed, produced
@@ -0,0 +1,185 @@
+# assets.py
+"""
+Background image loading with a disk cache of pre-scaled pixels.
+
+Images are decoded and scaled on a thread pool so the menu can draw on the
+first frame. The main thread calls poll() once per frame to turn finished
+pixel buffers into display surfaces (convert() has to run there) and hand
+them to their callbacks:
+
+    assets = AssetManager(cache_dir=".asset_cache")
+    assets.request("bg", "mars_bg.png", size=(1600, 767), alpha=False,
+                   callback=lambda surface: setattr(game, "bg_image", surface))
+    ...
+    assets.poll()          # every frame
+    assets.get("bg")       # None until it has loaded
+
+Each scaled result is also written to cache_dir, named by a hash of the
+source file's bytes plus the target size. A later launch that asks for the
+same file at the same size reads the raw pixels back and skips both the
+PNG decode and the rescale. Editing the source changes its hash, so stale
+entries are simply never read again.
+
+Cache file layout:
+    header '<4sIIB'  magic, width, height, has alpha
+    pixels           width * height * (4 if alpha else 3) bytes
+"""
+
+import hashlib
+import os
+import queue
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+CACHE_MAGIC = b"MIMG"
+CACHE_HEADER = struct.Struct("<4sIIB")
+
+# pygame 2.3 renamed tostring/fromstring; support both
+_to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+_from_bytes = getattr(pygame.image, "frombytes", None) or pygame.image.fromstring
+
+
+def cache_key(data, size, alpha):
+    """Cache file name for source bytes scaled to size"""
+    digest = hashlib.sha1(data).hexdigest()
+    if size is None:
+        return f"{digest}-native-{'a' if alpha else 'o'}.img"
+    return f"{digest}-{size[0]}x{size[1]}-{'a' if alpha else 'o'}.img"
+
+
+def read_cached(path):
+    """Return (size, alpha, pixels) from a cache file, or None if unusable"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, width, height, alpha = CACHE_HEADER.unpack_from(data)
+    pixels = data[CACHE_HEADER.size:]
+    if magic != CACHE_MAGIC or len(pixels) != width * height * (4 if alpha else 3):
+        return None
+    return (width, height), bool(alpha), pixels
+
+
+def write_cached(path, size, alpha, pixels):
+    # Write then rename, so a crash never leaves a half-written entry behind
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, size[0], size[1], 1 if alpha else 0))
+            f.write(pixels)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+class AssetManager:
+    def __init__(self, cache_dir=".asset_cache", workers=4):
+        self.cache_dir = cache_dir
+        self.surfaces = {}  # key -> converted surface
+        self.failed = {}  # key -> error message
+        self.pending = {}  # key -> callback, until poll() delivers it
+        self.done = queue.Queue()  # (key, size, alpha, pixels or None, error) from workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.stats = {"cache_hits": 0, "decoded": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def request(self, key, path, size=None, alpha=True, callback=None):
+        """Start loading path in the background
+        Args:
+            key: Name to store the surface under
+            path (str): Image file
+            size (tuple): Optional (w, h) to smoothscale to
+            alpha (bool): Keep per-pixel alpha
+            callback: Called with the surface on the main thread once loaded
+        Returns:
+            bool: False if the key is already loaded or loading
+        """
+        if key in self.surfaces or key in self.pending:
+            return False
+        self.pending[key] = callback
+        self.executor.submit(self._load, key, path, size, alpha)
+        return True
+
+    def _load(self, key, path, size, alpha):
+        """Worker: produce raw pixels, from the cache when possible"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            cached_path = None
+            if self.cache_dir:
+                cached_path = os.path.join(self.cache_dir, cache_key(data, size, alpha))
+                cached = read_cached(cached_path)
+                if cached is not None:
+                    self.stats["cache_hits"] += 1
+                    self.done.put((key, *cached, None))
+                    return
+
+            # Decoding and scaling need no display, so they are safe off the main thread
+            surface = pygame.image.load(path)
+            if size is not None:
+                surface = pygame.transform.smoothscale(surface, size)
+            mode = "RGBA" if alpha else "RGB"
+            pixels = _to_bytes(surface, mode)
+            self.stats["decoded"] += 1
+            if cached_path is not None:
+                write_cached(cached_path, surface.get_size(), alpha, pixels)
+            self.done.put((key, surface.get_size(), alpha, pixels, None))
+        except Exception as e:
+            self.done.put((key, None, alpha, None, str(e)))
+
+    def poll(self, limit=None):
+        """Finish loaded assets on the main thread
+        Args:
+            limit (int): Most assets to convert this call (None for all ready)
+        Returns:
+            int: Number of assets delivered
+        """
+        delivered = 0
+        while limit is None or delivered < limit:
+            try:
+                item = self.done.get_nowait()
+            except queue.Empty:
+                break
+            delivered += self._deliver(*item)
+        return delivered
+
+    def _deliver(self, key, size, alpha, pixels, error):
+        callback = self.pending.pop(key, None)
+        if error is not None:
+            self.failed[key] = error
+            print(f"[assets] failed to load {key}: {error}")
+            return 0
+        surface = _from_bytes(pixels, size, "RGBA" if alpha else "RGB")
+        surface = surface.convert_alpha() if alpha else surface.convert()
+        self.surfaces[key] = surface
+        if callback is not None:
+            callback(surface)
+        return 1
+
+    def get(self, key, default=None):
+        return self.surfaces.get(key, default)
+
+    def loading(self):
+        return bool(self.pending)
+
+    def wait(self, timeout=None):
+        """Block until every requested asset is delivered (for tools and tests)"""
+        while self.pending:
+            try:
+                item = self.done.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            self._deliver(*item)
+        return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,286 @@
+# blueprints.py
+"""
+Area and blueprint building.
+
+Filling a rectangle, stamping a saved layout or clearing a region is one
+operation: the total cost is checked once, every structure goes into the
+ResourceManager in one add_structures call (one aggregate update per type),
+and the whole operation travels over the network as a single line:
+
+    ok, message = fill_rect(resource_manager, Hydroponic, 0, 0, 9, 9)
+    ok, message = clear_rect(resource_manager, 0, 0, 9, 9)
+
+    layout = Blueprint.from_structures(resource_manager.structureList, 0, 0, 9, 9)
+    layout.save("blueprints/farm.bp")
+    ok, message = stamp(resource_manager, Blueprint.load("blueprints/farm.bp"), 20, 5)
+
+    network_client.send(area_message("H", 0, 0, 9, 9))     # "/area H 0 0 9 9"
+    network_client.send(stamp_message(layout, 20, 5))      # "/stamp 20 5 eJx..."
+    network_client.send(clear_message(0, 0, 9, 9))         # "/clear 0 0 9 9"
+    network_client.send(unstamp_message(layout, 20, 5))    # "/unstamp 20 5 eJx...": remove those cells
+
+A blueprint encodes as one zlib-compressed run per structure type, either
+a bitmap over the type's bounding box (dense layouts) or a list of offsets
+(sparse ones), in URL-safe base64. A solid 100x100 farm is under a hundred
+characters on the wire.
+"""
+
+import base64
+import struct
+import zlib
+
+from structure import STRUCTURE_TYPES
+
+RUN_HEADER = struct.Struct("<cBiiII")  # type, encoding, left, top, then count, 0 or width, height
+POINTS = 0  # sparse runs: (dx, dy) int32 pairs from (left, top)
+BITMAP = 1  # dense runs: one bit per cell of the width x height bounding box
+MAX_AREA = 1_000_000  # cells per operation, so one message cannot stall every client
+
+
+def rect_cells(x0, y0, x1, y1):
+    """Every (x, y) in the rectangle with corners (x0, y0) and (x1, y1), inclusive"""
+    if x0 > x1:
+        x0, x1 = x1, x0
+    if y0 > y1:
+        y0, y1 = y1, y0
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+
+class Blueprint:
+    def __init__(self, cells):
+        self.cells = list(cells)  # (dx, dy, structure type)
+
+    @classmethod
+    def from_structures(cls, structures, x0, y0, x1, y1):
+        """Copy the structures inside a rectangle, relative to its top-left corner"""
+        left, top = min(x0, x1), min(y0, y1)
+        right, bottom = max(x0, x1), max(y0, y1)
+        return cls((s.location[0] - left, s.location[1] - top, s.type) for s in structures
+                   if left <= s.location[0] <= right and top <= s.location[1] <= bottom)
+
+    @classmethod
+    def from_placed(cls, placed, x0, y0, x1, y1):
+        """Same as from_structures, from a {(x, y): type} grid such as the client's;
+        a world.ChunkedWorld only reads the chunks under the rectangle
+        """
+        left, top = min(x0, x1), min(y0, y1)
+        if hasattr(placed, "region"):
+            return cls((x - left, y - top, t) for (x, y), t in placed.region(x0, y0, x1, y1))
+        return cls((x - left, y - top, t) for (x, y), t in placed.items()
+                   if left <= x <= max(x0, x1) and top <= y <= max(y0, y1))
+
+    def placements(self, x, y):
+        """(structure class, location) for every cell with the blueprint's corner at (x, y)"""
+        return [(STRUCTURE_TYPES[t], (x + dx, y + dy)) for dx, dy, t in self.cells]
+
+    def encode(self):
+        by_type = {}
+        for dx, dy, t in self.cells:
+            by_type.setdefault(t, []).append((dx, dy))
+        runs = []
+        for t, cells in sorted(by_type.items()):
+            left = min(x for x, _ in cells)
+            top = min(y for _, y in cells)
+            w = max(x for x, _ in cells) - left + 1
+            h = max(y for _, y in cells) - top + 1
+            if (w * h + 7) // 8 < len(cells) * 8:
+                # Dense: one bit per cell of the bounding box
+                bits = bytearray((w * h + 7) // 8)
+                for x, y in cells:
+                    i = (y - top) * w + (x - left)
+                    bits[i >> 3] |= 1 << (i & 7)
+                runs.append(RUN_HEADER.pack(t.encode("ascii"), BITMAP, left, top, w, h) + bytes(bits))
+            else:
+                coords = [v for x, y in cells for v in (x - left, y - top)]
+                runs.append(RUN_HEADER.pack(t.encode("ascii"), POINTS, left, top, len(cells), 0)
+                            + struct.pack("<%di" % len(coords), *coords))
+        return base64.urlsafe_b64encode(zlib.compress(b"".join(runs), 9)).decode("ascii")
+
+    @classmethod
+    def decode(cls, text):
+        """Inverse of encode
+        Raises:
+            ValueError: If text is not a valid blueprint
+        """
+        try:
+            inflate = zlib.decompressobj()
+            # Bounded, so a hostile line cannot expand into gigabytes
+            raw = inflate.decompress(base64.urlsafe_b64decode(text.encode("ascii")), MAX_AREA * 8 + 4096)
+        except (ValueError, zlib.error) as e:
+            raise ValueError(f"Not a blueprint: {e}") from None
+        if inflate.unconsumed_tail:
+            raise ValueError("Not a blueprint: too large")
+        cells = []
+        offset = 0
+        while offset < len(raw):
+            if offset + RUN_HEADER.size > len(raw):
+                raise ValueError("Not a blueprint: truncated")
+            t, mode, left, top, a, b = RUN_HEADER.unpack_from(raw, offset)
+            t = t.decode("ascii")
+            offset += RUN_HEADER.size
+            size = a * 8 if mode == POINTS else (a * b + 7) // 8
+            if t not in STRUCTURE_TYPES or mode not in (POINTS, BITMAP) or offset + size > len(raw):
+                raise ValueError("Not a blueprint: bad run")
+            if mode == POINTS:
+                coords = struct.unpack_from("<%di" % (a * 2), raw, offset)
+                cells.extend((left + coords[i], top + coords[i + 1], t) for i in range(0, len(coords), 2))
+            else:
+                for byte_index, byte in enumerate(raw[offset:offset + size]):
+                    if byte:
+                        for bit in range(8):
+                            if byte >> bit & 1:
+                                i = byte_index * 8 + bit
+                                cells.append((left + i % a, top + i // a, t))
+            offset += size
+            if len(cells) > MAX_AREA:
+                raise ValueError("Not a blueprint: too many cells")
+        return cls(cells)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.encode() + "\n")
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.decode(f.read().strip())
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def build_many(resource_manager, placements, cost_materials=10, charge=True):
+    """Build every placement on a free cell as one batch
+    Args:
+        resource_manager: ResourceManager to build into
+        placements (list): (structure class, (x, y)) pairs
+        cost_materials: Materials per structure
+        charge (bool): False to skip the cost, e.g. for a broadcast from the server
+    Returns:
+        tuple: (bool, message)
+    """
+    if len(placements) > MAX_AREA:
+        return False, f"Too many cells ({len(placements)} > {MAX_AREA})"
+    occupied = {tuple(s.location) for s in resource_manager.structureList}
+    free = []
+    for structure_class, location in placements:
+        if location not in occupied:
+            occupied.add(location)
+            free.append((structure_class, location))
+    if not free:
+        return False, "Nothing to build"
+    if not charge:
+        resource_manager.add_structures(structure_class(location) for structure_class, location in free)
+        return True, f"Placed {len(free)} structures"
+    built = resource_manager.build_structures(free, cost_materials)
+    if not built:
+        return False, f"Not enough materials: {len(free) * cost_materials} needed"
+    return True, f"Built {len(built)} structures"
+
+
+def fill_rect(resource_manager, structure_class, x0, y0, x1, y1, cost_materials=10, charge=True):
+    cells = rect_cells(x0, y0, x1, y1)
+    return build_many(resource_manager, [(structure_class, cell) for cell in cells], cost_materials, charge)
+
+
+def stamp(resource_manager, blueprint, x, y, cost_materials=10, charge=True):
+    return build_many(resource_manager, blueprint.placements(x, y), cost_materials, charge)
+
+
+def unstamp(resource_manager, blueprint, x, y):
+    """Remove whatever stands on the cells of blueprint placed at (x, y)
+    Returns:
+        tuple: (bool, message)
+    """
+    removed = resource_manager.remove_structures([location for _, location in blueprint.placements(x, y)])
+    if not removed:
+        return False, "Nothing to remove"
+    return True, f"Removed {len(removed)} structures"
+
+
+def clear_rect(resource_manager, x0, y0, x1, y1):
+    """Remove every structure in the rectangle in one pass
+    Returns:
+        tuple: (bool, message)
+    """
+    removed = resource_manager.remove_structures(rect_cells(x0, y0, x1, y1))
+    if not removed:
+        return False, "Nothing to remove"
+    return True, f"Removed {len(removed)} structures"
+
+
+def area_message(structure_type, x0, y0, x1, y1):
+    return f"/area {structure_type} {x0} {y0} {x1} {y1}"
+
+
+def stamp_message(blueprint, x, y):
+    return f"/stamp {x} {y} {blueprint.encode()}"
+
+
+def clear_message(x0, y0, x1, y1):
+    return f"/clear {x0} {y0} {x1} {y1}"
+
+
+def unstamp_message(blueprint, x, y):
+    return f"/unstamp {x} {y} {blueprint.encode()}"
+
+
+def parse_message(text):
+    """Parse an /area, /stamp, /clear or /unstamp line
+    Returns:
+        tuple: (op, args) with op in 'area', 'stamp', 'clear', 'unstamp', or
+        None if the line is not a valid batch command
+    """
+    parts = text.split()
+    try:
+        match parts:
+            case ["/area", structure_type, x0, y0, x1, y1] if structure_type in STRUCTURE_TYPES:
+                x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+                if (abs(x1 - x0) + 1) * (abs(y1 - y0) + 1) > MAX_AREA:
+                    return None
+                return "area", (STRUCTURE_TYPES[structure_type], x0, y0, x1, y1)
+            case ["/stamp", x, y, code]:
+                return "stamp", (Blueprint.decode(code), int(x), int(y))
+            case ["/unstamp", x, y, code]:
+                return "unstamp", (Blueprint.decode(code), int(x), int(y))
+            case ["/clear", x0, y0, x1, y1]:
+                x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+                if (abs(x1 - x0) + 1) * (abs(y1 - y0) + 1) > MAX_AREA:
+                    return None
+                return "clear", (x0, y0, x1, y1)
+    except ValueError:
+        return None
+    return None
+
+
+def batch_cells(op, args):
+    """(structure type or None, (x, y)) for every cell a batch command touches"""
+    match op:
+        case "area":
+            structure_class, *corners = args
+            return [(structure_class.type, cell) for cell in rect_cells(*corners)]
+        case "stamp":
+            blueprint, x, y = args
+            return [(structure_class.type, location) for structure_class, location in blueprint.placements(x, y)]
+        case "clear":
+            return [(None, cell) for cell in rect_cells(*args)]
+        case "unstamp":
+            blueprint, x, y = args
+            return [(None, location) for _, location in blueprint.placements(x, y)]
+    return []
+
+
+def apply_batch(resource_manager, op, args, charge=False):
+    """Apply a parsed batch command; charge=False (the default) is for
+    commands received from the server, which are free like /place
+    """
+    match op:
+        case "area":
+            return fill_rect(resource_manager, *args, charge=charge)
+        case "stamp":
+            return stamp(resource_manager, *args, charge=charge)
+        case "clear":
+            return clear_rect(resource_manager, *args)
+        case "unstamp":
+            return unstamp(resource_manager, *args)
+    return False, f"Unknown batch command {op}"
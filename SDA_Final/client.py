@@ -1,92 +1,33 @@
+import argparse
 import pygame
-import threading
-import socket
 import time
 import os
+from network import NetworkClient
+from assets import AssetManager
 from resource_manager import ResourceManager
-from structure import Structure, Dome, Mine, Hydroponic, SolarPanel, WaterHarvester
+from structure import STRUCTURE_TYPES
 from trading import Trading
-from random_event import RandomEvent
 from event_manager import EventManager
+from supply import SupplySchedule
+from savegame import RESOURCE_FIELDS, save_colony, load_colony
+from journal import Journal
+from profiler import TickProfiler
+from sim_runner import SimulationRunner, take_snapshot
+from timeseries import TimeSeriesRecorder
+from sparklines import SparklinePanel
+from spectator import FrameHub, SpectatorClient, SpectatorFeed
+from lockstep import LockstepSession
+from world import CHUNK_SIZE, ChunkedWorld
+from terrain import load_terrain
+from power_grid import PowerGrid
+from weather import load_weather
+from logistics import SOURCES, Logistics
+from undo import PLACE, REMOVE, UndoHistory, forward_message, inverse_message
+from blueprints import Blueprint, apply_batch, area_message, batch_cells, clear_message, parse_message, stamp_message
 
 # Remove the duplicate Structure class definitions that are now in separate files
 # Only keep classes that are not in the diagram
 
-class NetworkClient:
-    def __init__(self):
-        self.socket = None
-        self.thread = None
-        self.connected = False
-        self.messages = []  
-        self.lock = threading.Lock()
-        self.stop_flag = False
-
-    def connect(self, host, port=5000, username="Player"):
-        self.disconnect()
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(4.0)
-            s.connect((host, port))
-            s.settimeout(1.0)
-            s.sendall((username.strip() + "\n").encode("utf-8"))
-            self.socket = s
-            self.connected = True
-            self.stop_flag = False
-            self.thread = threading.Thread(target=self._recv_loop, daemon=True)
-            self.thread.start()
-            return True, None
-        except Exception as e:
-            self.disconnect()
-            return False, str(e)
-
-    def _recv_loop(self):
-        buf = b""
-        try:
-            while not self.stop_flag and self.socket:
-                try:
-                    data = self.socket.recv(4096)
-                    if not data:
-                        break
-                    buf += data
-                    while b"\n" in buf:
-                        line, buf = buf.split(b"\n", 1)
-                        txt = line.decode("utf-8", errors="replace").strip()
-                        if txt:
-                            with self.lock:
-                                self.messages.insert(0, (txt, time.time()))
-                except socket.timeout:
-                    continue
-                except Exception:
-                    break
-        finally:
-            self.disconnect()
-
-    def send(self, text):
-        if not self.socket:
-            return False
-        try:
-            self.socket.sendall((text.strip() + "\n").encode("utf-8"))
-            return True
-        except Exception:
-            self.disconnect()
-            return False
-
-    def get_messages(self):
-        with self.lock:
-            msgs = list(self.messages)
-            self.messages.clear()
-            return msgs
-
-    def disconnect(self):
-        self.stop_flag = True
-        self.connected = False
-        try:
-            if self.socket:
-                self.socket.close()
-        except Exception:
-            pass
-        self.socket = None
-
 class TextInput:
     def __init__(self, rect, font, initial=""):
         self.rect = pygame.Rect(rect)
@@ -176,6 +117,8 @@ class PlayerUI:
         self.back_to_menu = Button((528, 12, 120, 36), self.small, "Menu")
         self.boo_btn = Button((12, 104, 120, 40), self.small, "Boo")
         self.structure_btn = Button((140, 104, 120, 40), self.small, "Structure")
+        self.supply_btn = Button((396, 104, 120, 40), self.small, "Supply Run")
+        self.spectate_btn = Button((284, 56, 100, 36), self.small, "Spectate")
         
         self.build_btns = {
             'D': Button((12, 140, 40, 28), self.small, 'D'),
@@ -183,13 +126,11 @@ class PlayerUI:
             'H': Button((104, 140, 40, 28), self.small, 'H'),
             'M': Button((150, 140, 40, 28), self.small, 'M'),
             'W': Button((196, 140, 40, 28), self.small, 'W'),
-            'R': Button((242, 140, 40, 28), self.small, 'R'),
+            'F': Button((242, 140, 40, 28), self.small, 'F'),
+            'R': Button((288, 140, 40, 28), self.small, 'R'),
+            'T': Button((334, 140, 40, 28), self.small, 'T'),
         }
 
-class SpectatorClient:
-    def __init__(self):
-        self.spectator_mode = False
-
 class Production:
     def __init__(self):
         self.efficiency = 1.0
@@ -198,23 +139,212 @@ class Production:
         # Placeholder for resource addition logic
         pass
 
+def build_rocket_frames(frame_count, descending):
+    """Precompute rocket animation frames as (altitude, flame) tuples
+    Args:
+        frame_count (int): Number of frames in the animation
+        descending (bool): True for landing, False for launch
+    Returns:
+        list: One (altitude in pixels, flame length in pixels) per frame
+    """
+    frames = []
+    for i in range(frame_count):
+        t = i / max(1, frame_count - 1)
+        if descending:
+            # Ease out: fast approach, slow touchdown
+            altitude = int(400 * (1 - t) ** 2)
+            flame = int(6 + 14 * (1 - t))
+        else:
+            # Ease in: slow lift-off, fast climb
+            altitude = int(400 * t * t)
+            flame = int(20 - 6 * t)
+        frames.append((altitude, flame))
+    return frames
+
 class Launchpad:
-    def __init__(self):
+    ANIMATION_FPS = 60
+    LANDING_FRAMES = build_rocket_frames(90, descending=True)
+    LAUNCH_FRAMES = build_rocket_frames(90, descending=False)
+
+    def __init__(self, resource_manager, trading=None, schedule=None, ground_time=15):
+        self.resource_manager = resource_manager
+        self.trading = trading
+        self.schedule = schedule or SupplySchedule()
+        self.ground_time = ground_time  # seconds a landed rocket stays on the pad
         self.rocket_present = False
-        
-    def receive_supply(self):
-        pass
-        
-    def play_launch_animation(self):
-        pass
-        
-    def play_landing_animation(self):
-        pass
+        self.landed_at = 0
+        self.frames = None
+        self.animation_start = 0
+
+    def request_supply(self, cargo, now=None):
+        """Schedule a supply run to this launchpad, paid from the colony's ledger"""
+        return self.schedule.schedule(cargo, now, ledger=self.resource_manager)
+
+    def receive_supply(self, now=None):
+        """Credit every arrived shipment to the resource manager in one update
+        Returns:
+            dict: Combined cargo that landed this call
+        """
+        cargo = self.schedule.collect_arrivals(now)
+        if cargo:
+            self.resource_manager.addResources(cargo)
+            self.play_landing_animation(now)
+        return cargo
+
+    def update(self, now=None):
+        if now is None:
+            now = time.time()
+        cargo = self.receive_supply(now)
+
+        if self.frames is self.LANDING_FRAMES and self.animation_done(now):
+            self.frames = None
+            self.set_rocket_present(True)
+            self.landed_at = now
+        elif self.rocket_present and not self.frames and now - self.landed_at >= self.ground_time:
+            self.set_rocket_present(False)
+            self.play_launch_animation(now)
+        elif self.frames is self.LAUNCH_FRAMES and self.animation_done(now):
+            self.frames = None
+        return cargo
+
+    def set_rocket_present(self, present):
+        self.rocket_present = present
+        if self.trading:
+            self.trading.rocket_present = present
+
+    def play_launch_animation(self, now=None):
+        self.frames = self.LAUNCH_FRAMES
+        self.animation_start = time.time() if now is None else now
+
+    def play_landing_animation(self, now=None):
+        self.frames = self.LANDING_FRAMES
+        self.animation_start = time.time() if now is None else now
+
+    def current_frame(self, now=None):
+        if not self.frames:
+            return None
+        if now is None:
+            now = time.time()
+        i = int((now - self.animation_start) * self.ANIMATION_FPS)
+        return self.frames[min(max(0, i), len(self.frames) - 1)]
+
+    def animation_done(self, now):
+        return (now - self.animation_start) * self.ANIMATION_FPS >= len(self.frames)
+
+    def draw(self, surf, pad_pos):
+        px, py = pad_pos
+        pygame.draw.rect(surf, (90, 90, 100), (px - 24, py, 48, 6))
+        frame = self.current_frame()
+        if frame is None:
+            if not self.rocket_present:
+                return
+            frame = (0, 0)
+        altitude, flame = frame
+        base_y = py - altitude
+        body = [(px, base_y - 40), (px + 8, base_y - 28), (px + 8, base_y), (px - 8, base_y), (px - 8, base_y - 28)]
+        pygame.draw.polygon(surf, (225, 225, 235), body)
+        pygame.draw.circle(surf, (80, 140, 220), (px, base_y - 24), 3)
+        if flame:
+            pygame.draw.polygon(surf, (255, 160, 40), [(px - 5, base_y), (px + 5, base_y), (px, base_y + flame)])
 
 class GameManager:
-    def __init__(self):
-        # ... existing code ...
-        
+    def __init__(self, threaded_simulation=False, fps=60, tick_rate=1.0, lockstep_seed=None, lockstep_players=None, room=None, terrain_seed=0):
+        self.game_engine = GameEngineClient()
+        self.game_engine.initialize()
+        self.player_ui = PlayerUI(self.game_engine)
+        self.network_client = NetworkClient()
+
+        # Simulation; procedural terrain needs NumPy, without it the ground is
+        # the background image and every cell yields the same
+        self.terrain = load_terrain(terrain_seed)
+        self.terrain_view = None  # (view key, scaled ground surface), see terrain_ground
+        self.terrain_tiles = {}  # chunk -> one-pixel-per-cell surface
+        self.resource_manager = ResourceManager()
+        self.resource_manager.set_terrain(self.terrain)
+        self.resource_manager.set_power_grid(PowerGrid())
+        self.resource_manager.set_weather(load_weather(terrain_seed))  # None without NumPy too
+        self.resource_manager.set_logistics(Logistics())
+        self.dust_view = None  # (view key, dust overlay surface), see dust_overlay
+        self.event_manager = EventManager()
+        self.trading = Trading()
+        self.launchpad = Launchpad(self.resource_manager, self.trading)
+        self.supply_cargo = {'food': 40, 'water': 40, 'materials': 20}
+        self.production_interval = 1.0 / tick_rate  # seconds between stepResources calls
+        self.last_production_time = time.time()
+        self.fps = fps
+
+        # With threaded_simulation the colony ticks on its own thread and the
+        # renderer only reads snapshots; otherwise update() ticks it inline
+        self.simulation = SimulationRunner(self.simulation_tick, self.take_snapshot, tick_rate=tick_rate)
+        self.threaded_simulation = threaded_simulation
+        self.save_path = "colony.sav"  # F5 saves, F9 loads
+        self.journal = None  # set while connected, see start_journal
+
+        # Profiling: F3 toggles spans and overlay, F4 exports JSON/CSV
+        self.profiler = TickProfiler(window=600)
+        self.show_profiler = False
+        self.profiler_font = pygame.font.SysFont("monospace", 14)
+        self.profiler_overlay_time = 0
+        self.profiler_overlay_lines = []
+
+        # Resource history: F6 toggles the sparkline panel (again to change tier), F7 exports
+        self.history = TimeSeriesRecorder(tick_seconds=1.0 / tick_rate)
+        self.history_panel = SparklinePanel(self.history, ["food", "water", "energy", "marsOre", "materials", "population"],
+                                            self.profiler_font)
+        self.show_history = False
+
+        # Game state
+        self.in_game = False
+        self.show_build_menu = False
+        self.current_building = None
+        self.placed = ChunkedWorld()  # (x, y) -> structure type, stored in chunks (see world.py)
+        self.msgs_to_draw = []
+        self.incoming_display = []
+        self.grid_origin = (12, 200)
+        self.cell_size = 48
+        self.camera_x = 0.0
+        self.view_x = 0  # map cell at the grid's top-left; arrow keys scroll (Shift: a chunk)
+        self.view_y = 0
+        self.chunk_idle_frames = 1800  # chunks off screen this long are evicted to disk
+
+        # Area tools: Shift+click two corners to fill with the selected building
+        # (or clear with 'R'), Ctrl+click two corners to copy a blueprint,
+        # Ctrl+Shift+click to stamp the copied blueprint
+        self.area_anchor = None
+        self.blueprint = None
+
+        # Ctrl+Z / Ctrl+Y (or Ctrl+Shift+Z) undo and redo building; a drag
+        # across cells is one step. Local records are made on the simulation
+        # thread, multiplayer ones when the command is sent.
+        self.undo_history = UndoHistory()
+        self.drag_cell = None  # last cell painted by the current drag
+
+        # Spectators: F8 broadcasts this colony on spectator_port (point a relay
+        # at it for big audiences); the Spectate button watches one read-only
+        self.spectator_port = self.game_engine.server_port + 1
+        self.spectator = SpectatorClient()
+        self.spectator_hub = None
+        self.spectator_feed = None
+        self.spectator_interval = 0.5  # seconds between captures
+        self.last_spectator_capture = 0
+
+        # Lockstep: with a seed and player list, connecting starts a session
+        # that exchanges only per-tick command batches (see lockstep.py)
+        self.lockstep_seed = lockstep_seed
+        self.lockstep_players = lockstep_players or []
+        self.lockstep = None
+
+        # Room to join on a sharded server (server.py); None stays in its lobby
+        self.room = room
+
+        # Assets (decoded in the background, cached pre-scaled on disk)
+        self.bg_image = None
+        self.resource_icons = {}
+        self.resource_text = None  # (colony key, rendered rows), see draw_resources
+        self.b_images = {}
+        self.assets = AssetManager(cache_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache"))
+        self.load_assets()
+
         # Event display system
         self.current_event_display = None
         self.event_display_timer = 0
@@ -279,54 +409,67 @@ class GameManager:
             spacing = 180  # Slightly increased spacing between resources
             icon_size = 24  # Size of resource icons
             
-            resources = [
-                ('water', self.resource_manager.water),
-                ('food', self.resource_manager.food),
-                ('energy', self.resource_manager.energy),
-                ('mars Ore', self.resource_manager.marsOre),
-                ('materials', self.resource_manager.materials),
-                ('manpower', self.resource_manager.manpower),
-                ('population', f"{self.resource_manager.population}/{self.resource_manager.populationLimit}")
-            ]
+            colony = self.colony_view()
+            # Text is re-rendered only when the colony hash changes (once a
+            # tick at most); spectator views have no hash and key on the values
+            key = getattr(colony, "state_hash", 0)
+            resources = None
+            if not key:
+                resources = self.resource_rows(colony)
+                key = tuple(resources)
+            key = (key, len(self.resource_icons))  # icons arrive from the asset loader
+            if self.resource_text is None or self.resource_text[0] != key:
+                rendered = []
+                for i, (resource, amount) in enumerate(resources or self.resource_rows(colony)):
+                    x_pos = x_start + (i % 4) * spacing
+                    row = i // 4
+                    y = y_pos + row * 35  # Slightly increased vertical spacing
+                    
+                    # Resource icon
+                    icon = self.resource_icons.get(resource)
+                    text_x = x_pos + icon_size + 5 if icon else x_pos  # Add some padding after the icon
+                    
+                    # Render the text with a slight shadow for better visibility
+                    text = f"{resource.capitalize()}: {amount}"
+                    shadow = self.player_ui.font.render(text, True, (0, 0, 0))
+                    text_surface = self.player_ui.font.render(text, True, (255, 255, 255))
+                    rendered.append((icon, (x_pos, y), shadow, text_surface, (text_x, y)))
+                self.resource_text = (key, rendered)
             
-            for i, (resource, amount) in enumerate(resources):
-                x_pos = x_start + (i % 4) * spacing
-                row = i // 4
-                y = y_pos + row * 35  # Slightly increased vertical spacing
-                
-                # Draw resource icon
-                icon = self.resource_icons.get(resource)
+            for icon, icon_pos, shadow, text_surface, (text_x, y) in self.resource_text[1]:
                 if icon:
-                    self.game_engine.screen.blit(icon, (x_pos, y))
-                    text_x = x_pos + icon_size + 5  # Add some padding after the icon
-                else:
-                    text_x = x_pos
-                
-                # Create the resource text
-                text = f"{resource.capitalize()}: {amount}"
-                
-                # Render the text with a slight shadow for better visibility
-                shadow = self.player_ui.font.render(text, True, (0, 0, 0))
-                text_surface = self.player_ui.font.render(text, True, (255, 255, 255))
-                
+                    self.game_engine.screen.blit(icon, icon_pos)
                 # Draw shadow then text
                 self.game_engine.screen.blit(shadow, (text_x + 1, y + 1))
                 self.game_engine.screen.blit(text_surface, (text_x, y))
+
+            # Forecast warnings under the resource rows
+            for i, (seconds, resource) in enumerate(self.depletion_warnings()):
+                text = f"{resource.capitalize()} runs out in {seconds:.0f}s" if seconds > 0 else f"Out of {resource}!"
+                warning = self.player_ui.font.render(text, True, (255, 90, 70))
+                self.game_engine.screen.blit(warning, (x_start + i * spacing, y_pos + 70))
         
+    def resource_rows(self, colony):
+        return [
+            ('water', int(colony.water)),
+            ('food', int(colony.food)),
+            ('energy', int(colony.energy)),
+            ('mars Ore', int(colony.marsOre)),
+            ('materials', int(colony.materials)),
+            ('manpower', int(colony.manpower)),
+            ('population', f"{colony.population:.0f}/{colony.populationLimit:.0f}")
+        ]
+
     def load_assets(self):
-        # Load background image
-        img_path = "mars_bg.png"  
-        if os.path.exists(img_path):
-            try:
-                self.bg_image = pygame.image.load(img_path).convert()
-                self.bg_image = pygame.transform.smoothscale(self.bg_image, (self.game_engine.W, self.game_engine.H))
-                print("[client] loaded background image:", img_path)
-            except Exception as e:
-                print("[client] failed to load image:", e)
-                self.bg_image = None
-        
+        """Queue every image on the asset thread pool; poll_assets fills them in
+        as they finish, so the menu draws straight away without them.
+        """
         here = os.path.dirname(os.path.abspath(__file__))
         
+        # Load background image
+        self.assets.request('bg', os.path.join(here, "mars_bg.png"), size=(self.game_engine.W, self.game_engine.H),
+                            alpha=False, callback=lambda img: setattr(self, 'bg_image', img))
+        
         # Load resource icons
         resource_images = {
             'water': 'water.png',
@@ -341,13 +484,9 @@ class GameManager:
         for resource, filename in resource_images.items():
             p = os.path.join(here, filename)
             if os.path.exists(p):
-                try:
-                    img = pygame.image.load(p).convert_alpha()
-                    # Scale the icon to a reasonable size (24x24 pixels)
-                    self.resource_icons[resource] = pygame.transform.smoothscale(img, (24, 24))
-                except Exception as e:
-                    print(f"[client] failed to load resource icon {filename}: {e}")
-                    self.resource_icons[resource] = None
+                # Scale the icon to a reasonable size (24x24 pixels)
+                self.assets.request(('icon', resource), p, size=(24, 24),
+                                    callback=lambda img, r=resource: self.resource_icons.__setitem__(r, img))
         
         # Load building images
         building_images = {
@@ -356,27 +495,42 @@ class GameManager:
             'H': 'buildingH.png',
             'M': 'buildingM.png',
             'W': 'buildingW.png',
+            'F': 'buildingF.png',
             'R': 'r.png',
         }
         
         for key, filename in building_images.items():
             p = os.path.join(here, filename)
             if os.path.exists(p):
-                try:
-                    self.b_images[key] = pygame.image.load(p).convert_alpha()
-                except Exception:
-                    self.b_images[key] = None
+                self.assets.request(('building', key), p,
+                                    callback=lambda img, k=key, path=p: self.set_building_image(k, img, path))
+
+    def set_building_image(self, key, img, path):
+        self.b_images[key] = img
+        if key in STRUCTURE_TYPES:
+            # One surface per structure type, shared by every instance
+            STRUCTURE_TYPES[key].image = img
+            STRUCTURE_TYPES[key].image_path = path
 
     def run(self):
         running = True
         
+        if self.threaded_simulation:
+            self.simulation.start()
         while running:
-            dt = self.game_engine.clock.tick(60) / 1000.0
+            dt = self.game_engine.clock.tick(self.fps) / 1000.0
+            self.assets.poll()
             running = self.handle_events()
             self.update(dt)
             self.draw()
             
         self.network_client.disconnect()
+        self.spectator.disconnect()
+        if self.spectator_hub:
+            self.spectator_hub.close()
+        self.simulation.stop()
+        self.stop_journal()
+        self.assets.shutdown()
         self.game_engine.cleanup()
 
     def handle_events(self):
@@ -395,6 +549,42 @@ class GameManager:
         ui.ip_input.handle_event(ev)
         ui.user_input.handle_event(ev)
         
+        # Profiler hotkeys
+        if ev.type == pygame.KEYDOWN:
+            if ev.key == pygame.K_F3:
+                self.toggle_profiler()
+            elif ev.key == pygame.K_F4 and self.profiler.enabled:
+                self.export_profile()
+            elif ev.key == pygame.K_F6:
+                self.toggle_history()
+            elif ev.key == pygame.K_F7:
+                self.export_history()
+            elif ev.key == pygame.K_F8:
+                self.toggle_broadcast()
+
+        # Save / load hotkeys
+        if ev.type == pygame.KEYDOWN and self.in_game:
+            if ev.key == pygame.K_F5:
+                self.handle_save()
+            elif ev.key == pygame.K_F9:
+                self.handle_load()
+            elif ev.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+                if not (ui.ip_input.active or ui.user_input.active):
+                    self.scroll_view(ev.key, ev.mod & pygame.KMOD_SHIFT)
+            elif ev.key in (pygame.K_z, pygame.K_y) and ev.mod & pygame.KMOD_CTRL:
+                if not (ui.ip_input.active or ui.user_input.active):
+                    if ev.key == pygame.K_y or ev.mod & pygame.KMOD_SHIFT:
+                        self.handle_redo()
+                    else:
+                        self.handle_undo()
+
+        # Dragging with a button held paints (or removes) cell after cell
+        if ev.type == pygame.MOUSEMOTION and self.in_game and (ev.buttons[0] or ev.buttons[2]):
+            self.handle_drag(ev)
+        elif ev.type == pygame.MOUSEBUTTONUP:
+            self.drag_cell = None
+            self.seal_history()
+
         # Handle button clicks
         if ev.type == pygame.MOUSEBUTTONDOWN:
             mx, my = ev.pos
@@ -406,6 +596,8 @@ class GameManager:
                 self.handle_disconnect()
             elif ui.boo_btn.is_clicked(ev):
                 self.handle_boo()
+            elif ui.spectate_btn.is_clicked(ev):
+                self.handle_spectate()
             elif not self.in_game and self.start_btn.rect.collidepoint((mx, my)) and btn == 1:
                 self.in_game = True
                 self.show_build_menu = False
@@ -422,14 +614,137 @@ class GameManager:
         username = self.player_ui.user_input.text.strip() or "Player"
         ok, err = self.network_client.connect(host, self.game_engine.server_port, username=username)
         if ok:
+            self.undo_history = UndoHistory()  # the server's colony, not ours
             self.game_engine.status = f"Connected to {host}"
+            if self.room:
+                self.network_client.send(f"/join {self.room}")
+            if self.lockstep_seed is not None:
+                self.start_lockstep(username)
+            self.start_journal()
         else:
             self.game_engine.status = f"Connect failed: {err}"
 
+    def start_lockstep(self, username):
+        """Every peer starts from the same fresh colony and seed"""
+        # Lockstep ticks the colony itself; a threaded runner would tick it a second time
+        self.simulation.stop()
+        player = username.replace(" ", "_")
+        session = LockstepSession(player, self.lockstep_players, self.lockstep_seed, self.network_client.send,
+                                  tick_seconds=self.production_interval)
+        self.lockstep = session
+        self.undo_history = UndoHistory()
+        session.resource_manager.set_terrain(self.terrain)  # peers must share --terrain-seed
+        session.resource_manager.set_power_grid(PowerGrid())
+        session.resource_manager.set_weather(load_weather(self.lockstep_seed))
+        session.resource_manager.set_logistics(Logistics())
+        self.resource_manager = session.resource_manager
+        self.event_manager = session.event_manager
+        self.trading = session.trading
+        self.launchpad.resource_manager = session.resource_manager
+        self.launchpad.trading = session.trading
+        self.placed = ChunkedWorld()
+        session.start()
+
+    def send_command(self, line, op, *args):
+        """Send a structure command to the server, or queue it for the next lockstep batch"""
+        if self.lockstep:
+            self.lockstep.queue(op, *args)
+        else:
+            self.network_client.send(line)
+
     def handle_disconnect(self):
+        if self.lockstep and self.threaded_simulation:
+            self.simulation.start()  # stopped by start_lockstep
+        self.lockstep = None
+        self.undo_history = UndoHistory()
         self.network_client.disconnect()
+        self.stop_journal()
         self.game_engine.status = "Disconnected"
 
+    def start_journal(self):
+        """Journal this multiplayer session under journals/<start time>"""
+        self.stop_journal()
+        directory = os.path.join("journals", time.strftime("%Y%m%d-%H%M%S"))
+        with self.simulation.exclusive():
+            self.journal = Journal(directory, self.resource_manager, self.event_manager, self.trading)
+
+    def stop_journal(self):
+        if self.journal:
+            with self.simulation.exclusive():
+                self.journal.close()
+                self.journal = None
+
+    def handle_save(self):
+        try:
+            with self.simulation.exclusive():
+                save_colony(self.save_path, self.resource_manager, self.event_manager)
+            self.game_engine.status = f"Saved to {self.save_path}"
+        except OSError as e:
+            self.game_engine.status = f"Save failed: {e}"
+
+    def handle_load(self):
+        with self.simulation.exclusive():
+            try:
+                rm = load_colony(self.save_path, self.event_manager)
+            except (OSError, ValueError) as e:
+                self.game_engine.status = f"Load failed: {e}"
+                return
+            rm.set_terrain(self.terrain)
+            rm.set_power_grid(PowerGrid())
+            rm.set_weather(self.resource_manager.weather)
+            rm.set_logistics(Logistics())
+            self.resource_manager = rm
+            self.undo_history = UndoHistory()
+            self.launchpad.resource_manager = rm
+            if self.journal:
+                self.journal.attach(rm, self.event_manager, self.trading)
+        self.placed = ChunkedWorld((tuple(s.location), s.type) for s in rm.structureList)
+        self.game_engine.status = f"Loaded {len(self.placed)} structures"
+
+    def handle_spectate(self):
+        if self.spectator.connected:
+            self.spectator.disconnect()
+            self.placed = ChunkedWorld((tuple(s.location), s.type) for s in self.resource_manager.structureList)
+            self.game_engine.status = "Stopped spectating"
+            return
+        host = self.player_ui.ip_input.text.strip()
+        ok, err = self.spectator.connect(host, self.spectator_port)
+        if ok:
+            self.in_game = True
+            self.placed = ChunkedWorld()  # filled from the stream, see update_subsystems
+            self.game_engine.status = f"Spectating {host}:{self.spectator_port}"
+        else:
+            self.game_engine.status = f"Spectate failed: {err}"
+
+    def toggle_broadcast(self):
+        if self.spectator_hub:
+            self.spectator_hub.close()
+            self.spectator_hub = self.spectator_feed = None
+            self.placed.changes = None  # nothing drains them any more
+            self.game_engine.status = "Spectator broadcast stopped"
+            return
+        try:
+            hub = FrameHub()
+            port = hub.serve(port=self.spectator_port)
+        except OSError as e:
+            self.game_engine.status = f"Broadcast failed: {e}"
+            return
+        self.spectator_hub = hub
+        self.spectator_feed = SpectatorFeed(hub)
+        self.game_engine.status = f"Broadcasting to spectators on port {port}"
+
+    def capture_for_spectators(self, now):
+        """Runs on the render thread at spectator_interval; reads the snapshot
+        in threaded mode, so the simulation never waits on spectators
+        """
+        if now - self.last_spectator_capture < self.spectator_interval:
+            return
+        self.last_spectator_capture = now
+        colony = self.colony_view()
+        ledger = {name: getattr(colony, name) for name in RESOURCE_FIELDS}
+        events = colony.active_events if self.simulation.running else self.event_manager.active_events
+        self.spectator_feed.capture(self.simulation.tick, ledger, events, self.placed, self.placed.drain_changes())
+
     def handle_boo(self):
         username = self.player_ui.user_input.text.strip() or "Player"
         self.msgs_to_draw.append((f"You: Boo", 2.5))
@@ -442,9 +757,16 @@ class GameManager:
 
     def handle_in_game_events(self, ev, mx, my, btn):
         ui = self.player_ui
+        if self.spectator.connected:
+            self.game_engine.status = "Spectating - read only"
+            return
         gx0, gy0 = self.grid_origin
         top_margin = 200
         
+        if ui.supply_btn.rect.collidepoint((mx, my)) and btn == 1:
+            self.handle_supply_run()
+            return
+
         if not self.show_build_menu:
             if ui.structure_btn.rect.collidepoint((mx, my)) and btn == 1:
                 self.show_build_menu = True
@@ -475,63 +797,238 @@ class GameManager:
         if mx >= gx0 and my >= gy0:
             self.handle_grid_interaction(ev, mx, my, btn)
 
-    def handle_grid_right_click(self, mx, my):
+    def handle_supply_run(self):
+        with self.simulation.exclusive():
+            ok, message = self.launchpad.request_supply(self.supply_cargo)
+        if ok:
+            self.game_engine.status = f"Supply run launched ({len(self.launchpad.schedule)} in flight)"
+        else:
+            self.game_engine.status = f"Supply run failed: {message}"
+
+    def grid_size(self):
+        """Cells visible on screen, (columns, rows)"""
         gx0, gy0 = self.grid_origin
-        rx = mx - gx0
-        ry = my - gy0
-        grid_w = max(1, (self.game_engine.W - gx0 - 8) // self.cell_size)
-        grid_h = max(1, (self.game_engine.H - gy0 - 8) // self.cell_size)
-        gx = rx // self.cell_size
-        gy = ry // self.cell_size
-        if 0 <= gx < grid_w and 0 <= gy < grid_h:
-            if self.network_client.connected:
-                self.network_client.send(f"/remove {gx} {gy}")
-            else:
-                self.placed.pop((gx, gy), None)
-                # Also remove from resource manager
-                self.resource_manager.remove_structure(gx, gy)
+        return (max(1, (self.game_engine.W - gx0 - 8) // self.cell_size),
+                max(1, (self.game_engine.H - gy0 - 8) // self.cell_size))
 
-    def handle_grid_interaction(self, ev, mx, my, btn):
+    def cell_at(self, mx, my):
+        """Map cell under a screen position, or None outside the grid"""
         gx0, gy0 = self.grid_origin
-        rx = mx - gx0
-        ry = my - gy0
-        grid_w = max(1, (self.game_engine.W - gx0 - 8) // self.cell_size)
-        grid_h = max(1, (self.game_engine.H - gy0 - 8) // self.cell_size)
-        gx = rx // self.cell_size
-        gy = ry // self.cell_size
-        
+        grid_w, grid_h = self.grid_size()
+        gx = (mx - gx0) // self.cell_size
+        gy = (my - gy0) // self.cell_size
         if 0 <= gx < grid_w and 0 <= gy < grid_h:
-            key = (gx, gy)
+            return self.view_x + gx, self.view_y + gy
+        return None
+
+    def scroll_view(self, key, by_chunk=False):
+        step = CHUNK_SIZE if by_chunk else 1
+        dx = {pygame.K_LEFT: -step, pygame.K_RIGHT: step}.get(key, 0)
+        dy = {pygame.K_UP: -step, pygame.K_DOWN: step}.get(key, 0)
+        self.view_x += dx
+        self.view_y += dy
+
+    def handle_grid_right_click(self, mx, my):
+        cell = self.cell_at(mx, my)
+        if cell is not None:
+            self.drag_cell = cell
+            self.remove_cell(*cell)
+
+    def remove_cell(self, gx, gy):
+        key = (gx, gy)
+        if self.network_client.connected:
+            if key in self.placed:
+                self.undo_history.record(REMOVE, [(self.placed[key], key)])
+            self.send_command(f"/remove {gx} {gy}", "remove", gx, gy)
+        else:
+            self.placed.pop(key, None)
+            # Also remove from resource manager
+            self.simulation.submit(self.remove_and_record, gx, gy)
+
+    def handle_grid_interaction(self, ev, mx, my, btn):
+        cell = self.cell_at(mx, my)
+        if cell is not None:
+            gx, gy = key = cell
+            self.drag_cell = cell
+            mods = pygame.key.get_mods()
+            if btn == 1 and mods & (pygame.KMOD_SHIFT | pygame.KMOD_CTRL):
+                self.handle_area_click(key, mods)
+                return
             if btn == 3:  # Right click remove
-                if self.network_client.connected:
-                    self.network_client.send(f"/remove {gx} {gy}")
-                else:
-                    self.placed.pop(key, None)
-                    # Also remove from resource manager
-                    self.resource_manager.remove_structure(gx, gy)
+                self.remove_cell(gx, gy)
             elif btn == 1 and self.current_building:  # Left click place/remove
                 if self.current_building == 'R':
-                    if self.network_client.connected:
-                        self.network_client.send(f"/remove {gx} {gy}")
-                    else:
-                        self.placed.pop(key, None)
-                        # Also remove from resource manager
-                        self.resource_manager.remove_structure(gx, gy)
+                    self.remove_cell(gx, gy)
                 else:
                     # Check if we can build (has materials)
                     if self.resource_manager.can_build_structure():
                         if self.network_client.connected:
-                            self.network_client.send(f"/place {self.current_building} {gx} {gy}")
+                            if key not in self.placed:
+                                self.undo_history.record(PLACE, [(self.current_building, key)])
+                            self.send_command(f"/place {self.current_building} {gx} {gy}", "place", self.current_building, gx, gy)
                         else:
                             if key not in self.placed:
-                                self.placed[key] = self.current_building
-                                # Build in resource manager
-                                self.resource_manager.build_structure(self.current_building, gx, gy)
+                                # Built straight away; the map only shows it if the colony took it
+                                with self.simulation.exclusive():
+                                    structure = self.build_and_record(STRUCTURE_TYPES[self.current_building], key)
+                                if structure is not None:
+                                    self.placed[key] = structure.type
                     else:
                         self.game_engine.status = "Not enough materials to build!"
 
+    def handle_drag(self, ev):
+        if self.drag_cell is None:
+            return  # the press was not on the grid
+        cell = self.cell_at(*ev.pos)
+        if cell is None or cell == self.drag_cell or pygame.key.get_mods() & (pygame.KMOD_SHIFT | pygame.KMOD_CTRL):
+            return
+        self.handle_grid_interaction(ev, ev.pos[0], ev.pos[1], 3 if ev.buttons[2] else 1)
+
+    # --- undo --------------------------------------------------------
+
+    def build_and_record(self, structure_class, location, cost_materials=10):
+        """build_structure on the local colony, noted for undo
+        Returns:
+            Structure: The new structure, or None if it was not built
+        """
+        structure = self.resource_manager.build_structure(structure_class, location, cost_materials)
+        if structure is not None:
+            self.undo_history.record(PLACE, [(structure.type, location)], {'materials': -cost_materials})
+        return structure
+
+    def remove_and_record(self, x, y):
+        structure = self.resource_manager.remove_structure(x, y)
+        if structure is not None:
+            self.undo_history.record(REMOVE, [(structure.type, structure.location)])
+
+    def batch_and_record(self, op, args):
+        """apply_batch on the local colony, noted for undo as one step
+        Returns:
+            tuple: (bool, message) from apply_batch
+        """
+        rm = self.resource_manager
+        cells = {cell for _, cell in batch_cells(op, args)}
+        before = [(s.type, tuple(s.location)) for s in rm.structureList if tuple(s.location) in cells]
+        count, materials = len(rm.structureList), rm.materials
+        ok, message = apply_batch(rm, op, args, True)
+        if not ok:
+            return ok, message
+        if op in ("clear", "unstamp"):
+            self.undo_history.record(REMOVE, before)
+        else:
+            self.undo_history.record(PLACE, [(s.type, s.location) for s in rm.structureList[count:]],
+                                {'materials': rm.materials - materials})
+        self.undo_history.seal()
+        return ok, message
+
+    def seal_history(self):
+        if self.network_client.connected:
+            self.undo_history.seal()
+        else:
+            self.simulation.submit(self.undo_history.seal)
+
+    def handle_undo(self):
+        self.change_history(undo=True)
+
+    def handle_redo(self):
+        self.change_history(undo=False)
+
+    def change_history(self, undo):
+        history = self.undo_history
+        if self.network_client.connected:
+            change = history.pop_undo() if undo else history.pop_redo()
+            if change is None:
+                self.game_engine.status = "Nothing to undo" if undo else "Nothing to redo"
+                return
+            forward = (change.kind == PLACE) != undo  # True: the cells get structures
+            if self.lockstep:
+                # Lockstep batches are one line per tick already
+                for structure_type, (x, y) in change.placements():
+                    if forward:
+                        self.lockstep.queue("place", structure_type, x, y)
+                    else:
+                        self.lockstep.queue("remove", x, y)
+            else:
+                # One line for the whole change; applied when the server echoes it back
+                self.network_client.send(inverse_message(change) if undo else forward_message(change))
+            self.game_engine.status = f"{'Undo' if undo else 'Redo'}: {change.count} cells"
+            return
+        with self.simulation.exclusive():
+            history.seal()
+            stack = history.undo_stack if undo else history.redo_stack
+            change = stack[-1] if stack else None
+            ok, message = history.undo(self.resource_manager) if undo else history.redo(self.resource_manager)
+            if change is not None:
+                self.sync_placed(location for _, location in change.placements())
+        self.game_engine.status = message
+
+    def sync_placed(self, cells):
+        """Mirror what the colony now holds at cells into the map, without
+        rebuilding it
+        """
+        cells = set(cells)
+        if not cells:
+            return
+        now = {tuple(s.location): s.type for s in self.resource_manager.structureList if tuple(s.location) in cells}
+        for cell in cells:
+            if cell in now:
+                self.placed[cell] = now[cell]
+            else:
+                self.placed.pop(cell, None)
+
+    def handle_area_click(self, cell, mods):
+        if mods & pygame.KMOD_CTRL and mods & pygame.KMOD_SHIFT:
+            if self.blueprint is None:
+                self.game_engine.status = "No blueprint: Ctrl+click two corners to copy one"
+            else:
+                self.run_batch("stamp", (self.blueprint, *cell), stamp_message(self.blueprint, *cell))
+            return
+        if self.area_anchor is None:
+            self.area_anchor = cell
+            self.game_engine.status = "Corner set - click the opposite corner"
+            return
+
+        (x0, y0), (x1, y1) = self.area_anchor, cell
+        self.area_anchor = None
+        if mods & pygame.KMOD_CTRL:
+            self.blueprint = Blueprint.from_placed(self.placed, x0, y0, x1, y1)
+            self.game_engine.status = f"Copied blueprint of {len(self.blueprint)} structures"
+        elif self.current_building == 'R':
+            self.run_batch("clear", (x0, y0, x1, y1), clear_message(x0, y0, x1, y1))
+        elif self.current_building:
+            self.run_batch("area", (STRUCTURE_TYPES[self.current_building], x0, y0, x1, y1),
+                           area_message(self.current_building, x0, y0, x1, y1))
+
+    def run_batch(self, op, args, message):
+        """Fill, stamp or clear many cells as one command"""
+        if self.network_client.connected:
+            # One line for the whole area; applied when the server echoes it back
+            if op == "clear":
+                self.undo_history.record(REMOVE, [(self.placed[cell], cell) for _, cell in batch_cells(op, args) if cell in self.placed])
+            else:
+                self.undo_history.record(PLACE, [(t, cell) for t, cell in batch_cells(op, args) if cell not in self.placed])
+            self.undo_history.seal()
+            self.network_client.send(message)
+            return
+        # Applied straight away, so the map shows what the colony really got
+        # (a batch it cannot pay for, or cells already taken, change nothing)
+        with self.simulation.exclusive():
+            ok, message = self.batch_and_record(op, args)
+            self.sync_placed(cell for _, cell in batch_cells(op, args))
+        self.game_engine.status = message
+
     def update(self, dt):
-    # Update UI elements
+        with self.profiler.span("update"):
+            self.update_subsystems(dt)
+
+    def update_subsystems(self, dt):
+        profiler = self.profiler
+
+        # Terrain for chunks scrolled into view, within a per-frame budget
+        if self.terrain:
+            self.terrain.generate_pending(0.002)
+
+        # Update UI elements
         self.player_ui.ip_input.update(dt)
         self.player_ui.user_input.update(dt)
         
@@ -545,11 +1042,75 @@ class GameManager:
                 self.msgs_to_draw[i] = (txt, t)
                 
         # Process network messages
-        self.process_network_messages()
+        with profiler.span("process_network_messages"):
+            self.process_network_messages()
+        
+        # Spectating: mirror the stream, nothing runs locally
+        if self.spectator.connected:
+            for cell, structure_type in self.spectator.take_changes().items():
+                if structure_type is None:
+                    self.placed.pop(cell, None)
+                else:
+                    self.placed[cell] = structure_type
+            notices = []
+        # Lockstep: a tick runs only once every peer's batch for it is in
+        elif self.lockstep:
+            notices = []
+            current_time = time.time()
+            if current_time - self.last_production_time >= self.production_interval:
+                applied = self.lockstep.step()
+                if applied < 0:
+                    self.game_engine.status = "Waiting for other players..."
+                    self.lockstep.resend()
+                    self.last_production_time = current_time
+                else:
+                    self.last_production_time = current_time
+                    if self.game_engine.status == "Waiting for other players...":
+                        self.game_engine.status = ""
+                    if applied:
+                        self.sync_placed(self.lockstep.touched)
+                    if self.journal:
+                        self.journal.end_tick()
+                if self.lockstep.desync:
+                    tick, player, _, _ = self.lockstep.desync
+                    self.game_engine.status = f"DESYNC with {player} at tick {tick}"
+        # Threaded: the simulation thread ticks on its own, only pick up its notices
+        elif self.simulation.running:
+            notices = self.simulation.drain_notices()
+        else:
+            notices = []
+            current_time = time.time()
+            if current_time - self.last_production_time >= self.production_interval:
+                self.simulation.advance(current_time)
+                notices = self.simulation.drain_notices()
+                self.last_production_time = current_time
+        self.handle_notices(notices)
+        if self.spectator_feed:
+            self.capture_for_spectators(time.time())
         
+        # Update event display
+        self.update_event_display(dt)
+        
+        # Update camera for star effect
+        self.camera_x += 30 * dt
+
+        # Chunks nobody has looked at or changed for a while go to disk
+        self.placed.advance()
+        if self.placed.clock % 60 == 0:
+            self.placed.evict_idle(self.chunk_idle_frames)
+
+    def advance_world(self, now):
+        """Events, event effects and supply landings for one simulation tick
+        Returns:
+            list: Notices for the render thread, see handle_notices
+        """
+        profiler = self.profiler
+        notices = []
+
         # Update event manager and check for new events
         old_active_events = len(self.event_manager.active_events)
-        self.event_manager.update()
+        with profiler.span("EventManager.update"):
+            self.event_manager.update()
         new_active_events = len(self.event_manager.active_events)
         
         # If a new event started, trigger the display
@@ -557,80 +1118,185 @@ class GameManager:
             active_events = self.event_manager.get_active_events()
             if active_events:
                 latest_event = active_events[-1]  # Get the most recently activated event
-                self.trigger_event_display(latest_event['name'], latest_event['description'])
-        
-        # Update event display
-        self.update_event_display(dt)
+                notices.append(('event', latest_event['name'], latest_event['description']))
         
         # Apply event effects to resource production
         self.apply_event_effects()
         
-        # Auto-produce resources every interval
-        current_time = time.time()
-        if current_time - self.last_production_time >= self.production_interval:
+        # Land any supply runs that have arrived
+        with profiler.span("Launchpad.update"):
+            cargo = self.launchpad.update(now)
+        if cargo:
+            notices.append(('message', "Supply rocket landed"))
+        return notices
+
+    def simulation_tick(self, now):
+        """One simulation tick; runs on the simulation thread when threaded"""
+        # Per tick in both modes, so event deltas land at the same rate either way
+        notices = self.advance_world(now)
+        # Dust steps by game ticks, not frames or wall time, so a journal replays it
+        with self.profiler.span("Weather.advance"):
+            self.resource_manager.advance_weather(self.production_interval, "dust_storm" in self.event_manager.active_events)
+        with self.profiler.span("stepResources"):
             self.resource_manager.stepResources()
-            self.last_production_time = current_time
-        
-        # Update camera for star effect
-        self.camera_x += 30 * dt
+        self.history.record(self.resource_manager)
+        if self.journal:
+            self.journal.end_tick()
+        return notices
+
+    def take_snapshot(self, tick):
+        return take_snapshot(self.resource_manager, self.event_manager, tick, self.production_interval)
+
+    def colony_view(self):
+        """What the renderer should read: the published snapshot when the
+        simulation is threaded, otherwise the live resource manager
+        """
+        if self.spectator.connected:
+            return self.spectator.view()
+        return self.simulation.snapshot if self.simulation.running else self.resource_manager
+
+    def depletion_warnings(self, within=120):
+        """(resource, seconds) for resources forecast to run out within the given seconds"""
+        if self.spectator.connected:
+            return []
+        if self.simulation.running:
+            depletion = self.simulation.snapshot.depletion
+        else:
+            forecast = self.resource_manager.forecast(self.event_manager, self.production_interval)
+            depletion = {resource: forecast.time_to_depletion(resource) for resource in forecast.depletion}
+        return sorted((seconds, resource) for resource, seconds in depletion.items() if seconds <= within)
 
-def apply_event_effects(self):
-    """Apply event effects to resource production"""
-    active_events = self.event_manager.get_active_events()
-    for event in active_events:
-        # Apply multipliers to production rates
-        for resource, multiplier in event.get('multipliers', {}).items():
-            # This would need to be integrated with your resource production system
-            pass
+    def handle_notices(self, notices):
+        for notice in notices:
+            if notice[0] == 'event':
+                self.trigger_event_display(notice[1], notice[2])
+            elif notice[0] == 'message':
+                self.msgs_to_draw.append((notice[1], 2.5))
+
+    def apply_event_effects(self):
+        """Apply event effects to resource production"""
+        active_events = self.event_manager.get_active_events()
+        for event in active_events:
+            # Apply multipliers to production rates
+            for resource, multiplier in event.get('multipliers', {}).items():
+                # This would need to be integrated with your resource production system
+                pass
             
-        # Apply immediate resource changes
-        for resource, delta in event.get('deltas', {}).items():
-            if delta < 0:
-                self.resource_manager.subtractResource(resource, abs(delta))
-            else:
-                self.resource_manager.addResource(resource, delta)
+            # Apply immediate resource changes
+            for resource, delta in event.get('deltas', {}).items():
+                if delta < 0:
+                    self.resource_manager.subtractResource(resource, abs(delta))
+                else:
+                    self.resource_manager.addResource(resource, delta)
 
-def draw(self):
-    # Draw background (now includes gradient overlay)
-    self.draw_background()
-    
-    # Draw UI panel
-    self.draw_ui_panel()
-    
-    # Draw UI elements
-    self.draw_ui_elements()
-    
-    # Draw game elements if in game
-    if self.in_game:
-        self.draw_game_elements()
+    def draw(self):
+        profiler = self.profiler
+        with profiler.span("draw"):
+            # Draw background (now includes gradient overlay)
+            with profiler.span("draw_background"):
+                self.draw_background()
         
-    # Draw messages and chat
-    self.draw_messages()
-    
-    # Draw resources
-    self.draw_resources()
-    
-    # Draw event display (on top of everything)
-    self.draw_event_display()
-    
-    # Draw stars (on very top)
-    self.draw_stars()
-    
-    pygame.display.flip()
+            # Draw UI panel and elements
+            with profiler.span("draw_ui"):
+                self.draw_ui_panel()
+                self.draw_ui_elements()
+        
+            # Draw game elements if in game
+            if self.in_game:
+                with profiler.span("draw_game_elements"):
+                    self.draw_game_elements()
+                    self.launchpad.draw(self.game_engine.screen, (self.game_engine.W - 60, self.game_engine.H - 20))
+            
+            # Draw messages and chat
+            with profiler.span("draw_messages"):
+                self.draw_messages()
+        
+            # Draw resources
+            with profiler.span("draw_resources"):
+                self.draw_resources()
+        
+            # Draw event display (on top of everything)
+            self.draw_event_display()
+        
+            # Draw stars (on very top)
+            self.draw_stars()
+
+            # Resource history (F6)
+            if self.in_game and self.show_history:
+                with profiler.span("draw_history"):
+                    self.history_panel.draw(self.game_engine.screen, (self.game_engine.W - 240, 80))
+
+            # Profiler overlay (F3)
+            if self.show_profiler:
+                self.draw_profiler_overlay()
+        
+            with profiler.span("display.flip"):
+                pygame.display.flip()
+
+    def draw_profiler_overlay(self):
+        """Draw rolling p50/p95/p99 per span, refreshed twice a second"""
+        now = time.time()
+        if now - self.profiler_overlay_time >= 0.5:
+            self.profiler_overlay_time = now
+            self.profiler_overlay_lines = [
+                f"{name:<26}{s['p50_ms']:7.2f}{s['p95_ms']:7.2f}{s['p99_ms']:7.2f}"
+                for name, s in self.profiler.summary().items()
+            ]
+        lines = ["span                       p50    p95    p99 (ms)"] + self.profiler_overlay_lines
+        font = self.profiler_font
+        x, y = 12, self.game_engine.H - 18 * len(lines) - 12
+        panel = pygame.Surface((380, 18 * len(lines) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        self.game_engine.screen.blit(panel, (x - 4, y - 4))
+        for i, line in enumerate(lines):
+            self.game_engine.screen.blit(font.render(line, True, (180, 255, 180)), (x, y + i * 18))
+
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        self.profiler.enabled = self.show_profiler
+        if self.show_profiler:
+            self.profiler.reset()
+
+    def export_profile(self):
+        stem = time.strftime("profile-%Y%m%d-%H%M%S")
+        self.profiler.export_json(stem + ".json")
+        self.profiler.export_csv(stem + ".csv")
+        self.game_engine.status = f"Profile written to {stem}.json/.csv"
+
+    def toggle_history(self):
+        """Off -> tick -> minute -> hour -> off"""
+        tiers = list(self.history.tiers)
+        if not self.show_history:
+            self.show_history = True
+            self.history_panel.set_tier(tiers[0])
+        elif self.history_panel.tier == tiers[-1]:
+            self.show_history = False
+        else:
+            self.history_panel.set_tier(tiers[tiers.index(self.history_panel.tier) + 1])
+
+    def export_history(self):
+        stem = time.strftime("history-%Y%m%d-%H%M%S")
+        self.history.export_json(stem + ".json")
+        self.history.export_csv(stem + ".csv", "minute")
+        self.game_engine.status = f"History written to {stem}.json/.csv"
+
     def process_network_messages(self):
         incoming = self.network_client.get_messages()
         if incoming:
             for text, ts in incoming:
                 text = text.strip()
+                if self.lockstep and self.lockstep.receive(text):
+                    continue
                 if text.startswith("/place "):
                     parts = text.split()
                     if len(parts) == 4:
                         b = parts[1]
                         try:
                             gx = int(parts[2]); gy = int(parts[3])
+                            structure_class = STRUCTURE_TYPES[b]
                             self.placed[(gx, gy)] = b
                             # Also add to resource manager
-                            self.resource_manager.add_structure(b, gx, gy)
+                            self.simulation.submit(self.resource_manager.add_structure, structure_class((gx, gy)))
                         except Exception:
                             pass
                 elif text.startswith("/remove "):
@@ -640,9 +1306,19 @@ def draw(self):
                             gx = int(parts[1]); gy = int(parts[2])
                             self.placed.pop((gx, gy), None)
                             # Also remove from resource manager
-                            self.resource_manager.remove_structure(gx, gy)
+                            self.simulation.submit(self.resource_manager.remove_structure, gx, gy)
                         except Exception:
                             pass
+                elif text.startswith(("/area ", "/stamp ", "/clear ", "/unstamp ")):
+                    parsed = parse_message(text)
+                    if parsed:
+                        op, args = parsed
+                        for structure_type, cell in batch_cells(op, args):
+                            if structure_type is None:
+                                self.placed.pop(cell, None)
+                            else:
+                                self.placed.setdefault(cell, structure_type)
+                        self.simulation.submit(apply_batch, self.resource_manager, op, args)
                 elif not text.startswith("/"):
                     if text.startswith("[server]"):
                         if not any(x[0] == text for x in self.incoming_display):
@@ -653,31 +1329,6 @@ def draw(self):
             
             self.incoming_display = self.incoming_display[:12]
 
-    def draw(self):
-        # Draw background
-        self.draw_background()
-        
-        # Draw UI panel
-        self.draw_ui_panel()
-        
-        # Draw UI elements
-        self.draw_ui_elements()
-        
-        # Draw game elements if in game
-        if self.in_game:
-            self.draw_game_elements()
-            
-        # Draw messages and chat
-        self.draw_messages()
-        
-        # Draw resources
-        self.draw_resources()
-        
-        # Draw stars
-        self.draw_stars()
-        
-        pygame.display.flip()
-
     def draw_background(self):
     # Draw background image first
         if self.bg_image:
@@ -725,9 +1376,11 @@ def draw(self):
         ui.connect_btn.draw(self.game_engine.screen)
         ui.disconnect_btn.draw(self.game_engine.screen)
         ui.boo_btn.draw(self.game_engine.screen)
+        ui.spectate_btn.draw(self.game_engine.screen, bg=(120, 80, 80) if self.spectator.connected else (80, 80, 120))
 
         if self.in_game:
             ui.structure_btn.draw(self.game_engine.screen, bg=(70,90,70))
+            ui.supply_btn.draw(self.game_engine.screen, bg=(70,70,100))
             if self.show_build_menu:
                 for k, btn in ui.build_btns.items():
                     if self.current_building == k:
@@ -766,26 +1419,31 @@ def draw(self):
         grid_bg = (15,15,25)
         pygame.draw.rect(self.game_engine.screen, grid_bg, (gx0-4, gy0-4, grid_w*self.cell_size+8, grid_h*self.cell_size+8))
         
-        # Draw grid cells
-        for gx in range(grid_w):
-            for gy in range(grid_h):
-                x = gx0 + gx*self.cell_size
-                y = gy0 + gy*self.cell_size
-                if self.bg_image:
-                    sx = min(max(0, x + self.cell_size//2), self.bg_image.get_width()-1)
-                    sy = min(max(0, y + self.cell_size//2), self.bg_image.get_height()-1)
-                    try:
-                        col = self.bg_image.get_at((sx, sy))
-                        base = (
-                            min(255, int(col.r * 0.6 + 15)),
-                            min(255, int(col.g * 0.6 + 15)),
-                            min(255, int(col.b * 0.6 + 15))
-                        )
-                    except Exception:
-                        base = (25,25,35)
-                    pygame.draw.rect(self.game_engine.screen, base, (x, y, self.cell_size, self.cell_size))
-                else:
-                    pygame.draw.rect(self.game_engine.screen, (25,25,35), (x, y, self.cell_size, self.cell_size))
+        # Draw grid cells: procedural ground when the terrain is ready,
+        # otherwise sampled from the background image
+        ground = self.terrain_ground(grid_w, grid_h) if self.terrain else None
+        if ground is not None:
+            self.game_engine.screen.blit(ground, (gx0, gy0))
+        else:
+            for gx in range(grid_w):
+                for gy in range(grid_h):
+                    x = gx0 + gx*self.cell_size
+                    y = gy0 + gy*self.cell_size
+                    if self.bg_image:
+                        sx = min(max(0, x + self.cell_size//2), self.bg_image.get_width()-1)
+                        sy = min(max(0, y + self.cell_size//2), self.bg_image.get_height()-1)
+                        try:
+                            col = self.bg_image.get_at((sx, sy))
+                            base = (
+                                min(255, int(col.r * 0.6 + 15)),
+                                min(255, int(col.g * 0.6 + 15)),
+                                min(255, int(col.b * 0.6 + 15))
+                            )
+                        except Exception:
+                            base = (25,25,35)
+                        pygame.draw.rect(self.game_engine.screen, base, (x, y, self.cell_size, self.cell_size))
+                    else:
+                        pygame.draw.rect(self.game_engine.screen, (25,25,35), (x, y, self.cell_size, self.cell_size))
         
         # Draw grid lines
         grid_surf = pygame.Surface((grid_w*self.cell_size, grid_h*self.cell_size), pygame.SRCALPHA)
@@ -798,10 +1456,13 @@ def draw(self):
             pygame.draw.line(grid_surf, grid_line, (0, y), (grid_w*self.cell_size, y))
         self.game_engine.screen.blit(grid_surf, (gx0, gy0))
         
-        # Draw placed buildings
-        for (pgx, pgy), b in self.placed.items():
-            x = gx0 + pgx*self.cell_size
-            y = gy0 + pgy*self.cell_size
+        # Draw placed buildings, reading only the chunks on screen
+        view_x, view_y = self.view_x, self.view_y
+        grid = self.resource_manager.power_grid
+        logistics = self.resource_manager.logistics
+        for (pgx, pgy), b in self.placed.region(view_x, view_y, view_x + grid_w - 1, view_y + grid_h - 1):
+            x = gx0 + (pgx - view_x)*self.cell_size
+            y = gy0 + (pgy - view_y)*self.cell_size
             img = self.b_images.get(b)
             if img:
                 img_s = pygame.transform.smoothscale(img, (self.cell_size-4, self.cell_size-4))
@@ -809,15 +1470,78 @@ def draw(self):
                 img_y = y + (self.cell_size - img_s.get_height()) // 2
                 self.game_engine.screen.blit(img_s, (img_x, img_y))
             else:
-                colors = {'D':(200,100,200),'S':(200,200,100),'H':(100,200,200),'M':(200,150,100),'W':(180,180,180)}
+                colors = {'D':(200,100,200),'S':(200,200,100),'H':(100,200,200),'M':(200,150,100),'F':(150,120,90),'W':(180,180,180),'T':(110,110,115)}
                 rect_size = self.cell_size - 12
                 rect_x = x + (self.cell_size - rect_size) // 2
                 rect_y = y + (self.cell_size - rect_size) // 2
                 pygame.draw.rect(self.game_engine.screen, colors.get(b,(200,200,200)), (rect_x, rect_y, rect_size, rect_size))
+            # Red corner dot on structures whose network lacks power
+            power = grid.network_power((pgx, pgy)) if grid is not None else None
+            if power is not None and power < 1.0:
+                red = 255 if power == 0 else 200
+                pygame.draw.circle(self.game_engine.screen, (red, 40, 40), (x + self.cell_size - 7, y + 7), 4)
+            # Amber dot on mines with no road to a refinery (read only, routes refresh on the tick)
+            if logistics is not None and b in SOURCES and logistics.sources.get((pgx, pgy), 0) is None:
+                pygame.draw.circle(self.game_engine.screen, (240, 170, 40), (x + 7, y + 7), 4)
         
+        # Dust in the air over everything on the ground
+        if self.resource_manager.weather is not None:
+            dust = self.dust_overlay(grid_w, grid_h)
+            if dust is not None:
+                self.game_engine.screen.blit(dust, (gx0, gy0))
+
         # Draw building preview
         self.draw_building_preview()
 
+    def dust_overlay(self, grid_w, grid_h):
+        """Translucent dust over the visible cells, one pixel per cell scaled
+        up, rebuilt only when the weather steps or the view changes. None in
+        clear air.
+        """
+        weather = self.resource_manager.weather
+        key = (weather.steps, self.view_x, self.view_y, grid_w, grid_h, self.cell_size)
+        if self.dust_view is None or self.dust_view[0] != key:
+            density = weather.region(self.view_x, self.view_y, grid_w, grid_h)
+            if density.max() < 0.02:
+                self.dust_view = (key, None)
+            else:
+                small = pygame.Surface((grid_w, grid_h), pygame.SRCALPHA)
+                small.fill((190, 130, 80, 0))
+                alpha = pygame.surfarray.pixels_alpha(small)
+                alpha[:] = (density.T * 200).astype('uint8')
+                del alpha  # unlock the surface
+                self.dust_view = (key, pygame.transform.scale(small, (grid_w * self.cell_size, grid_h * self.cell_size)))
+        return self.dust_view[1]
+
+    def terrain_ground(self, grid_w, grid_h):
+        """Ground under the visible cells as one surface, built one pixel per
+        cell and scaled up, and rebuilt only when the view or the set of
+        generated chunks changes. None until a visible chunk is generated.
+        """
+        size = self.terrain.chunk_size
+        x0, y0 = self.view_x, self.view_y
+        ready = []
+        for cy in range(y0 // size, (y0 + grid_h - 1) // size + 1):
+            for cx in range(x0 // size, (x0 + grid_w - 1) // size + 1):
+                colors = self.terrain.ready_colors(cx, cy)
+                if colors is not None:
+                    ready.append((cx, cy, colors))
+        if not ready:
+            return None
+        key = (x0, y0, grid_w, grid_h, self.cell_size, len(ready))
+        if self.terrain_view is None or self.terrain_view[0] != key:
+            small = pygame.Surface((grid_w, grid_h))
+            small.fill((25, 25, 35))
+            for cx, cy, colors in ready:
+                tile = self.terrain_tiles.get((cx, cy))
+                if tile is None:
+                    if len(self.terrain_tiles) > self.terrain.max_chunks:
+                        self.terrain_tiles.clear()
+                    tile = self.terrain_tiles[(cx, cy)] = pygame.surfarray.make_surface(colors.swapaxes(0, 1))
+                small.blit(tile, (cx * size - x0, cy * size - y0))
+            self.terrain_view = (key, pygame.transform.scale(small, (grid_w * self.cell_size, grid_h * self.cell_size)))
+        return self.terrain_view[1]
+
     def draw_building_preview(self):
         if not (self.show_build_menu and self.current_building):
             return
@@ -849,7 +1573,7 @@ def draw(self):
                         surf.set_alpha(160)
                         self.game_engine.screen.blit(surf, (x+3, y+3))
                     else:
-                        colors = {'D':(200,100,200),'S':(200,200,100),'H':(100,200,200),'M':(200,150,100),'W':(180,180,180)}
+                        colors = {'D':(200,100,200),'S':(200,200,100),'H':(100,200,200),'M':(200,150,100),'F':(150,120,90),'W':(180,180,180),'T':(110,110,115)}
                         col = colors.get(self.current_building,(200,200,200))
                         s = pygame.Surface((self.cell_size-18, self.cell_size-18), pygame.SRCALPHA)
                         s.fill((*col,160))
@@ -893,8 +1617,20 @@ def draw(self):
             "Start Game"
         )
 
-def run_game():
-    game_manager = GameManager()
+def run_game(argv=None):
+    parser = argparse.ArgumentParser(description="Mars colony client")
+    parser.add_argument("--threaded-sim", action="store_true", help="Tick the colony on its own thread")
+    parser.add_argument("--fps", type=int, default=60, help="Render frames per second")
+    parser.add_argument("--tps", type=float, default=1.0, help="Simulation ticks per second")
+    parser.add_argument("--lockstep-seed", type=int, help="Play in lockstep with this shared seed")
+    parser.add_argument("--lockstep-players", default="", help="Comma-separated usernames of every lockstep player")
+    parser.add_argument("--room", help="Room to join on a sharded server")
+    parser.add_argument("--terrain-seed", type=int, default=0, help="Seed of the procedural terrain (shared by lockstep peers)")
+    args = parser.parse_args(argv)
+    players = [p.strip().replace(" ", "_") for p in args.lockstep_players.split(",") if p.strip()]
+    game_manager = GameManager(threaded_simulation=args.threaded_sim, fps=args.fps, tick_rate=args.tps,
+                               lockstep_seed=args.lockstep_seed, lockstep_players=players, room=args.room,
+                               terrain_seed=args.terrain_seed)
     game_manager.run()
 
 if __name__ == "__main__":
@@ -3,7 +3,10 @@ import time
 import random
 
 class EventManager:
-    def __init__(self):
+    def __init__(self, rng=None, clock=None):
+        # Injectable so lockstep peers can share a seeded Random and a tick clock
+        self.rng = rng if rng is not None else random
+        self.clock = clock if clock is not None else time.time
         self.active_events = []
         self.event_cooldowns = {}
         # We'll create events directly instead of importing
@@ -13,6 +16,7 @@ class EventManager:
             'outbreak': self.create_event('Outbreak', 'Reduces manpower', 25)
         }
         self.efficiency_modifiers = {}
+        self.journal = None  # Journal recording activations, see journal.py
     
     def create_event(self, name, description, duration):
         """Create a RandomEvent without importing it"""
@@ -29,7 +33,7 @@ class EventManager:
         
     def update(self):
         """Update event lifecycle"""
-        current_time = time.time()
+        current_time = self.clock()
         
         # Check for expired events
         for event_name in list(self.active_events):
@@ -38,26 +42,28 @@ class EventManager:
                 self.deactivate_event(event_name)
         
         # Random event triggering (simplified)
-        if random.random() < 0.01 and len(self.active_events) < 2:
+        if self.rng.random() < 0.01 and len(self.active_events) < 2:
             self.trigger_random_event()
             
     def trigger_random_event(self):
         """Trigger a random event from available events"""
         available_event_names = [name for name in self.available_events.keys() 
                                if name not in self.event_cooldowns or 
-                               time.time() - self.event_cooldowns[name] > 60]
+                               self.clock() - self.event_cooldowns[name] > 60]
         
         if available_event_names:
-            event_name = random.choice(available_event_names)
+            event_name = self.rng.choice(available_event_names)
             self.activate_event(event_name)
             
     def activate_event(self, event_name):
         """Activate an event"""
+        if self.journal is not None:
+            self.journal.record("event", event_name)
         event = self.available_events[event_name]
         event['active'] = True
-        event['start_time'] = time.time()
+        event['start_time'] = self.clock()
         self.active_events.append(event_name)
-        self.event_cooldowns[event_name] = time.time()
+        self.event_cooldowns[event_name] = self.clock()
         print(f"Event activated: {event['name']} - {event['description']}")
         
     def deactivate_event(self, event_name):
@@ -68,6 +74,10 @@ class EventManager:
             self.active_events.remove(event_name)
         print(f"Event deactivated: {event['name']}")
                     
+    def get_active_events(self):
+        """Return the event dictionaries of all active events, oldest first"""
+        return [self.available_events[name] for name in self.active_events]
+
     def get_efficiency_modifier(self, resource_type):
         """Get current efficiency modifier for a resource type"""
         return self.efficiency_modifiers.get(resource_type, 1.0)
\ No newline at end of file
@@ -0,0 +1,132 @@
+# forecast.py
+"""
+Resource forecasts without simulating forward.
+
+The net rate of every resource is what one stepResources would do at the
+current stock: the allocator's production and consumption for the
+structure aggregates, minus what the domes eat, plus the per-tick deltas of
+active events. Rates only change when something runs out or an event
+ends, so the projection is piecewise linear with one segment per such
+breakpoint, usually only one or two segments:
+
+    forecast = project(resource_manager, event_manager)
+    forecast.rates["water"]                 # net change per tick right now
+    forecast.time_to_depletion("water")     # seconds, or None if it never runs out
+    forecast.time_to_target("food", 500)    # seconds, or None if never reached
+
+Each segment costs one ManpowerAllocator.solve over the structure types, so
+the cost does not grow with the number of structures. Population is held
+at its current size over the horizon.
+"""
+
+import time
+
+FORECAST_RESOURCES = ("food", "water", "energy", "marsOre", "materials")
+
+
+class Forecast:
+    def __init__(self, segments, tick_seconds, horizon):
+        self.segments = segments  # [(start tick, stock at start, rates per tick, length in ticks)]
+        self.tick_seconds = tick_seconds
+        self.horizon = horizon  # ticks projected
+        self.rates = segments[0][2] if segments else {}
+        self.depletion = {}  # resource -> tick it reaches zero
+        for start, stock, rates, length in segments:
+            for resource, rate in rates.items():
+                if resource not in self.depletion and rate < 0 and stock[resource] + rate * length <= 1e-9:
+                    self.depletion[resource] = start + (stock[resource] / -rate if stock[resource] > 0 else 0.0)
+
+    def value_at(self, resource, seconds):
+        ticks = seconds / self.tick_seconds
+        for start, stock, rates, length in self.segments:
+            if ticks <= start + length:
+                return max(0.0, stock[resource] + rates[resource] * (ticks - start))
+        start, stock, rates, length = self.segments[-1]
+        return max(0.0, stock[resource] + rates[resource] * length)
+
+    def time_to_depletion(self, resource):
+        """Seconds until resource reaches zero within the horizon, else None"""
+        ticks = self.depletion.get(resource)
+        return None if ticks is None else ticks * self.tick_seconds
+
+    def time_to_target(self, resource, target):
+        """Seconds until resource first reaches target within the horizon, else None"""
+        for start, stock, rates, length in self.segments:
+            value, rate = stock[resource], rates[resource]
+            if value == target:
+                return start * self.tick_seconds
+            if rate and (target - value) / rate >= 0:
+                ticks = (target - value) / rate
+                if ticks <= length:
+                    return (start + ticks) * self.tick_seconds
+        return None
+
+
+def event_deltas(event_manager, now, tick_seconds):
+    """[(ticks remaining, per-tick deltas)] for every active event with deltas"""
+    if event_manager is None:
+        return []
+    effects = []
+    for event in event_manager.get_active_events():
+        if event.get('deltas'):
+            remaining = max(0.0, event['duration'] - (now - event['start_time'])) / tick_seconds
+            effects.append((remaining, event['deltas']))
+    return effects
+
+
+def tick_rates(resource_manager, stock, dome_need, deltas):
+    """Net change per tick of each forecast resource at the given stock"""
+    _, consumed, produced = resource_manager.solve(stock, record=False)
+    rates = {}
+    for resource in FORECAST_RESOURCES:
+        rate = produced.get(resource, 0) - consumed.get(resource, 0) - dome_need.get(resource, 0)
+        for delta in deltas:
+            rate += delta.get(resource, 0)
+        rates[resource] = rate
+    return rates
+
+
+def project(resource_manager, event_manager=None, tick_seconds=1.0, horizon_seconds=3600, now=None, max_segments=16):
+    """Piecewise-linear projection of the ledger
+    Args:
+        resource_manager: ResourceManager to forecast
+        event_manager: Optional EventManager whose active event deltas apply until they end
+        tick_seconds (float): Seconds per stepResources
+        horizon_seconds (float): How far ahead to project
+        now (float): Current time for event expiry, defaults to time.time()
+        max_segments (int): Breakpoints to follow before extending the last rates
+    Returns:
+        Forecast
+    """
+    if now is None:
+        now = time.time()
+    horizon = horizon_seconds / tick_seconds
+    stock = {resource: float(getattr(resource_manager, resource)) for resource in FORECAST_RESOURCES}
+    domes = resource_manager.population_system
+    dome_need = domes.consumption() if len(domes) else {}
+    effects = event_deltas(event_manager, now, tick_seconds)
+
+    segments = []
+    elapsed = 0.0
+    while elapsed < horizon and len(segments) < max_segments:
+        deltas = [d for remaining, d in effects if remaining > elapsed]
+        rates = tick_rates(resource_manager, stock, dome_need, deltas)
+
+        # Run until the next resource empties or event ends
+        length = horizon - elapsed
+        if len(segments) < max_segments - 1:
+            for resource, rate in rates.items():
+                if rate < 0 and stock[resource] > 1e-9:
+                    length = min(length, stock[resource] / -rate)
+            for remaining, _ in effects:
+                if remaining > elapsed:
+                    length = min(length, remaining - elapsed)
+        segments.append((elapsed, dict(stock), rates, length))
+        for resource, rate in rates.items():
+            stock[resource] = max(0.0, stock[resource] + rate * length)
+            if stock[resource] < 1e-9:
+                stock[resource] = 0.0
+        elapsed += length
+        if length <= 0:
+            break
+    return Forecast(segments, tick_seconds, horizon)
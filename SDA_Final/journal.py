@@ -0,0 +1,240 @@
+# journal.py
+"""
+Append-only command journal with periodic checkpoints.
+
+Every state-changing player command (place, remove, build, resource
+add/subtract/set and multi-resource credit/debit, event activation, trade) is appended to journal.bin as a
+small binary record stamped with the tick it happened in, as is each
+weather step, whose storm depends on events replay does not re-run. Every
+checkpoint_interval ticks the whole colony is written with save_colony
+(subsystems and dust grid included) and its tick and journal offset are
+appended to checkpoints.idx:
+
+    journal = Journal("journals/session1", resource_manager, event_manager, trading)
+    ...
+    resource_manager.stepResources()
+    journal.end_tick()
+    ...
+    journal.close()
+
+    # later, headless
+    resource_manager, event_manager = replay("journals/session1", tick=1000000)
+
+replay loads the nearest checkpoint at or before the requested tick and only
+re-runs the records and ticks after it, with the terrain, power grid,
+weather and logistics the checkpoint was taken with. Commands stamped with
+tick k happen before the k+1th stepResources, so "tick" means completed
+ticks.
+
+Record layout ('<IBB' header, then payload):
+    tick u32, opcode u8, payload length u8, payload
+"""
+
+import bisect
+import os
+import struct
+
+from event_manager import EventManager
+from savegame import RESOURCE_FIELDS, load_colony, save_colony
+from structure import STRUCTURE_TYPES
+
+RECORD = struct.Struct("<IBB")
+CHECKPOINT = struct.Struct("<QQ")  # tick, journal offset
+
+# name -> (opcode, payload format); None means a UTF-8 string payload
+OPS = {
+    "place": (1, struct.Struct("<cii")),
+    "remove": (2, struct.Struct("<ii")),
+    "build": (3, struct.Struct("<ciid")),
+    "add": (4, struct.Struct("<Bd")),
+    "subtract": (5, struct.Struct("<Bd")),
+    "set": (6, struct.Struct("<Bd")),
+    "event": (7, None),
+    "trade": (8, struct.Struct("<Bd")),
+    "weather": (9, struct.Struct("<d?")),  # seconds, storm
+    "credit": (10, struct.Struct("<Bd")),  # repeated once per resource
+    "debit": (11, struct.Struct("<Bd")),
+}
+REPEATED = ("credit", "debit")  # payload is one {resource: amount} dict
+OP_NAMES = {code: name for name, (code, _) in OPS.items()}
+RESOURCE_INDEX = {name: i for i, name in enumerate(RESOURCE_FIELDS)}
+
+JOURNAL_FILE = "journal.bin"
+INDEX_FILE = "checkpoints.idx"
+
+
+def checkpoint_path(directory, tick):
+    return os.path.join(directory, "checkpoint-%010d.sav" % tick)
+
+
+def encode_record(tick, op, *args):
+    code, fmt = OPS[op]
+    if fmt is None:
+        payload = str(args[0]).encode("utf-8")[:255]
+    elif op in REPEATED:
+        payload = b"".join(fmt.pack(RESOURCE_INDEX[resource], amount) for resource, amount in args[0].items())
+    else:
+        args = list(args)
+        if op in ("place", "build"):
+            args[0] = args[0].encode("ascii")
+        elif op in ("add", "subtract", "set", "trade"):
+            args[0] = RESOURCE_INDEX[args[0]]
+        payload = fmt.pack(*args)
+    return RECORD.pack(tick, code, len(payload)) + payload
+
+
+def decode_payload(op, payload):
+    fmt = OPS[op][1]
+    if fmt is None:
+        return (payload.decode("utf-8"),)
+    if op in REPEATED:
+        return ({RESOURCE_FIELDS[i]: amount for i, amount in fmt.iter_unpack(payload)},)
+    args = list(fmt.unpack(payload))
+    if op in ("place", "build"):
+        args[0] = args[0].decode("ascii")
+    elif op in ("add", "subtract", "set", "trade"):
+        args[0] = RESOURCE_FIELDS[args[0]]
+    return tuple(args)
+
+
+def iter_records(f):
+    """Yield (tick, op, args, offset after record) from an open journal file"""
+    while True:
+        header = f.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return  # end of file, or a record cut short by a crash
+        tick, code, length = RECORD.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length:
+            return
+        op = OP_NAMES[code]
+        yield tick, op, decode_payload(op, payload), f.tell()
+
+
+class Journal:
+    def __init__(self, directory, resource_manager, event_manager=None, trading=None, checkpoint_interval=1000):
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        self.tick = 0
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(os.path.join(directory, JOURNAL_FILE), "wb")
+        self.index = open(os.path.join(directory, INDEX_FILE), "wb")
+        self.attach(resource_manager, event_manager, trading)
+
+    def attach(self, resource_manager, event_manager=None, trading=None):
+        """Start journaling these managers and checkpoint them straight away
+        (also used after a save is loaded, since that replaces the colony)
+        """
+        self.resource_manager = resource_manager
+        self.event_manager = event_manager
+        resource_manager.journal = self
+        if event_manager is not None:
+            event_manager.journal = self
+        if trading is not None:
+            trading.journal = self
+        self.checkpoint()
+
+    def record(self, op, *args):
+        self.file.write(encode_record(self.tick, op, *args))
+
+    def end_tick(self):
+        """Call once after every stepResources"""
+        self.tick += 1
+        if self.tick % self.checkpoint_interval == 0:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.file.flush()
+        save_colony(checkpoint_path(self.directory, self.tick), self.resource_manager, self.event_manager)
+        self.index.write(CHECKPOINT.pack(self.tick, self.file.tell()))
+        self.index.flush()
+
+    def close(self):
+        if self.resource_manager.journal is self:
+            self.resource_manager.journal = None
+        if self.event_manager is not None and getattr(self.event_manager, "journal", None) is self:
+            self.event_manager.journal = None
+        self.file.close()
+        self.index.close()
+
+
+def read_checkpoints(directory):
+    """Return the sorted list of (tick, journal offset) checkpoints"""
+    with open(os.path.join(directory, INDEX_FILE), "rb") as f:
+        data = f.read()
+    usable = len(data) - len(data) % CHECKPOINT.size
+    return sorted(CHECKPOINT.iter_unpack(data[:usable]))
+
+
+def apply_record(op, args, resource_manager, event_manager):
+    """Apply one record; a place or build on an occupied cell is dropped, so
+    when two lockstep peers claim the same cell in one tick the first record
+    in batch order wins on every peer
+    Returns:
+        bool: False if the record was dropped
+    """
+    match op:
+        case "place":
+            structure_type, x, y = args
+            if (x, y) in resource_manager.occupied:
+                return False
+            resource_manager.add_structure(STRUCTURE_TYPES[structure_type]((x, y)))
+        case "remove":
+            resource_manager.remove_structure(*args)
+        case "build":
+            structure_type, x, y, cost = args
+            if (x, y) in resource_manager.occupied:
+                return False
+            resource_manager.build_structure(STRUCTURE_TYPES[structure_type], (x, y), cost)
+        case "add":
+            resource_manager.addResource(*args)
+        case "subtract":
+            resource_manager.subtractResource(*args)
+        case "set":
+            resource_manager.setResource(*args)
+        case "credit":
+            resource_manager.addResources(*args)
+        case "debit":
+            resource_manager.subtractResources(*args)
+        case "event":
+            if args[0] in event_manager.available_events:
+                event_manager.activate_event(args[0])
+        case "trade":
+            pass  # trades are recorded for auditing; they do not touch the ledger
+        case "weather":
+            resource_manager.advance_weather(*args)
+    return True
+
+
+def replay(directory, tick):
+    """Rebuild the colony as it was after the given number of ticks
+    Args:
+        directory (str): Journal directory written by Journal
+        tick (int): Completed ticks to replay up to
+    Returns:
+        tuple: (ResourceManager, EventManager)
+    Raises:
+        ValueError: If no checkpoint is at or before tick
+    """
+    checkpoints = read_checkpoints(directory)
+    i = bisect.bisect_right(checkpoints, (tick, float("inf"))) - 1
+    if i < 0:
+        raise ValueError(f"No checkpoint at or before tick {tick}")
+    start_tick, offset = checkpoints[i]
+
+    event_manager = EventManager()
+    resource_manager = load_colony(checkpoint_path(directory, start_tick), event_manager, subsystems=True)
+    current = start_tick
+    with open(os.path.join(directory, JOURNAL_FILE), "rb") as f:
+        f.seek(offset)
+        for stamped, op, args, _ in iter_records(f):
+            if stamped >= tick:
+                break
+            while current < stamped:
+                resource_manager.stepResources()
+                current += 1
+            apply_record(op, args, resource_manager, event_manager)
+    while current < tick:
+        resource_manager.stepResources()
+        current += 1
+    return resource_manager, event_manager
@@ -0,0 +1,195 @@
+# lockstep.py
+"""
+Deterministic lockstep multiplayer.
+
+Instead of sending colony state, every peer sends one small line per tick
+with the commands its player issued (place, remove, build, trade). Every
+peer applies the same batches in the same order to its own ResourceManager
+and EventManager, which share a seeded Random and a tick-based clock, so
+all colonies stay identical without ever being transmitted:
+
+    session = LockstepSession("alice", ["alice", "bob"], seed=42, send=network_client.send)
+    session.start()
+
+    # player input: scheduled input_delay ticks ahead
+    session.queue("place", "H", 3, 4)
+
+    # every line from the server
+    session.receive(text)
+
+    # game loop, at the tick rate
+    if session.step() < 0:
+        session.resend()  # still waiting: a peer may have missed our batches
+    if session.desync:
+        ...
+
+Tick t can only run once every peer's batch for t has arrived. Each batch
+also carries the sender's state hash for its last completed tick; a peer
+that computed a different hash for that tick sets session.desync. The hash
+is the ResourceManager's incremental state hash (see state_hash.py) plus
+the active events, so it costs the same however large the colony grows,
+and so does the traffic.
+
+Wire format, one line per peer per tick:
+    /lockstep <player> <tick> <hash tick> <hash, 16 hex digits> <base64 zlib journal records, or ->
+"""
+
+import base64
+import binascii
+import io
+import random
+import zlib
+
+from event_manager import EventManager
+from journal import apply_record, encode_record, iter_records
+from resource_manager import ResourceManager
+from state_hash import mix64, name_salt
+from trading import Trading
+
+LOCKSTEP_OPS = ("place", "remove", "build", "trade")
+
+
+def state_hash(resource_manager, event_manager=None):
+    """64-bit hash of the state every peer must agree on: the colony's
+    incremental hash, kept current in O(1) per change, plus active events
+    """
+    h = resource_manager.state_hash
+    if event_manager is not None:
+        for name in event_manager.active_events:
+            h ^= mix64(name_salt(name))
+    return h
+
+
+def apply_event_deltas(resource_manager, event_manager):
+    """Per-tick resource deltas of every active event"""
+    for event in event_manager.get_active_events():
+        for resource, delta in event.get('deltas', {}).items():
+            if delta < 0:
+                resource_manager.subtractResource(resource, -delta)
+            else:
+                resource_manager.addResource(resource, delta)
+
+
+class LockstepSession:
+    def __init__(self, player, players, seed, send, input_delay=2, tick_seconds=1.0, resource_manager=None):
+        self.player = player
+        self.players = sorted(set(players) | {player})  # batches apply in this order on every peer
+        self.send = send  # callable taking one line
+        self.input_delay = input_delay  # ticks between issuing a command and running it
+        self.tick_seconds = tick_seconds
+        self.tick = 0  # next tick to run
+        self.rng = random.Random(seed)
+        self.resource_manager = resource_manager if resource_manager is not None else ResourceManager()
+        self.event_manager = EventManager(rng=self.rng, clock=self.clock)
+        self.trading = Trading(clock=self.clock)
+        self.batches = {}  # tick -> {player: journal records}
+        self.outgoing = []  # (op, args) for the next batch we send
+        self.hashes = {}  # tick -> our state hash after it
+        self.remote_hashes = {}  # tick -> [(player, hash)] not yet checked
+        self.desync = None  # (tick, player, their hash, our hash) at the first mismatch
+        self.hash_history = 256  # ticks of our own hashes kept for late comparisons
+        self.sent = {}  # tick -> our line for it, kept until every peer is past it
+        self.touched = []  # (x, y) of the cells the last step placed on or removed from
+
+    def clock(self):
+        """Simulated seconds; the same on every peer, unlike time.time()"""
+        return self.tick * self.tick_seconds
+
+    def start(self):
+        """Send empty batches for the first input_delay ticks so play can begin"""
+        for tick in range(self.input_delay):
+            self._send_batch(tick)
+
+    def queue(self, op, *args):
+        """Issue a command; it runs on every peer input_delay ticks from now"""
+        if op not in LOCKSTEP_OPS:
+            raise ValueError(f"{op} is not a lockstep command")
+        self.outgoing.append((op, args))
+
+    def _send_batch(self, tick):
+        records = b"".join(encode_record(tick, op, *args) for op, args in self.outgoing)
+        self.outgoing = []
+        payload = base64.b64encode(zlib.compress(records)).decode("ascii") if records else "-"
+        hash_tick = self.tick - 1
+        line = f"/lockstep {self.player} {tick} {hash_tick} {self.hashes.get(hash_tick, 0):016x} {payload}"
+        self.sent[tick] = line
+        self.send(line)
+
+    def resend(self):
+        """Send our pending batches again, for peers that joined late or lost a line.
+        Duplicates are harmless: a batch is keyed by tick and player."""
+        for tick in sorted(self.sent):
+            self.send(self.sent[tick])
+
+    def receive(self, text):
+        """Take a line from the server
+        Returns:
+            bool: True if it was a lockstep batch
+        """
+        parts = text.split()
+        if len(parts) != 6 or parts[0] != "/lockstep":
+            return False
+        try:
+            player, tick, hash_tick, their_hash = parts[1], int(parts[2]), int(parts[3]), int(parts[4], 16)
+            records = b"" if parts[5] == "-" else zlib.decompress(base64.b64decode(parts[5]))
+        except (ValueError, binascii.Error, zlib.error):
+            return False
+        if player not in self.players or tick < self.tick:
+            return True
+        self.batches.setdefault(tick, {})[player] = records
+        if hash_tick >= 0:
+            self.remote_hashes.setdefault(hash_tick, []).append((player, their_hash))
+            self._check_hashes(hash_tick)
+        return True
+
+    def _check_hashes(self, tick):
+        ours = self.hashes.get(tick)
+        if ours is None:
+            return  # not run that tick yet
+        for player, theirs in self.remote_hashes.pop(tick, ()):
+            if theirs != ours and self.desync is None:
+                self.desync = (tick, player, theirs, ours)
+
+    def ready(self):
+        batch = self.batches.get(self.tick)
+        return batch is not None and len(batch) == len(self.players)
+
+    def step(self):
+        """Run the next tick if every peer's batch for it has arrived
+        Returns:
+            int: Commands applied, or -1 if still waiting for a peer
+        """
+        if not self.ready():
+            return -1
+        batch = self.batches.pop(self.tick)
+        # Their batches for this tick mean every peer is past tick - input_delay
+        self.sent.pop(self.tick - self.input_delay, None)
+        applied = 0
+        self.touched = []
+        for player in self.players:
+            for _, op, args, _ in iter_records(io.BytesIO(batch[player])):
+                self._apply(op, args)
+                applied += 1
+                if op == "remove":
+                    self.touched.append(tuple(args))
+                elif op in ("place", "build"):
+                    self.touched.append(tuple(args[1:3]))
+
+        self.event_manager.update()
+        apply_event_deltas(self.resource_manager, self.event_manager)
+        # Game time, not wall time, so every peer's dust is the same
+        self.resource_manager.advance_weather(self.tick_seconds, "dust_storm" in self.event_manager.active_events)
+        self.resource_manager.stepResources()
+
+        self.hashes[self.tick] = state_hash(self.resource_manager, self.event_manager)
+        self.hashes.pop(self.tick - self.hash_history, None)
+        self._check_hashes(self.tick)
+        self.tick += 1
+        self._send_batch(self.tick + self.input_delay - 1)
+        return applied
+
+    def _apply(self, op, args):
+        if op == "trade":
+            self.trading.execute_trade(args[0], args[1], self.resource_manager)
+        elif op in LOCKSTEP_OPS:
+            apply_record(op, args, self.resource_manager, self.event_manager)
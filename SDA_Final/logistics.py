@@ -0,0 +1,248 @@
+# logistics.py
+"""
+Road logistics for ore.
+
+Ore does not teleport: a Mine's output only reaches the colony if it can
+be hauled over roads (Road structures, edge-adjacent) to a Refinery, and
+hauling costs energy per cell travelled. A mine next to a refinery needs
+no road at all:
+
+    logistics = Logistics()
+    resource_manager.set_logistics(logistics)   # structures already built join too
+
+    logistics.connected_share()     # share of mines with a route to a refinery
+    logistics.mean_haul()           # average route length of those mines, in cells
+    logistics.haul_distance((4, 7)) # route length of one mine, None if cut off
+    logistics.route_length(a, b)    # shortest road distance between two road cells
+
+Routes are cached per road network. Each network keeps a distance field
+to its nearest refinery (one multi-source BFS), and each mine keeps its
+own distance along with running totals over all mines. Placing or
+removing a road, mine or refinery only marks the networks it touches as
+stale. They are recomputed once, on the next read, so a tick reads the
+totals in O(1) however many mines and roads there are. Point-to-point
+route_length answers come from cached BFS trees, keyed by network and
+version, and are dropped when that network changes.
+
+ResourceManager runs unconnected mines idle through the allocator's run
+limits and charges HAUL_ENERGY per unit of ore per cell of mean haul.
+"""
+
+from collections import OrderedDict, deque
+
+ROAD = "T"
+SOURCES = frozenset("M")  # structure types whose output is hauled
+SINKS = frozenset("F")  # structure types that take it
+HAUL_ENERGY = 0.02  # energy per unit of ore per road cell
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def _around(cell):
+    x, y = cell
+    return [(x + dx, y + dy) for dx, dy in NEIGHBOURS]
+
+
+class Logistics:
+    def __init__(self, max_trees=256):
+        self.roads = {}  # road cell -> network id
+        self.networks = {}  # network id -> set of road cells
+        self.versions = {}  # network id -> bumped on every change
+        self.fields = {}  # network id -> {road cell: cells to the nearest sink}
+        self.sinks = set()
+        self.sources = {}  # source cell -> haul distance, None if cut off
+        self.stale = set()  # network ids whose field is out of date
+        self.stale_sources = set()
+        self.connected = 0  # sources with a route
+        self.haul_total = 0  # sum of their distances
+        self.max_trees = max_trees
+        self.trees = OrderedDict()  # road cell -> (network id, version, distances), least recently used first
+        self._next_id = 0
+
+    # --- placing and removing ----------------------------------------
+
+    def add(self, structure):
+        cell = tuple(structure.location)
+        if structure.type == ROAD:
+            self._add_road(cell)
+        elif structure.type in SINKS:
+            self.sinks.add(cell)
+            self._touch(cell)
+        elif structure.type in SOURCES:
+            self.sources[cell] = None
+            self.stale_sources.add(cell)
+
+    def remove(self, structure):
+        cell = tuple(structure.location)
+        if structure.type == ROAD and cell in self.roads:
+            self._remove_road(cell)
+        elif structure.type in SINKS:
+            self.sinks.discard(cell)
+            self._touch(cell)
+        elif structure.type in SOURCES and cell in self.sources:
+            self._set_distance(cell, None)
+            del self.sources[cell]
+            self.stale_sources.discard(cell)
+
+    def _invalidate(self, network):
+        self.stale.add(network)
+        self.versions[network] += 1
+
+    def _touch(self, cell):
+        """Mark the networks and sources around cell as stale"""
+        for neighbour in _around(cell):
+            if neighbour in self.roads:
+                self._invalidate(self.roads[neighbour])
+            elif neighbour in self.sources:
+                self.stale_sources.add(neighbour)
+
+    def _new_network(self, cells):
+        network = self._next_id
+        self._next_id += 1
+        self.networks[network] = cells
+        self.versions[network] = 0
+        for cell in cells:
+            self.roads[cell] = network
+        self.stale.add(network)
+        return network
+
+    def _drop_network(self, network):
+        del self.networks[network]
+        del self.versions[network]
+        self.fields.pop(network, None)
+        self.stale.discard(network)
+
+    def _add_road(self, cell):
+        joined = {self.roads[n] for n in _around(cell) if n in self.roads}
+        if not joined:
+            self._new_network({cell})
+        else:
+            # Relabel the smaller networks into the largest
+            network = max(joined, key=lambda n: len(self.networks[n]))
+            cells = self.networks[network]
+            for other in joined - {network}:
+                for road in self.networks[other]:
+                    self.roads[road] = network
+                cells |= self.networks[other]
+                self._drop_network(other)
+            cells.add(cell)
+            self.roads[cell] = network
+            self._invalidate(network)
+        self._touch(cell)
+
+    def _remove_road(self, cell):
+        network = self.roads.pop(cell)
+        cells = self.networks[network]
+        cells.discard(cell)
+        self._drop_network(network)
+        # The network may have split: flood fill it again from each neighbour
+        for start in _around(cell):
+            if start in cells and self.roads.get(start) == network:
+                part = {start}
+                queue = deque([start])
+                while queue:
+                    for n in _around(queue.popleft()):
+                        if n in cells and n not in part:
+                            part.add(n)
+                            queue.append(n)
+                self._new_network(part)
+        self._touch(cell)
+
+    # --- routes ------------------------------------------------------
+
+    def refresh(self):
+        """Recompute stale distance fields and the mines around them"""
+        for network in self.stale:
+            self._fill(network)
+        self.stale.clear()
+        for cell in self.stale_sources:
+            if cell in self.sources:
+                self._set_distance(cell, self._source_distance(cell))
+        self.stale_sources.clear()
+
+    def _fill(self, network):
+        """Multi-source BFS from the roads next to a sink"""
+        cells = self.networks[network]
+        field = {}
+        queue = deque()
+        for cell in cells:
+            if any(n in self.sinks for n in _around(cell)):
+                field[cell] = 1
+                queue.append(cell)
+        while queue:
+            cell = queue.popleft()
+            step = field[cell] + 1
+            for n in _around(cell):
+                if n in cells and n not in field:
+                    field[n] = step
+                    queue.append(n)
+        self.fields[network] = field
+        for cell in cells:
+            for n in _around(cell):
+                if n in self.sources:
+                    self.stale_sources.add(n)
+
+    def _source_distance(self, cell):
+        best = None
+        for n in _around(cell):
+            if n in self.sinks:
+                return 1
+            network = self.roads.get(n)
+            if network is not None:
+                d = self.fields[network].get(n)
+                if d is not None and (best is None or d + 1 < best):
+                    best = d + 1
+        return best
+
+    def _set_distance(self, cell, distance):
+        old = self.sources[cell]
+        if old is not None:
+            self.connected -= 1
+            self.haul_total -= old
+        if distance is not None:
+            self.connected += 1
+            self.haul_total += distance
+        self.sources[cell] = distance
+
+    def haul_distance(self, location):
+        """Cells ore from the mine at location travels, None if it has no route"""
+        self.refresh()
+        return self.sources.get(tuple(location))
+
+    def connected_share(self):
+        self.refresh()
+        return self.connected / len(self.sources) if self.sources else 1.0
+
+    def mean_haul(self):
+        self.refresh()
+        return self.haul_total / self.connected if self.connected else 0.0
+
+    def haul_energy(self, ore):
+        """Energy to haul ore units over the mean route"""
+        return ore * self.mean_haul() * HAUL_ENERGY
+
+    def route_length(self, a, b):
+        """Shortest road distance in cells between road cells a and b, None if not connected"""
+        a, b = tuple(a), tuple(b)
+        network = self.roads.get(a)
+        if network is None or self.roads.get(b) != network:
+            return None
+        entry = self.trees.get(a)
+        if entry is None or entry[0] != network or entry[1] != self.versions[network]:
+            entry = self.trees[a] = (network, self.versions[network], self._tree(a))
+            if len(self.trees) > self.max_trees:
+                self.trees.popitem(last=False)
+        self.trees.move_to_end(a)
+        return entry[2].get(b)
+
+    def _tree(self, start):
+        cells = self.networks[self.roads[start]]
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            for n in _around(cell):
+                if n in cells and n not in distances:
+                    distances[n] = distances[cell] + 1
+                    queue.append(n)
+        return distances
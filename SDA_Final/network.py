@@ -0,0 +1,92 @@
+# network.py
+"""
+Line-based TCP client for the game server.
+
+Kept free of pygame so headless tools (benchmarks, relays, replay) can talk
+to a server without a display:
+
+    client = NetworkClient()
+    ok, err = client.connect("localhost", 5000, username="Player")
+    client.send("/place H 3 4")
+    for text, timestamp in client.get_messages():
+        ...
+"""
+
+import socket
+import threading
+import time
+
+class NetworkClient:
+    def __init__(self):
+        self.socket = None
+        self.thread = None
+        self.connected = False
+        self.messages = []  
+        self.lock = threading.Lock()
+        self.stop_flag = False
+
+    def connect(self, host, port=5000, username="Player"):
+        self.disconnect()
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.settimeout(4.0)
+            s.connect((host, port))
+            s.settimeout(1.0)
+            s.sendall((username.strip() + "\n").encode("utf-8"))
+            self.socket = s
+            self.connected = True
+            self.stop_flag = False
+            self.thread = threading.Thread(target=self._recv_loop, daemon=True)
+            self.thread.start()
+            return True, None
+        except Exception as e:
+            self.disconnect()
+            return False, str(e)
+
+    def _recv_loop(self):
+        buf = b""
+        try:
+            while not self.stop_flag and self.socket:
+                try:
+                    data = self.socket.recv(4096)
+                    if not data:
+                        break
+                    buf += data
+                    while b"\n" in buf:
+                        line, buf = buf.split(b"\n", 1)
+                        txt = line.decode("utf-8", errors="replace").strip()
+                        if txt:
+                            with self.lock:
+                                self.messages.insert(0, (txt, time.time()))
+                except socket.timeout:
+                    continue
+                except Exception:
+                    break
+        finally:
+            self.disconnect()
+
+    def send(self, text):
+        if not self.socket:
+            return False
+        try:
+            self.socket.sendall((text.strip() + "\n").encode("utf-8"))
+            return True
+        except Exception:
+            self.disconnect()
+            return False
+
+    def get_messages(self):
+        with self.lock:
+            msgs = list(self.messages)
+            self.messages.clear()
+            return msgs
+
+    def disconnect(self):
+        self.stop_flag = True
+        self.connected = False
+        try:
+            if self.socket:
+                self.socket.close()
+        except Exception:
+            pass
+        self.socket = None
@@ -0,0 +1,166 @@
+# population.py
+"""
+Dome population dynamics for ResourceManager.
+
+Every dome's occupancy and capacity live in two parallel arrays, indexed by
+a slot assigned when the dome is added. A tick is a handful of whole-array
+passes (consumption, births/deaths, migration, move-in) rather than a method
+call per Dome:
+
+    population = PopulationSystem(unhoused=5)
+    population.add_dome(dome)                   # ResourceManager.add_structure does this
+    need = population.consumption()             # {'food': ..., 'water': ..., 'energy': ...}
+    total = population.step(supply_fraction)    # 1.0 when domes got everything they needed
+
+total_capacity is kept up to date as domes come and go, so
+ResourceManager.populationLimit never needs a recount.
+"""
+
+from array import array
+
+
+class PopulationSystem:
+    def __init__(self, birth_rate=0.01, death_rate=0.002, starvation_rate=0.05,
+                 migration_rate=0.25, unhoused=0):
+        self.birth_rate = birth_rate  # per person per tick, when supplied
+        self.death_rate = death_rate  # per person per tick
+        self.starvation_rate = starvation_rate  # extra deaths per tick at zero supply
+        self.migration_rate = migration_rate  # share of the gap to the mean fill closed per tick
+        self.unhoused = unhoused  # colonists not living in a dome
+        self.consumption_rates = {}  # per full dome, taken from the first dome added
+
+        self.occupancy = array('d')
+        self.capacity = array('d')
+        self.slots = {}  # location -> slot
+        self.locations = []  # slot -> location
+        self.total_capacity = 0
+
+    @property
+    def housed(self):
+        return sum(self.occupancy)
+
+    @property
+    def total(self):
+        return self.housed + self.unhoused
+
+    def __len__(self):
+        return len(self.occupancy)
+
+    def add_dome(self, dome):
+        """Start tracking a dome; its current population moves into the arrays"""
+        location = tuple(dome.location)
+        if location in self.slots:
+            return
+        if not self.consumption_rates:
+            self.consumption_rates = dict(dome.consumption_rates)
+        self.slots[location] = len(self.locations)
+        self.locations.append(location)
+        self.occupancy.append(min(dome.population, dome.capacity))
+        self.capacity.append(dome.capacity)
+        self.total_capacity += dome.capacity
+
+    def add_domes(self, domes, occupancy=None):
+        """Start tracking many domes at once
+        Args:
+            domes (list): Dome objects
+            occupancy (sequence): Population of each dome, defaults to dome.population
+        """
+        domes = [d for d in domes if tuple(d.location) not in self.slots]
+        if not domes:
+            return
+        if not self.consumption_rates:
+            self.consumption_rates = dict(domes[0].consumption_rates)
+        if occupancy is None or len(occupancy) != len(domes):
+            occupancy = [min(d.population, d.capacity) for d in domes]
+        first = len(self.locations)
+        locations = [tuple(d.location) for d in domes]
+        self.slots.update(zip(locations, range(first, first + len(domes))))
+        self.locations.extend(locations)
+        self.occupancy.extend(occupancy)
+        self.capacity.extend(d.capacity for d in domes)
+        self.total_capacity += sum(d.capacity for d in domes)
+
+    def remove_dome(self, location):
+        """Stop tracking the dome at location; its residents become unhoused
+        Returns:
+            float: Number of residents evicted
+        """
+        slot = self.slots.pop(tuple(location), None)
+        if slot is None:
+            return 0
+        evicted = self.occupancy[slot]
+        self.unhoused += evicted
+        self.total_capacity -= self.capacity[slot]
+
+        # Swap the last dome into the freed slot
+        last = len(self.locations) - 1
+        if slot != last:
+            moved = self.locations[last]
+            self.locations[slot] = moved
+            self.occupancy[slot] = self.occupancy[last]
+            self.capacity[slot] = self.capacity[last]
+            self.slots[moved] = slot
+        self.locations.pop()
+        self.occupancy.pop()
+        self.capacity.pop()
+        return evicted
+
+    def population_of(self, location):
+        slot = self.slots.get(tuple(location))
+        return 0 if slot is None else self.occupancy[slot]
+
+    def set_total(self, total):
+        """Reconcile with a population total that was changed elsewhere
+        (trades, events). Extra people are unhoused; losses come out of every
+        dome proportionally.
+        """
+        housed = self.housed
+        if total >= housed:
+            self.unhoused = total - housed
+            return
+        self.unhoused = 0
+        scale = total / housed if housed > 0 else 0
+        self.occupancy = array('d', [o * scale for o in self.occupancy])
+
+    def consumption(self):
+        """Resources all domes need this tick, scaled by how full each is
+        Returns:
+            dict: Resource name -> amount
+        """
+        if not self.occupancy:
+            return {}
+        fill = sum(o / c for o, c in zip(self.occupancy, self.capacity) if c > 0)
+        return {resource: rate * fill for resource, rate in self.consumption_rates.items()}
+
+    def step(self, supply_fraction=1.0):
+        """Advance births, deaths and migration by one tick
+        Args:
+            supply_fraction (float): Share of consumption() the domes received
+        Returns:
+            float: Total population, housed and unhoused
+        """
+        if not self.occupancy:
+            return self.unhoused
+
+        # Births and deaths: rates are colony-wide, so one growth factor per tick
+        supply_fraction = max(0.0, min(1.0, supply_fraction))
+        growth = 1.0 + self.birth_rate * supply_fraction - self.death_rate - self.starvation_rate * (1.0 - supply_fraction)
+        occupancy = [min(c, o * growth) for o, c in zip(self.occupancy, self.capacity)]
+
+        # Migration: move every dome part of the way towards the mean fill
+        housed = sum(occupancy)
+        if self.total_capacity > 0:
+            mean_fill = housed / self.total_capacity
+            rate = self.migration_rate
+            occupancy = [o + (mean_fill * c - o) * rate for o, c in zip(occupancy, self.capacity)]
+
+        # Move the unhoused into free space, proportionally to the room left
+        free = self.total_capacity - housed
+        if self.unhoused > 0 and free > 0:
+            moving = min(self.unhoused, free)
+            share = moving / free
+            occupancy = [o + (c - o) * share for o, c in zip(occupancy, self.capacity)]
+            self.unhoused -= moving
+
+        self.occupancy = array('d', occupancy)
+        return self.total
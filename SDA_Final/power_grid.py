@@ -0,0 +1,217 @@
+# power_grid.py
+"""
+Power networks and adjacency bonuses.
+
+Structures on edge-adjacent cells form a network. Solar panels only power
+the consumers on their own network, so a colony has to be wired together
+(any structure conducts). The networks are kept in a union-find that is
+updated when a structure is placed or removed, and each network carries its
+per-type structure counts, so the energy balance is computed per network,
+never per structure:
+
+    grid = PowerGrid()
+    resource_manager.set_power_grid(grid)       # structures already built join too
+    resource_manager.stepResources()            # consumers run at most at their network's power
+
+    grid.network_power((3, 4))     # fraction of demand met on that cell's network
+    grid.limits()                  # structure type -> fraction of it that is powered
+
+Each network's supply is its panels' nominal output and its demand the
+nominal energy draw of its consumers; a network meeting half its demand
+lets its consumers run at half speed. Domes conduct, but their upkeep comes
+out of the colony's stock through the population system as before. Energy a
+network does not use still goes into the colony's stock.
+
+Neighbours also help: ADJACENCY_BONUS gives a hydroponic +10% output for
+every hydroponic next to it.
+
+Placing is near O(1). Removing a structure can split its network, and
+union-find cannot split, so the networks it touched are rebuilt from their
+member lists, O(size of those networks); remove_many does a whole area in
+one rebuild.
+"""
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+# structure type -> (neighbour type, output bonus per such neighbour)
+ADJACENCY_BONUS = {
+    "H": ("H", 0.10),
+}
+BONUS_SOURCES = {neighbour_type for neighbour_type, _ in ADJACENCY_BONUS.values()}
+
+
+class PowerGrid:
+    def __init__(self):
+        self.parent = {}  # cell -> parent cell, union-find
+        self.members = {}  # root -> cells in its network
+        self.counts = {}  # root -> {structure type: count}
+        self.structures = {}  # cell -> Structure
+        self.supply = {}  # structure type -> nominal energy output each
+        self.draw = {}  # structure type -> nominal energy draw each (harvesters only)
+        self.totals = {}  # structure type -> count on the grid
+        self.bonus = {}  # cell -> adjacency factor currently applied
+        self._limits = None  # cached limits(), dropped on every change
+        self._power = {}  # root -> fraction of demand met, filled with _limits
+
+    # --- union-find --------------------------------------------------
+
+    def find(self, cell):
+        parent = self.parent
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]  # path halving
+            cell = parent[cell]
+        return cell
+
+    def _root(self, cell):
+        """find without path compression, for the render thread; None if
+        cell is not connected (or is being re-linked right now)
+        """
+        parent = self.parent
+        while True:
+            up = parent.get(cell)
+            if up is None or up == cell:
+                return up
+            cell = up
+
+    def _union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.members[a].extend(self.members.pop(b))
+        counts = self.counts[a]
+        for structure_type, count in self.counts.pop(b).items():
+            counts[structure_type] = counts.get(structure_type, 0) + count
+
+    def _link(self, cell, structure_type):
+        """Make cell its own network and join it to its neighbours"""
+        self.parent[cell] = cell
+        self.members[cell] = [cell]
+        self.counts[cell] = {structure_type: 1}
+        x, y = cell
+        for dx, dy in NEIGHBOURS:
+            neighbour = (x + dx, y + dy)
+            if neighbour in self.parent:
+                self._union(cell, neighbour)
+
+    # --- placing and removing ----------------------------------------
+
+    def add(self, structure):
+        """Connect a new structure
+        Returns:
+            list: (structure, factor) for every structure whose output
+            multiplier changed, this one included; multiply its
+            efficiency_modifiers by factor
+        """
+        return self.add_many([structure])
+
+    def add_many(self, structures):
+        """Connect many structures, re-rating their neighbourhood once"""
+        cells = []
+        for structure in structures:
+            cell = tuple(structure.location)
+            structure_type = structure.type
+            if structure_type not in self.supply:
+                self.supply[structure_type] = getattr(structure, "production_rates", {}).get("energy", 0)
+                self.draw[structure_type] = (structure.consumption_rates.get("energy", 0)
+                                             if hasattr(structure, "calculate_production") else 0)
+            self.structures[cell] = structure
+            self.totals[structure_type] = self.totals.get(structure_type, 0) + 1
+            self._link(cell, structure_type)
+            cells.append(cell)
+        self._limits = None
+        touched = set(cells)
+        for cell in cells:
+            if self.structures[cell].type in BONUS_SOURCES:
+                touched.update(self._neighbours(cell))
+        return self._rebonus(touched)
+
+    def remove_many(self, locations):
+        """Disconnect the structures at locations and re-form the networks they were in
+        Returns:
+            list: (structure, factor) for the neighbours whose bonus changed
+        """
+        cells = [tuple(location) for location in locations if tuple(location) in self.structures]
+        if not cells:
+            return []
+        roots = {self.find(cell) for cell in cells}
+        affected = []
+        for root in roots:
+            affected.extend(self.members.pop(root))
+            del self.counts[root]
+        for cell in cells:
+            structure = self.structures.pop(cell)
+            self.bonus.pop(cell, None)
+            self.totals[structure.type] -= 1
+        for cell in affected:
+            del self.parent[cell]
+        for cell in affected:
+            if cell in self.structures:
+                self._link(cell, self.structures[cell].type)
+        self._limits = None
+        touched = {neighbour for cell in cells for neighbour in self._neighbours(cell)}
+        return self._rebonus(touched)
+
+    def remove(self, location):
+        return self.remove_many([location])
+
+    def _neighbours(self, cell):
+        x, y = cell
+        return [(x + dx, y + dy) for dx, dy in NEIGHBOURS if (x + dx, y + dy) in self.structures]
+
+    def _rebonus(self, cells):
+        rerated = []
+        for cell in cells:
+            structure = self.structures[cell]
+            spec = ADJACENCY_BONUS.get(structure.type)
+            if spec is None:
+                continue
+            neighbour_type, per_neighbour = spec
+            factor = 1.0 + per_neighbour * sum(1 for n in self._neighbours(cell) if self.structures[n].type == neighbour_type)
+            old = self.bonus.get(cell, 1.0)
+            if factor != old:
+                if factor == 1.0:
+                    del self.bonus[cell]
+                else:
+                    self.bonus[cell] = factor
+                rerated.append((structure, factor / old))
+        return rerated
+
+    def bonus_of(self, location):
+        return self.bonus.get(tuple(location), 1.0)
+
+    # --- energy balance ----------------------------------------------
+
+    def limits(self):
+        """Structure type -> the fraction of that type on networks with power,
+        for every type that draws energy. Cached until the grid changes, and
+        O(networks x types) to recompute.
+        """
+        if self._limits is not None:
+            return self._limits
+        powered = {}
+        power = {}
+        for root, counts in self.counts.items():
+            demand = sum(count * self.draw[t] for t, count in counts.items())
+            if demand <= 0:
+                continue
+            supply = sum(count * self.supply[t] for t, count in counts.items())
+            fraction = power[root] = min(1.0, supply / demand)
+            for structure_type, count in counts.items():
+                if self.draw[structure_type] > 0:
+                    powered[structure_type] = powered.get(structure_type, 0) + count * fraction
+        self._power = power
+        self._limits = {t: powered.get(t, 0) / total for t, total in self.totals.items()
+                        if total and self.draw.get(t, 0) > 0}
+        return self._limits
+
+    def network_power(self, location):
+        """Fraction of demand met on the network at location as of the last
+        limits(), None if it draws nothing
+        """
+        return self._power.get(self._root(tuple(location)))
+
+    def networks(self):
+        return len(self.members)
@@ -0,0 +1,118 @@
+# profiler.py
+"""
+Per-subsystem timing for the game loop.
+
+Wrap each subsystem in a named span; the profiler keeps a rolling window of
+durations per span and reports p50/p95/p99 on demand:
+
+    profiler = TickProfiler(window=600)
+    profiler.enabled = True
+
+    with profiler.span("stepResources"):
+        resource_manager.stepResources()
+
+    profiler.summary()          # {'stepResources': {'p50_ms': ..., ...}}
+    profiler.export_json("profile.json")
+    profiler.export_csv("profile.csv")
+
+While disabled, span() returns one shared no-op context manager, so leaving
+the spans in the loop costs a method call and nothing else.
+"""
+
+import csv
+import json
+import math
+import time
+from collections import deque
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+class TickProfiler:
+    def __init__(self, window=600, enabled=False):
+        self.window = window  # samples kept per span
+        self.enabled = enabled
+        self.samples = {}  # span name -> deque of durations in seconds
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        return _Span(samples)
+
+    def record(self, name, seconds):
+        """Add a duration measured elsewhere"""
+        if not self.enabled:
+            return
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def reset(self):
+        self.samples.clear()
+
+    def stats(self, name):
+        ordered = sorted(self.samples.get(name, ()))
+        if not ordered:
+            return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'count': len(ordered),
+            'mean_ms': sum(ordered) / len(ordered) * 1000,
+            'p50_ms': percentile(ordered, 0.50) * 1000,
+            'p95_ms': percentile(ordered, 0.95) * 1000,
+            'p99_ms': percentile(ordered, 0.99) * 1000,
+            'max_ms': ordered[-1] * 1000,
+        }
+
+    def summary(self):
+        """Return stats for every span, in the order spans were first seen"""
+        return {name: self.stats(name) for name in self.samples}
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'window': self.window, 'spans': self.summary()}, f, indent=2)
+
+    def export_csv(self, path):
+        fields = ['span', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for name, stats in self.summary().items():
+                writer.writerow({'span': name, **{k: round(v, 4) for k, v in stats.items()}})
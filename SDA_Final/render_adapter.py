@@ -0,0 +1,31 @@
+# render_adapter.py
+"""
+The only place core modules reach pygame.
+
+Simulation modules (structure, resource_manager, event_manager, trading,
+random_event) never import pygame themselves. When they need a rendering
+resource they import this module lazily, inside the function that needs it,
+so a headless process never pays for pygame or SDL:
+
+    def load_image(cls, image_path):
+        from render_adapter import load_surface
+        cls.image = load_surface(image_path)
+"""
+
+import pygame
+
+
+def load_surface(path, alpha=True, size=None):
+    """Load an image as a display-ready surface
+    Args:
+        path (str): Image file
+        alpha (bool): Keep per-pixel alpha (convert_alpha) or not (convert)
+        size (tuple): Optional (w, h) to smoothscale to
+    Returns:
+        pygame.Surface
+    """
+    surface = pygame.image.load(path)
+    surface = surface.convert_alpha() if alpha else surface.convert()
+    if size is not None:
+        surface = pygame.transform.smoothscale(surface, size)
+    return surface
@@ -0,0 +1,75 @@
+# resource_flow.py
+"""
+Resource flow graph for production chains.
+
+Each registered structure type is a node. There is an edge from A to B when
+A produces a resource that B consumes, e.g. Mine -> Refinery for marsOre.
+The graph is ordered once per registration, so a tick can resolve a whole
+chain (ore -> materials, energy -> water -> food) in one pass:
+
+    graph = ResourceFlowGraph()
+    graph.register(demand)      # anything with type, priority and rate dicts
+    for stage in graph.stages:  # producers always come before consumers
+        ...
+
+Types in the same stage are at the same depth in the chain and share a
+scheduling priority. Cycles cannot be ordered; their members are placed
+after everything else, highest priority first.
+"""
+
+
+class ResourceFlowGraph:
+    def __init__(self):
+        self.nodes = {}  # structure type -> node with production/consumption rates
+        self.stages = []  # lists of structure types, in evaluation order
+        self.levels = {}  # structure type -> depth in the production chain
+
+    def register(self, node):
+        """Add a structure type to the graph and re-order it
+        Args:
+            node: Object with type, priority, production_rates and consumption_rates
+        """
+        self.nodes[node.type] = node
+        self._order()
+
+    def producers_of(self, resource):
+        return sorted(t for t, n in self.nodes.items() if n.production_rates.get(resource, 0) > 0)
+
+    def consumers_of(self, resource):
+        return sorted(t for t, n in self.nodes.items() if n.consumption_rates.get(resource, 0) > 0)
+
+    def _order(self):
+        """Layered topological sort (Kahn), ties broken by priority then type"""
+        edges = {t: set() for t in self.nodes}
+        indegree = {t: 0 for t in self.nodes}
+        for t, node in self.nodes.items():
+            for resource in node.consumption_rates:
+                for producer in self.producers_of(resource):
+                    if producer != t and t not in edges[producer]:
+                        edges[producer].add(t)
+                        indegree[t] += 1
+
+        levels = {}
+        frontier = sorted(t for t, d in indegree.items() if d == 0)
+        level = 0
+        while frontier:
+            next_frontier = []
+            for t in frontier:
+                levels[t] = level
+                for consumer in edges[t]:
+                    indegree[consumer] -= 1
+                    if indegree[consumer] == 0:
+                        next_frontier.append(consumer)
+            frontier = sorted(next_frontier)
+            level += 1
+
+        # Whatever is left sits on a cycle
+        for t in sorted(self.nodes):
+            if t not in levels:
+                levels[t] = level
+
+        stages = {}
+        for t, lvl in levels.items():
+            stages.setdefault((lvl, -self.nodes[t].priority), []).append(t)
+        self.levels = levels
+        self.stages = [sorted(stages[key]) for key in sorted(stages)]
@@ -20,10 +20,34 @@ How to use ResourceManager in your main game:
    # Call this in your game loop to process all structures
    resource_manager.stepResources()
    # This will:
-   # - Calculate manpower requirements
+   # - Hand out manpower to structure types by scheduling_priority
+   # - Resolve inputs in production-chain order (producers before consumers)
+   # - Split scarce inputs (water, energy, ...) within a chain stage
    # - Process resource consumption
    # - Generate resources from structures
-   # - Apply efficiency modifiers based on available manpower
+   # The fraction each type ran at is in resource_manager.allocator.run_fractions
+
+   # Forecast without simulating: seconds until water runs out (None if never)
+   resource_manager.time_to_depletion("water", event_manager)
+   resource_manager.time_to_target("food", 500)
+
+   # Mines and water harvesters yield by the ore and ice under them
+   resource_manager.set_terrain(load_terrain(seed))   # see terrain.py
+
+   # Solar panels only power structures connected to them, and adjacent
+   # hydroponics boost each other
+   resource_manager.set_power_grid(PowerGrid())      # see power_grid.py
+
+   # Dust over solar panels dims them (see weather.py); step it once per tick
+   resource_manager.set_weather(load_weather(seed))
+   resource_manager.advance_weather(tick_seconds, storm)
+
+   # Ore has to be hauled over roads from mines to refineries (see logistics.py)
+   resource_manager.set_logistics(Logistics())
+
+   # Incremental colony hash, for desync checks and cache keys (see state_hash.py)
+   resource_manager.state_hash   # now
+   resource_manager.tick_hash    # after the last stepResources
 
 4. Resource Management:
    # Add resources
@@ -36,6 +60,9 @@ How to use ResourceManager in your main game:
    # Set specific resource amounts
    resource_manager.setResource("energy", 100)
    
+   # Credit a whole shipment at once
+   resource_manager.addResources({"food": 40, "water": 40})
+
    # Display current resources
    print(resource_manager.get_resource_display())
 
@@ -53,8 +80,13 @@ How to use ResourceManager in your main game:
    # Add population (limited by populationLimit)
    resource_manager.addResource("population", 5)
    
-   # Increase population limit (e.g., when building new Domes)
-   resource_manager.setResource("populationLimit", 20)
+   # Building a Dome raises populationLimit by its capacity; removing it
+   # lowers the limit again and its residents become unhoused
+   resource_manager.build_structure(Dome, (10, 10))
+
+   # Each tick domes consume food, water and energy by how full they are,
+   # and residents are born, die and migrate towards emptier domes
+   # (see population.py)
 
 Example Game Loop Implementation:
 ```python
@@ -77,14 +109,40 @@ def game_loop():
 
 Note: The ResourceManager automatically handles:
 - Resource constraints and limits
-- Manpower distribution
-- Structure efficiency based on available workers
+- Manpower distribution by structure priority
+- Structure efficiency based on available workers and inputs
 - Resource production and consumption cycles
 """
 
+from operator import attrgetter
+
+from allocation import ManpowerAllocator, TypeDemand
+from resource_flow import ResourceFlowGraph
+from population import PopulationSystem
+from forecast import project
+from state_hash import HashedField, StateHash
+from logistics import SOURCES
+
 class ResourceManager:
+    # Ledger fields: every write updates the incremental state hash
+    food = HashedField()
+    water = HashedField()
+    energy = HashedField()
+    marsOre = HashedField()
+    materials = HashedField()
+    manpower = HashedField()
+    population = HashedField()
+    populationLimit = HashedField()
+
     def __init__(self):
+        self.zobrist = StateHash()  # colony hash, kept current by every place, remove and ledger write
+        self.tick_hash = 0  # state_hash after the last stepResources
         self.structureList = []
+        self._occupied = set()  # see occupied
+        self._unindexed = []  # structure lists add_structures has not put in _occupied yet
+        self.type_demands = {}  # structure type -> TypeDemand aggregate
+        self.allocator = ManpowerAllocator()
+        self.flow_graph = ResourceFlowGraph()  # production-chain order of the types above
         
         # Resource variables with sensible defaults
         self.food = 100
@@ -95,6 +153,14 @@ class ResourceManager:
         self.manpower = 5
         self.population = 5
         self.populationLimit = 10
+        self.population_system = PopulationSystem(unhoused=self.population)  # per-dome occupancy
+        self.journal = None  # Journal recording player commands, see journal.py
+        self.ticks = 0  # stepResources calls so far
+        self._forecast = None  # (state key, Forecast) from the last forecast() call
+        self.terrain = None  # optional terrain.Terrain scaling Mine and WaterHarvester output, see set_terrain
+        self.power_grid = None  # optional power_grid.PowerGrid limiting consumers to their network, see set_power_grid
+        self.weather = None  # optional weather.Weather dimming solar panels under dust, see set_weather
+        self.logistics = None  # optional logistics.Logistics routing ore over roads, see set_logistics
         
         # Production rates for each structure type
         self.production_rates = {
@@ -105,7 +171,17 @@ class ResourceManager:
             'W': {'water': 4}          # Water Purifier produces water
         }
 
+    def _record(self, op, *args):
+        if self.journal is not None:
+            self.journal.record(op, *args)
+
+    # Public ledger and structure commands are journaled; the simulation
+    # itself uses the underscored versions, since replay re-runs it.
     def addResource(self, resourceType, amount):
+        self._record("add", resourceType, amount)
+        self._addResource(resourceType, amount)
+
+    def _addResource(self, resourceType, amount):
         match resourceType:
             case "food":
                 self.food += amount
@@ -125,7 +201,33 @@ class ResourceManager:
                 else:
                     self.population = self.populationLimit
 
+    def addResources(self, deltas):
+        """Credit several resources in one ledger update (and one journal record)
+        Args:
+            deltas (dict): Resource name -> amount to add
+        """
+        self._record("credit", deltas)
+        for resourceType, amount in deltas.items():
+            self._addResource(resourceType, amount)
+
+    def subtractResources(self, amounts):
+        """Debit several resources in one ledger update (and one journal record)
+        Args:
+            amounts (dict): Resource name -> amount to take
+        """
+        self._record("debit", amounts)
+        for resourceType, amount in amounts.items():
+            self._subtractResource(resourceType, amount)
+
+    def can_afford(self, amounts):
+        """Whether the ledger holds at least amounts (resource name -> amount)"""
+        return all(getattr(self, resourceType) >= amount for resourceType, amount in amounts.items())
+
     def subtractResource(self, resourceType, amount):
+        self._record("subtract", resourceType, amount)
+        self._subtractResource(resourceType, amount)
+
+    def _subtractResource(self, resourceType, amount):
         match resourceType:
             case "food":
                 self.food = max(0, self.food - amount)
@@ -143,6 +245,10 @@ class ResourceManager:
                 self.population = max(0, self.population - amount)
 
     def setResource(self, resourceType, amount):
+        self._record("set", resourceType, amount)
+        self._setResource(resourceType, amount)
+
+    def _setResource(self, resourceType, amount):
         match resourceType:
             case "food":
                 self.food = amount
@@ -166,57 +272,353 @@ class ResourceManager:
         Args:
             structure: A Structure object (Hydroponic, Mine, etc.)
         """
+        self._record("place", structure.type, *structure.location)
+        self._add_structure(structure)
+
+    @property
+    def occupied(self):
+        """Set of the (x, y) of every structure, for O(1) placement checks"""
+        if self._unindexed:
+            for structures in self._unindexed:
+                self._occupied.update(map(tuple, map(attrgetter('location'), structures)))
+            self._unindexed = []
+        return self._occupied
+
+    @property
+    def state_hash(self):
+        """64-bit hash of the structures and ledger, see state_hash.py"""
+        return self.zobrist.value
+
+    def set_terrain(self, terrain):
+        """Use terrain (a terrain.Terrain, or None) for structure yields,
+        re-rating the structures already built
+        """
+        self.terrain = terrain
+        for structure in self.structureList:
+            if hasattr(structure, 'efficiency_modifiers'):
+                demand = self.type_demands.get(structure.type)
+                if demand is not None:
+                    demand.remove(structure)
+                if terrain is not None:
+                    terrain.apply(structure)
+                else:
+                    structure.efficiency_modifiers = 1.0
+                if self.power_grid is not None:
+                    structure.efficiency_modifiers *= self.power_grid.bonus_of(structure.location)
+                if demand is not None:
+                    demand.add(structure)
+
+    def set_power_grid(self, grid):
+        """Connect structures through grid (a power_grid.PowerGrid, or None to
+        power everything from the colony's stock), the structures already
+        built included
+        """
+        old = self.power_grid
+        if old is not None:
+            # Take the old grid's adjacency bonuses back out
+            self._rerate([(old.structures[cell], 1.0 / bonus) for cell, bonus in old.bonus.items()])
+        self.power_grid = grid
+        if grid is not None:
+            self._rerate(grid.add_many(self.structureList))
+        self._forecast = None
+
+    def set_weather(self, weather):
+        """Dim solar panels by the dust over them in weather (a weather.Weather,
+        or None for clear skies), the panels already built included
+        """
+        if self.weather is not None:
+            self.weather.clear_panels()
+        self.weather = weather
+        if weather is not None:
+            weather.clear_panels()  # it may have tracked another colony
+            for structure in self.structureList:
+                weather.add(structure)
+        self._forecast = None
+
+    def advance_weather(self, seconds, storm=False):
+        """Step the weather by seconds of game time; journaled, since whether
+        a storm is on comes from events that replay does not re-run
+        """
+        if self.weather is not None:
+            self._record("weather", seconds, storm)
+            self.weather.advance(seconds, storm)
+
+    def output_scales(self):
+        """Structure type -> output multiplier, for ManpowerAllocator.solve; None in clear weather"""
+        return {'S': self.weather.solar_factor()} if self.weather is not None else None
+
+    def set_logistics(self, logistics):
+        """Haul ore over the roads in logistics (a logistics.Logistics, or None
+        to let it reach the colony directly), the structures already built
+        included
+        """
+        self.logistics = logistics
+        if logistics is not None:
+            for structure in self.structureList:
+                logistics.add(structure)
+        self._forecast = None
+
+    def run_limits(self):
+        """Structure type -> highest fraction it can run at, for
+        ManpowerAllocator.solve: the powered share with a power grid, times
+        the share of mines with a road to a refinery with logistics. None
+        when neither is in use.
+        """
+        if self.power_grid is None and self.logistics is None:
+            return None
+        limits = dict(self.power_grid.limits()) if self.power_grid is not None else {}
+        if self.logistics is not None:
+            share = self.logistics.connected_share()
+            for structure_type in SOURCES:
+                limits[structure_type] = limits.get(structure_type, 1.0) * share
+        return limits
+
+    def solve(self, stock, record=True):
+        """One tick's allocation at the given stock, hauling included
+        Returns:
+            tuple: (run fractions by type, total consumption, total production)
+        """
+        fractions, consumed, produced = self.allocator.solve(self.type_demands, self.manpower, stock, self.flow_graph.stages,
+                                                           record=record, limits=self.run_limits(), scales=self.output_scales())
+        if self.logistics is not None:
+            haul = self.logistics.haul_energy(produced.get('marsOre', 0))
+            if haul:
+                consumed['energy'] = consumed.get('energy', 0) + haul
+        return fractions, consumed, produced
+
+    def _rerate(self, rerated, pending=()):
+        """Apply adjacency bonus changes from the power grid
+        Args:
+            rerated (list): (structure, factor) pairs from PowerGrid.add/remove_many
+            pending (set): ids of structures not in type_demands yet
+        """
+        for structure, factor in rerated:
+            demand = self.type_demands.get(structure.type)
+            if demand is None or id(structure) in pending:
+                structure.efficiency_modifiers *= factor
+                continue
+            demand.remove(structure)
+            structure.efficiency_modifiers *= factor
+            demand.add(structure)
+
+    def _add_structure(self, structure):
+        if self.terrain is not None:
+            self.terrain.apply(structure)
+        if self.power_grid is not None:
+            self._rerate(self.power_grid.add(structure), {id(structure)})
+        if self.weather is not None:
+            self.weather.add(structure)
+        if self.logistics is not None:
+            self.logistics.add(structure)
         self.structureList.append(structure)
+        self._occupied.add(tuple(structure.location))
+        self.zobrist.toggle_structure(structure.type, structure.location)
+        if hasattr(structure, 'can_accommodate'):
+            self.population_system.add_dome(structure)
+            self.populationLimit += structure.capacity
+        if hasattr(structure, 'calculate_production'):
+            demand = self.type_demands.get(structure.type)
+            if demand is None:
+                demand = self.type_demands[structure.type] = TypeDemand.from_structure(structure)
+                self.flow_graph.register(demand)
+            demand.add(structure)
+
+    def add_structures(self, structures, occupancy=None):
+        """Add many structures at once, e.g. when loading a save
+        Per-type aggregates are updated once per type rather than once per
+        structure.
+        Args:
+            structures (iterable): Structure objects
+            occupancy (sequence): Optional population of each Dome, in order
+        """
+        structures = list(structures)
+        self.structureList.extend(structures)
+        # Indexed and hashed when next read, so loading a save pays for neither
+        self._unindexed.append(structures)
+        self.zobrist.toggle_structures(structures)
+        by_type = {}
+        if structures and all(s.type == structures[0].type for s in structures):
+            by_type[structures[0].type] = structures
+        else:
+            for structure in structures:
+                by_type.setdefault(structure.type, []).append(structure)
+
+        if self.terrain is not None:
+            for structure_type, group in by_type.items():
+                if self.terrain.affects(structure_type):
+                    for structure in group:
+                        self.terrain.apply(structure)
+        if self.power_grid is not None:
+            self._rerate(self.power_grid.add_many(structures), set(map(id, structures)))
+        if self.weather is not None:
+            for structure in by_type.get('S', ()):
+                self.weather.add(structure)
+        if self.logistics is not None:
+            for structure in structures:
+                self.logistics.add(structure)
+
+        for structure_type, group in by_type.items():
+            first = group[0]
+            if hasattr(first, 'can_accommodate'):
+                self.population_system.add_domes(group, occupancy)
+                self.populationLimit += first.capacity * len(group)
+            if hasattr(first, 'calculate_production'):
+                demand = self.type_demands.get(structure_type)
+                if demand is None:
+                    demand = self.type_demands[structure_type] = TypeDemand.from_structure(first)
+                    self.flow_graph.register(demand)
+                demand.add_many(group)
+
+    def place_structures(self, structures):
+        """add_structures for player commands: free, but journaled like add_structure
+        Args:
+            structures (iterable): Structure objects
+        """
+        structures = list(structures)
+        if self.journal is not None:
+            for structure in structures:
+                self._record("place", structure.type, *structure.location)
+        self.add_structures(structures)
 
     def remove_structure(self, x, y):
-        """Remove a structure from the management system"""
-        self.structureList = [s for s in self.structureList if not (s['x'] == x and s['y'] == y)]
+        """Remove the structure at (x, y) from the management system
+        Returns:
+            The removed Structure, or None if nothing was there
+        """
+        self._record("remove", x, y)
+        return self._remove_structure(x, y)
 
-    def stepResources(self):
-        """Process resource production and consumption from all structures"""
-        # Get count of each structure type
-        from structure import Structure
-        structure_counts = Structure.count_structure_types(self.structureList)
-        
-        # Calculate available manpower
-        total_manpower_needed = 0
+    def _remove_structure(self, x, y):
+        if (x, y) not in self.occupied:
+            return None
+        for i, structure in enumerate(self.structureList):
+            if tuple(structure.location) == (x, y):
+                del self.structureList[i]
+                self.occupied.discard((x, y))
+                self.zobrist.toggle_structure(structure.type, structure.location)
+                if hasattr(structure, 'can_accommodate'):
+                    self.population_system.remove_dome(structure.location)
+                    self.populationLimit -= structure.capacity
+                demand = self.type_demands.get(structure.type)
+                if demand is not None:
+                    demand.remove(structure)
+                if self.power_grid is not None:
+                    self._rerate(self.power_grid.remove(structure.location))
+                if self.weather is not None:
+                    self.weather.remove(structure)
+                if self.logistics is not None:
+                    self.logistics.remove(structure)
+                return structure
+        return None
+
+    def remove_structures(self, locations):
+        """Remove every structure at the given locations in one pass over
+        structureList (remove_structure scans it once per call)
+        Returns:
+            list: The removed Structures
+        """
+        targets = set(map(tuple, locations))
+        keep = []
+        removed = []
         for structure in self.structureList:
-            if hasattr(structure, 'manpower_required'):
-                total_manpower_needed += structure.manpower_required
-        
-        # If we don't have enough manpower, structures will run at reduced efficiency
-        manpower_efficiency = min(1.0, self.manpower / max(1, total_manpower_needed))
+            (removed if tuple(structure.location) in targets else keep).append(structure)
+        if not removed:
+            return removed
+        self.structureList[:] = keep
+        for structure in removed:
+            self._record("remove", *structure.location)
+            self.occupied.discard(tuple(structure.location))
+            self.zobrist.toggle_structure(structure.type, structure.location)
+            if hasattr(structure, 'can_accommodate'):
+                self.population_system.remove_dome(structure.location)
+                self.populationLimit -= structure.capacity
+            demand = self.type_demands.get(structure.type)
+            if demand is not None:
+                demand.remove(structure)
+        if self.power_grid is not None:
+            self._rerate(self.power_grid.remove_many([s.location for s in removed]))
+        if self.weather is not None:
+            for structure in removed:
+                self.weather.remove(structure)
+        if self.logistics is not None:
+            for structure in removed:
+                self.logistics.remove(structure)
+        return removed
+
+    def stepResources(self):
+        """Process resource production and consumption for every structure type
         
-        # Process production and consumption for each structure
-        for structure in self.structureList:
-            if hasattr(structure, 'calculate_production') and hasattr(structure, 'calculate_consumption'):
-                # Set efficiency based on available manpower
-                structure.efficiency_modifiers = manpower_efficiency
-                
-                # Process consumption first
-                consumption = structure.calculate_consumption()
-                can_operate = True
-                for resource, amount in consumption.items():
-                    if getattr(self, resource.lower(), 0) < amount:
-                        can_operate = False
-                        break
-                
-                if can_operate:
-                    # Consume resources
-                    for resource, amount in consumption.items():
-                        self.subtractResource(resource, amount)
-                    
-                    # Add production
-                    production = structure.calculate_production()
-                    for resource, amount in production.items():
-                        self.addResource(resource, amount)
+        Workers are handed out by ManpowerAllocator in scheduling_priority
+        order over the per-type aggregates, then inputs are resolved in
+        flow_graph order so a chain like Mine -> Refinery completes within
+        one tick regardless of build order. With a power grid, consumers
+        only run as far as their networks are powered, and with weather
+        solar panels are dimmed by the dust over them. With logistics,
+        only mines with a road to a refinery run, and hauling their ore
+        costs energy. The cost depends on the number of structure types
+        (and networks), not structures.
+        """
+        stock = {resource: getattr(self, resource) for resource in ("food", "water", "energy", "marsOre", "materials")}
+        fractions, consumed, produced = self.solve(stock)
+
+        # Apply the net change, so output consumed in the same tick nets out
+        net = dict(produced)
+        for resource, amount in consumed.items():
+            net[resource] = net.get(resource, 0) - amount
+        for resource, amount in net.items():
+            if amount < 0:
+                self._subtractResource(resource, -amount)
+            else:
+                self._addResource(resource, amount)
+
+        self.step_population()
+        self.ticks += 1
+        self.tick_hash = self.zobrist.value
+
+    def forecast(self, event_manager=None, tick_seconds=1.0, horizon_seconds=3600):
+        """Project the ledger forward without simulating it (see forecast.py)
+        The result is reused until the state hash, tick or active events
+        change, so calling this every frame is cheap.
+        Returns:
+            Forecast
+        """
+        key = (self.zobrist.value, self.ticks, tick_seconds, horizon_seconds,
+               tuple(event_manager.active_events) if event_manager is not None else ())
+        if self._forecast is None or self._forecast[0] != key:
+            self._forecast = (key, project(self, event_manager, tick_seconds, horizon_seconds))
+        return self._forecast[1]
+
+    def time_to_depletion(self, resourceType, event_manager=None, tick_seconds=1.0):
+        """Seconds until resourceType runs out at current rates, or None"""
+        return self.forecast(event_manager, tick_seconds).time_to_depletion(resourceType)
+
+    def time_to_target(self, resourceType, target, event_manager=None, tick_seconds=1.0):
+        """Seconds until resourceType reaches target at current rates, or None"""
+        return self.forecast(event_manager, tick_seconds).time_to_target(resourceType, target)
+
+    def step_population(self):
+        """Supply every dome and advance births, deaths and migration"""
+        domes = self.population_system
+        if not len(domes):
+            return
+        domes.set_total(self.population)
+
+        need = domes.consumption()
+        supply_fraction = 1.0
+        for resource, amount in need.items():
+            if amount > 0:
+                supply_fraction = min(supply_fraction, getattr(self, resource) / amount)
+        for resource, amount in need.items():
+            self._subtractResource(resource, amount)
+
+        self.population = domes.step(supply_fraction)
 
     def get_resource_display(self):
         """Return formatted string of current resources"""
         return (
-            f"Food: {self.food} | Water: {self.water} | Energy: {self.energy}\n"
-            f"Mars Ore: {self.marsOre} | Materials: {self.materials}\n"
-            f"Manpower: {self.manpower} | Population: {self.population}/{self.populationLimit}"
+            f"Food: {self.food:.0f} | Water: {self.water:.0f} | Energy: {self.energy:.0f}\n"
+            f"Mars Ore: {self.marsOre:.0f} | Materials: {self.materials:.0f}\n"
+            f"Manpower: {self.manpower:.0f} | Population: {self.population:.0f}/{self.populationLimit}"
         )
 
     def can_build_structure(self, cost_materials=10):
@@ -233,12 +635,33 @@ class ResourceManager:
             Structure object if built successfully, None otherwise
         """
         if self.can_build_structure(cost_materials):
-            self.subtractResource("materials", cost_materials)
+            self._record("build", structure_class.type, *location, cost_materials)
+            self._subtractResource("materials", cost_materials)
             new_structure = structure_class(location)
-            self.add_structure(new_structure)
+            self._add_structure(new_structure)
             return new_structure
         return None
 
+    def build_structures(self, placements, cost_materials=10):
+        """Build several structures as one purchase: the total cost is checked
+        and deducted once and the structures are added in one batch
+        Args:
+            placements (list): (structure class, location) pairs
+            cost_materials: Cost in materials of each structure
+        Returns:
+            list: The new Structures, or an empty list if the total is unaffordable
+        """
+        placements = list(placements)
+        if not placements or not self.can_build_structure(cost_materials * len(placements)):
+            return []
+        if self.journal is not None:
+            for structure_class, location in placements:
+                self._record("build", structure_class.type, *location, cost_materials)
+        self._subtractResource("materials", cost_materials * len(placements))
+        structures = [structure_class(location) for structure_class, location in placements]
+        self.add_structures(structures)
+        return structures
+
 # Standalone test function
 def test_resource_manager():
     """Test the resource manager independently"""
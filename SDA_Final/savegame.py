@@ -0,0 +1,238 @@
+# savegame.py
+"""
+Colony save files.
+
+A save is a small header, the resource ledger as packed doubles, a JSON
+block for event timers and other small state, then one packed column per
+structure attribute:
+
+    header   '<4sHHIQ'  magic, version, flags, meta length, structure count
+    ledger   '<8d'      RESOURCE_FIELDS in order
+    meta     JSON       type runs, event timers, unhoused colonists, subsystems
+    enabled  count x u8
+    x, y     count x i32    grid coordinates
+    domes    domes x f64    occupancy of each dome
+
+Structures are written grouped by type, so the type column is stored as
+runs in meta ([["D", 120], ["H", 300], ...]) and each run loads as one
+slice of the coordinate columns. Columns start on 8-byte boundaries.
+Loading memory-maps the file and builds every type in one bulk pass:
+
+    save_colony("colony.sav", resource_manager, event_manager)
+    resource_manager = load_colony("colony.sav", event_manager)
+
+The optional subsystems (terrain seed, power grid, logistics, and the
+weather with its dust grid) are recorded in meta too. load_colony leaves
+them off unless asked, since a client keeps its own; replay rebuilds them
+so a journal re-runs the colony exactly:
+
+    resource_manager = load_colony("colony.sav", subsystems=True)
+"""
+
+import gc
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from logistics import Logistics
+from power_grid import PowerGrid
+from resource_manager import ResourceManager
+from structure import STRUCTURE_TYPES
+from terrain import load_terrain
+from weather import restore_weather
+
+MAGIC = b"MCOL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")
+RESOURCE_FIELDS = ("food", "water", "energy", "marsOre", "materials", "manpower", "population", "populationLimit")
+LEDGER = struct.Struct("<%dd" % len(RESOURCE_FIELDS))
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _column(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(typecode, buf):
+    column = array(typecode)
+    column.frombytes(buf)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def event_timers(event_manager, now=None):
+    """Event state as elapsed/age seconds, so it survives a restart"""
+    if now is None:
+        now = event_manager.clock()
+    return {
+        "active": {name: now - event_manager.available_events[name]["start_time"]
+                   for name in event_manager.active_events},
+        "cooldowns": {name: now - started for name, started in event_manager.event_cooldowns.items()},
+    }
+
+
+def restore_event_timers(event_manager, timers, now=None):
+    if now is None:
+        now = event_manager.clock()
+    for event in event_manager.available_events.values():
+        event["active"] = False
+    event_manager.active_events = []
+    for name, elapsed in timers.get("active", {}).items():
+        if name in event_manager.available_events:
+            event = event_manager.available_events[name]
+            event["active"] = True
+            event["start_time"] = now - elapsed
+            event_manager.active_events.append(name)
+    event_manager.event_cooldowns = {name: now - age for name, age in timers.get("cooldowns", {}).items()}
+
+
+def subsystem_config(resource_manager):
+    """Which optional subsystems the colony runs, as JSON-able values"""
+    rm = resource_manager
+    return {
+        "terrain": rm.terrain.seed if rm.terrain is not None else None,
+        "power_grid": rm.power_grid is not None,
+        "weather": rm.weather.state() if rm.weather is not None else None,
+        "logistics": rm.logistics is not None,
+    }
+
+
+def restore_subsystems(resource_manager, config):
+    """Switch on the subsystems subsystem_config recorded"""
+    rm = resource_manager
+    if config.get("terrain") is not None:
+        rm.set_terrain(load_terrain(config["terrain"]))
+    if config.get("power_grid"):
+        rm.set_power_grid(PowerGrid())
+    if config.get("weather") is not None:
+        rm.set_weather(restore_weather(config["weather"]))
+    if config.get("logistics"):
+        rm.set_logistics(Logistics())
+
+
+def save_colony(path, resource_manager, event_manager=None):
+    """Write the colony to path
+    Args:
+        path (str): File to write
+        resource_manager: ResourceManager holding the structures and ledger
+        event_manager: Optional EventManager whose timers are saved too
+    Returns:
+        int: Number of bytes written
+    """
+    by_type = {}
+    for structure in resource_manager.structureList:
+        by_type.setdefault(structure.type, []).append(structure)
+    population = resource_manager.population_system
+    domes = by_type.get("D", [])
+    # Domes in population slot order, so a loaded colony sums them identically
+    domes.sort(key=lambda d: population.slots.get(tuple(d.location), 0))
+    runs = [[key, len(by_type[key])] for key in sorted(by_type)]
+    structures = [s for key, _ in runs for s in by_type[key]]
+    meta = {
+        "runs": runs,
+        "unhoused": population.unhoused,
+        "subsystems": subsystem_config(resource_manager),
+    }
+    if event_manager is not None:
+        meta["events"] = event_timers(event_manager)
+    meta_bytes = json.dumps(meta).encode("utf-8")
+
+    columns = [
+        bytes(1 if s.enabled else 0 for s in structures),
+        _column("i", (s.location[0] for s in structures)),
+        _column("i", (s.location[1] for s in structures)),
+        _column("d", (population.population_of(d.location) for d in domes)),
+    ]
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(meta_bytes), len(structures)))
+        f.write(LEDGER.pack(*(float(getattr(resource_manager, name)) for name in RESOURCE_FIELDS)))
+        f.write(meta_bytes)
+        for column in columns:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(column)
+        return f.tell()
+
+
+def load_colony(path, event_manager=None, subsystems=False):
+    """Read a colony written by save_colony
+    Args:
+        path (str): File to read
+        event_manager: Optional EventManager to restore event timers into
+        subsystems (bool): Also switch on the terrain, power grid, weather and logistics it was saved with
+    Returns:
+        ResourceManager: A new manager holding the loaded colony
+    Raises:
+        ValueError: If the file is not a colony save, is a newer version,
+            is truncated or corrupt, or holds structure types this version
+            does not know
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < HEADER.size + LEDGER.size:
+            raise ValueError("Not a colony save: file too short")
+        magic, version, _, meta_len, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a colony save")
+        if version > VERSION:
+            raise ValueError(f"Save version {version} is newer than supported version {VERSION}")
+
+        offset = HEADER.size
+        ledger = LEDGER.unpack_from(mm, offset)
+        offset += LEDGER.size
+        meta = json.loads(mm[offset:offset + meta_len].decode("utf-8"))
+        offset += meta_len
+
+        def take(size):
+            nonlocal offset
+            start = _align(offset)
+            offset = start + size
+            if offset > len(mm):
+                raise ValueError("Colony save is truncated")
+            return mm[start:offset]
+
+        runs = meta["runs"]
+        unknown = sorted({key for key, _ in runs} - STRUCTURE_TYPES.keys())
+        if unknown:
+            raise ValueError(f"Unknown structure types in save: {', '.join(map(str, unknown))}")
+        if any(n < 0 for _, n in runs) or sum(n for _, n in runs) != count:
+            raise ValueError(f"Colony save is corrupt: runs do not add up to {count} structures")
+        dome_count = sum(n for key, n in runs if key == "D")
+        enabled = take(count)
+        xs = _read_column("i", take(count * 4))
+        ys = _read_column("i", take(count * 4))
+        occupancy = _read_column("d", take(dome_count * 8))
+
+    rm = ResourceManager()
+    # Millions of new objects would otherwise trigger repeated full GC passes
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = 0
+        for key, n in runs:
+            structures = list(map(STRUCTURE_TYPES[key], zip(xs[start:start + n], ys[start:start + n])))
+            if 0 in enabled[start:start + n]:
+                for structure, flag in zip(structures, enabled[start:start + n]):
+                    structure.enabled = bool(flag)
+            rm.add_structures(structures, occupancy if key == "D" else None)
+            start += n
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    rm.population_system.unhoused = meta.get("unhoused", 0)
+    for name, value in zip(RESOURCE_FIELDS, ledger):
+        setattr(rm, name, int(value) if value.is_integer() else value)
+
+    if event_manager is not None and "events" in meta:
+        restore_event_timers(event_manager, meta["events"])
+    if subsystems:
+        restore_subsystems(rm, meta.get("subsystems", {}))
+    return rm
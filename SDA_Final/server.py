@@ -0,0 +1,502 @@
+# server.py
+"""
+Sharded game server.
+
+One front-end process owns every client socket and routes lines; the game
+state lives in shard processes, so simulation and command handling run on
+as many cores as there are shards instead of under one GIL:
+
+    python server.py --port 5000 --shards 4                  # many matches
+    python server.py --port 5000 --shards 4 --mode regions   # one huge colony
+
+rooms mode: each match is a room, joined with "/join <room>" (everyone
+starts in "lobby"). A room lives on one shard, chosen by hashing its name,
+which runs its ResourceManager, validates /place, /remove, /area, /stamp,
+/clear and /unstamp against it and echoes the accepted lines to the room. A client
+joining a room is sent its current layout as one /stamp line.
+
+regions mode: every client plays on one colony. Cells are owned by shards
+chunk by chunk (see world.CHUNK_SIZE), so /place and /remove go to one
+shard and area commands to all of them, each applying its own cells. The
+colony's food, water, energy, ore and materials are one pool: every tick
+the front-end sends the pool to each shard, each shard runs its structures
+against it and replies with its net change, and the front-end sums them.
+That exchange over the shard pipes is the only boundary effect between
+regions today; manpower and population stay with the shard whose domes
+house them and are summed for /status.
+
+Chat, /lockstep and any other line is relayed to the sender's room as is,
+without visiting a shard. "/status" answers the sender with a [server]
+line. NetworkClient needs no changes; the client's --room option sends the
+/join.
+
+Shard pipe messages are pickled tuples, batched once per front-end loop:
+    front -> shard  ("lines", [(room, client id, text)]), ("join", room, client id),
+                    ("tick", pool), None to stop
+    shard -> front  ("out", [(room, client id or None for the room, text)]),
+                    ("ledger", shard, pool change, local fields)
+"""
+
+import argparse
+import multiprocessing
+import os
+import selectors
+import socket
+import time
+import zlib
+
+from blueprints import Blueprint, batch_cells, build_many, parse_message, stamp_message
+from resource_manager import ResourceManager
+from state_hash import MASK, mix64
+from structure import STRUCTURE_TYPES
+from world import CHUNK_SIZE
+
+ROOMS = "rooms"
+REGIONS = "regions"
+DEFAULT_ROOM = "lobby"
+WORLD = "world"  # the one room of regions mode
+SHARED_FIELDS = ("food", "water", "energy", "marsOre", "materials")  # one pool in regions mode
+LOCAL_FIELDS = ("manpower", "population", "populationLimit")  # per shard, summed
+STRUCTURE_COMMANDS = ("/place", "/remove", "/area", "/stamp", "/clear", "/unstamp", "/status")
+
+
+def shard_of_room(room, shards):
+    return zlib.crc32(room.encode("utf-8")) % shards
+
+
+def shard_of_cell(x, y, shards):
+    """Shard owning cell (x, y) in regions mode: whole chunks, spread by hash"""
+    return mix64(((x // CHUNK_SIZE) & 0xFFFFFFFF) | (((y // CHUNK_SIZE) << 32) & MASK)) % shards
+
+
+class RoomState:
+    def __init__(self, resource_manager):
+        self.resource_manager = resource_manager
+        self.occupied = set()  # cells with a structure, for O(1) validation
+
+
+class Shard:
+    """Game state of one shard process; also usable in-process for tests"""
+
+    def __init__(self, index, shards, mode=ROOMS):
+        self.index = index
+        self.shards = shards
+        self.mode = mode
+        self.rooms = {}  # room -> RoomState
+        self.ticks = 0
+
+    def room(self, name):
+        state = self.rooms.get(name)
+        if state is None:
+            resource_manager = ResourceManager()
+            if self.mode == REGIONS and self.index:
+                # The colony's starting colonists live on shard 0 only
+                for field in LOCAL_FIELDS:
+                    resource_manager._setResource(field, 0)
+                resource_manager.population_system.set_total(0)
+            state = self.rooms[name] = RoomState(resource_manager)
+        return state
+
+    def owns(self, cell):
+        return self.mode == ROOMS or shard_of_cell(cell[0], cell[1], self.shards) == self.index
+
+    def receive(self, message):
+        """Handle one message from the front-end
+        Returns:
+            tuple: Reply message, or None
+        """
+        kind = message[0]
+        if kind == "lines":
+            out = []
+            for room, client, text in message[1]:
+                self.handle(room, client, text, out)
+            return ("out", out) if out else None
+        if kind == "join":
+            _, room, client = message
+            line = self.layout_message(room)
+            return ("out", [(room, client, line)]) if line else None
+        if kind == "tick":
+            return self.tick_region(message[1])
+        return None
+
+    def handle(self, room, client, text, out):
+        state = self.room(room)
+        resource_manager = state.resource_manager
+        parts = text.split()
+        try:
+            match parts:
+                case ["/place", structure_type, x, y] if structure_type in STRUCTURE_TYPES:
+                    cell = (int(x), int(y))
+                    if self.owns(cell) and cell not in state.occupied:
+                        state.occupied.add(cell)
+                        resource_manager.add_structure(STRUCTURE_TYPES[structure_type](cell))
+                        out.append((room, None, text))
+                case ["/remove", x, y]:
+                    cell = (int(x), int(y))
+                    if cell in state.occupied:
+                        state.occupied.discard(cell)
+                        resource_manager.remove_structure(*cell)
+                        out.append((room, None, text))
+                case ["/status"]:
+                    out.append((room, client, "[server] " + self.status(room)))
+                case [("/area" | "/stamp" | "/clear" | "/unstamp"), *_]:
+                    parsed = parse_message(text)
+                    if parsed and self.apply_batch(state, *parsed) and self.mode == ROOMS:
+                        out.append((room, None, text))  # regions: the front-end echoes it once
+        except ValueError:
+            pass
+
+    def apply_batch(self, state, op, args):
+        """Apply the cells of a batch command this shard owns
+        Returns:
+            bool: True if anything changed
+        """
+        cells = [(structure_type, cell) for structure_type, cell in batch_cells(op, args) if self.owns(cell)]
+        if op in ("clear", "unstamp"):
+            removed = state.resource_manager.remove_structures([cell for _, cell in cells if cell in state.occupied])
+            state.occupied.difference_update(tuple(s.location) for s in removed)
+            return bool(removed)
+        placements = [(STRUCTURE_TYPES[structure_type], cell) for structure_type, cell in cells if cell not in state.occupied]
+        if not placements:
+            return False
+        ok, _ = build_many(state.resource_manager, placements, charge=False)
+        state.occupied.update(cell for _, cell in placements)
+        return ok
+
+    def layout_message(self, room):
+        """The room's structures as one /stamp line, for a client that just joined"""
+        structures = self.room(room).resource_manager.structureList
+        if not structures:
+            return None
+        xs = [s.location[0] for s in structures]
+        ys = [s.location[1] for s in structures]
+        blueprint = Blueprint.from_structures(structures, min(xs), min(ys), max(xs), max(ys))
+        return stamp_message(blueprint, min(xs), min(ys))
+
+    def status(self, room):
+        resource_manager = self.room(room).resource_manager
+        return (f"room {room} shard {self.index} tick {resource_manager.ticks} "
+                f"structures {len(resource_manager.structureList)} | "
+                + resource_manager.get_resource_display().replace("\n", " | "))
+
+    def tick_rooms(self):
+        for state in self.rooms.values():
+            state.resource_manager.stepResources()
+        self.ticks += 1
+
+    def tick_region(self, pool):
+        """Run this shard's part of the colony against the shared pool
+        Returns:
+            tuple: ("ledger", shard, change of each shared field, local fields)
+        """
+        resource_manager = self.room(WORLD).resource_manager
+        for field in SHARED_FIELDS:
+            resource_manager._setResource(field, pool[field])
+        resource_manager.stepResources()
+        self.ticks += 1
+        change = {field: getattr(resource_manager, field) - pool[field] for field in SHARED_FIELDS}
+        return ("ledger", self.index, change, {field: getattr(resource_manager, field) for field in LOCAL_FIELDS})
+
+
+def shard_main(conn, index, shards, mode, tick_rate):
+    """Shard process loop. In rooms mode the shard ticks its rooms on its own
+    clock (tick_rate 0 runs them flat out, for benchmarks); in regions mode
+    the front-end's "tick" messages drive it.
+    """
+    shard = Shard(index, shards, mode)
+    interval = 1.0 / tick_rate if tick_rate > 0 else 0.0
+    next_tick = time.monotonic() + interval
+    try:
+        while True:
+            if mode == REGIONS:
+                timeout = None
+            else:
+                timeout = max(0.0, next_tick - time.monotonic())
+            if conn.poll(timeout):
+                message = conn.recv()
+                if message is None:
+                    break
+                reply = shard.receive(message)
+                if reply is not None:
+                    conn.send(reply)
+            if mode == ROOMS and time.monotonic() >= next_tick:
+                shard.tick_rooms()
+                next_tick = max(next_tick + interval, time.monotonic()) if interval else 0.0
+    except (EOFError, KeyboardInterrupt):
+        pass
+
+
+class _Client:
+    __slots__ = ('id', 'sock', 'name', 'room', 'inbuf', 'outbuf', 'writing')
+
+    def __init__(self, client_id, sock):
+        self.id = client_id
+        self.sock = sock
+        self.name = None  # the first line a client sends
+        self.room = None
+        self.inbuf = b""
+        self.outbuf = bytearray()
+        self.writing = False  # registered for EVENT_WRITE
+
+
+class ShardedServer:
+    def __init__(self, host="0.0.0.0", port=5000, shards=None, mode=ROOMS, tick_rate=1.0):
+        if mode not in (ROOMS, REGIONS):
+            raise ValueError(f"mode must be {ROOMS!r} or {REGIONS!r}")
+        self.host = host
+        self.port = port
+        self.shard_count = shards or os.cpu_count() or 1
+        self.mode = mode
+        self.tick_rate = tick_rate
+        self.selector = selectors.DefaultSelector()
+        self.listener = None
+        self.processes = []
+        self.pipes = []
+        self.clients = {}  # id -> _Client
+        self.members = {}  # room -> set of client ids
+        self.next_id = 1
+        self.pending = {}  # shard -> [(room, client id, text)] to send this loop
+        self.running = False
+
+        # regions mode: the shared pool, and the tick in flight
+        fresh = ResourceManager()
+        self.pool = {field: getattr(fresh, field) for field in SHARED_FIELDS}
+        self.local = {}  # shard -> local fields after its last tick
+        self.awaiting = 0  # shards yet to answer the current tick
+        self.ticks = 0
+
+    def start(self):
+        """Bind and start the shard processes; serve_forever runs the front-end"""
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.port = self.listener.getsockname()[1]
+        self.listener.listen(128)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, "listener")
+        shard_tick_rate = 0 if self.mode == REGIONS else self.tick_rate
+        for index in range(self.shard_count):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_main, daemon=True,
+                                              args=(child, index, self.shard_count, self.mode, shard_tick_rate))
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.pipes.append(parent)
+            self.selector.register(parent, selectors.EVENT_READ, index)
+        self.running = True
+
+    def serve_forever(self):
+        """Run the front-end until stop(); shuts the shards down on the way out"""
+        try:
+            self._serve()
+        finally:
+            self._shutdown()
+
+    def _serve(self):
+        interval = 1.0 / self.tick_rate if self.tick_rate > 0 else 0.0
+        next_tick = time.monotonic() + interval
+        while self.running:
+            timeout = max(0.0, next_tick - time.monotonic()) if self.mode == REGIONS else 0.5
+            for key, events in self.selector.select(timeout):
+                if key.data == "listener":
+                    self._accept()
+                elif isinstance(key.data, int):
+                    self._shard_reply(self.pipes[key.data].recv())
+                else:
+                    if events & selectors.EVENT_READ:
+                        self._read(key.data)
+                    if events & selectors.EVENT_WRITE and key.data.id in self.clients:
+                        self._write(key.data)
+            self._flush_shards()
+            if self.mode == REGIONS and not self.awaiting and time.monotonic() >= next_tick:
+                self._start_region_tick()
+                next_tick = max(next_tick + interval, time.monotonic())
+
+    def stop(self):
+        """Ask serve_forever to return; safe to call from another thread"""
+        self.running = False
+
+    def _shutdown(self):
+        for pipe in self.pipes:
+            try:
+                pipe.send(None)
+            except (OSError, ValueError):
+                pass
+        for process in self.processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        for client in list(self.clients.values()):
+            self._drop(client)
+        if self.listener is not None:
+            self.listener.close()
+
+    # --- clients -----------------------------------------------------
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _Client(self.next_id, sock)
+        self.next_id += 1
+        self.clients[client.id] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return
+        client.inbuf += data
+        *lines, client.inbuf = client.inbuf.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8", errors="replace").strip()
+            if not text:
+                continue
+            if client.name is None:
+                client.name = text
+                self._join(client, WORLD if self.mode == REGIONS else DEFAULT_ROOM)
+            else:
+                self.route(client, text)
+
+    def _send(self, client, text):
+        client.outbuf += text.encode("utf-8") + b"\n"
+        self._write(client)
+
+    def _write(self, client):
+        try:
+            sent = client.sock.send(client.outbuf)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._drop(client)
+            return
+        del client.outbuf[:sent]
+        writing = bool(client.outbuf)  # wait for the socket to drain only when it is full
+        if writing != client.writing:
+            client.writing = writing
+            self.selector.modify(client.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0), client)
+
+    def _drop(self, client):
+        self.clients.pop(client.id, None)
+        self.members.get(client.room, set()).discard(client.id)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def broadcast(self, room, text):
+        for client_id in list(self.members.get(room, ())):
+            client = self.clients.get(client_id)
+            if client is not None:
+                self._send(client, text)
+
+    # --- routing -----------------------------------------------------
+
+    def _join(self, client, room):
+        if client.room is not None:
+            self.members.get(client.room, set()).discard(client.id)
+        client.room = room
+        self.members.setdefault(room, set()).add(client.id)
+        shards = range(self.shard_count) if self.mode == REGIONS else (shard_of_room(room, self.shard_count),)
+        for shard in shards:
+            self.pipes[shard].send(("join", room, client.id))
+
+    def route(self, client, text):
+        command = text.split(" ", 1)[0]
+        if command == "/join":
+            room = text[len("/join"):].strip()
+            if room and self.mode == ROOMS:
+                self._join(client, room)
+            return
+        if command not in STRUCTURE_COMMANDS:
+            self.broadcast(client.room, text)  # chat, /lockstep, ...
+            return
+        item = (client.room, client.id, text)
+        if self.mode == ROOMS:
+            self.pending.setdefault(shard_of_room(client.room, self.shard_count), []).append(item)
+        elif command == "/status":
+            self._send(client, "[server] " + self.region_status())
+        elif command in ("/place", "/remove"):
+            parts = text.split()
+            try:
+                x, y = int(parts[-2]), int(parts[-1])
+            except (ValueError, IndexError):
+                return
+            self.pending.setdefault(shard_of_cell(x, y, self.shard_count), []).append(item)
+        else:
+            for shard in range(self.shard_count):
+                self.pending.setdefault(shard, []).append(item)
+            self.broadcast(client.room, text)
+
+    def _flush_shards(self):
+        for shard, items in self.pending.items():
+            self.pipes[shard].send(("lines", items))
+        self.pending = {}
+
+    def _shard_reply(self, message):
+        kind = message[0]
+        if kind == "out":
+            for room, client_id, text in message[1]:
+                if client_id is None:
+                    self.broadcast(room, text)
+                elif client_id in self.clients:
+                    self._send(self.clients[client_id], text)
+        elif kind == "ledger":
+            _, shard, change, local = message
+            for field, amount in change.items():
+                self.pool[field] += amount
+            self.local[shard] = local
+            self.awaiting -= 1
+            if not self.awaiting:
+                for field in SHARED_FIELDS:
+                    self.pool[field] = max(0, self.pool[field])
+                self.ticks += 1
+
+    # --- regions mode ticks ------------------------------------------
+
+    def _start_region_tick(self):
+        """Every shard runs against the same pool; their changes are summed
+        when the last one answers, so a resource two regions both draw on
+        can dip below zero within a tick and is clamped then.
+        """
+        self.awaiting = self.shard_count
+        for pipe in self.pipes:
+            pipe.send(("tick", dict(self.pool)))
+
+    def region_status(self):
+        local = {field: sum(values[field] for values in self.local.values()) for field in LOCAL_FIELDS}
+        ledger = " ".join(f"{field} {self.pool[field]:.0f}" for field in SHARED_FIELDS)
+        return (f"colony tick {self.ticks} shards {self.shard_count} | {ledger} | "
+                + " ".join(f"{field} {local[field]:.0f}" for field in LOCAL_FIELDS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded game server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--shards", type=int, help="Shard processes (default: one per core)")
+    parser.add_argument("--mode", choices=(ROOMS, REGIONS), default=ROOMS)
+    parser.add_argument("--tps", type=float, default=1.0, help="Simulation ticks per second")
+    args = parser.parse_args(argv)
+    server = ShardedServer(args.host, args.port, args.shards, args.mode, args.tps)
+    server.start()
+    print(f"Serving {args.mode} on port {server.port} with {server.shard_count} shards")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
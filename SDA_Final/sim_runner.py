@@ -0,0 +1,168 @@
+# sim_runner.py
+"""
+Fixed-rate simulation off the render thread.
+
+SimulationRunner calls a step function at tick_rate ticks per second on its
+own thread. After every tick it builds an immutable ColonySnapshot and
+publishes it by swapping one reference, so the renderer reads the latest
+complete state with no lock and can never see a tick half applied:
+
+    runner = SimulationRunner(step=game.simulation_tick,
+                              snapshot=lambda tick: take_snapshot(rm, em, tick),
+                              tick_rate=2.0)
+    runner.start()
+
+    # render thread, every frame
+    colony = runner.snapshot            # grab once, read it for the whole frame
+    draw(colony.food, colony.population, ...)
+    for notice in runner.drain_notices():
+        ...
+
+    # render thread changing the model
+    runner.submit(rm.build_structure, Hydroponic, (3, 4))   # applied before the next tick
+    with runner.exclusive():                                 # or wait for the thread
+        save_colony(path, rm, em)
+
+Render FPS and simulation TPS are independent: the client's clock limits
+frames, tick_rate limits ticks, and either can be changed while running.
+Without start() nothing runs on another thread; submit() then applies the
+change immediately and advance() can be called by hand, which is how the
+single-threaded client and headless tools use it.
+"""
+
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from queue import Empty, SimpleQueue
+
+from savegame import RESOURCE_FIELDS
+
+ColonySnapshot = namedtuple("ColonySnapshot", RESOURCE_FIELDS + ("tick", "structures", "active_events", "depletion", "state_hash"))
+
+
+def take_snapshot(resource_manager, event_manager=None, tick=0, tick_seconds=1.0):
+    """Copy the state the renderer reads into a ColonySnapshot
+    (depletion is seconds until each resource runs out, see forecast.py)
+    """
+    forecast = resource_manager.forecast(event_manager, tick_seconds)
+    return ColonySnapshot(
+        *(getattr(resource_manager, name) for name in RESOURCE_FIELDS),
+        tick=tick,
+        structures=len(resource_manager.structureList),
+        active_events=tuple(event_manager.active_events) if event_manager is not None else (),
+        depletion={resource: forecast.time_to_depletion(resource) for resource in forecast.depletion},
+        state_hash=resource_manager.state_hash,
+    )
+
+
+class SimulationRunner:
+    def __init__(self, step, snapshot, tick_rate=1.0, max_catch_up=5):
+        self.step = step  # step(now) -> iterable of notices, called once per tick
+        self.take_snapshot = snapshot  # snapshot(tick) -> ColonySnapshot
+        self.tick_rate = tick_rate  # ticks per second
+        self.max_catch_up = max_catch_up  # ticks run back to back after a stall before skipping ahead
+        self.tick = 0
+        self.snapshot = snapshot(0)
+        self.commands = SimpleQueue()
+        self.notices = deque()
+        self.lock = threading.Lock()  # held for the duration of every tick
+        self.thread = None
+        self.stop_flag = threading.Event()
+        self.tick_times = deque(maxlen=120)  # wall-clock start of recent ticks
+        self.last_tick_seconds = 0.0
+        self.error = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_flag.clear()
+        self.thread = threading.Thread(target=self._loop, name="simulation", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        if self.thread is None:
+            return
+        self.stop_flag.set()
+        self.thread.join(timeout)
+        self.thread = None
+        self.run_pending()  # nothing submitted before stop() is lost
+
+    def submit(self, fn, *args):
+        """Apply fn(*args) on the simulation thread before its next tick
+        (immediately when the runner is not started)
+        """
+        if self.running:
+            self.commands.put((fn, args))
+        else:
+            fn(*args)
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the simulation between ticks, for work that needs a result
+        straight away (saving, loading, anything that reads then writes)
+        """
+        with self.lock:
+            self.run_pending()
+            yield
+
+    def run_pending(self):
+        while True:
+            try:
+                fn, args = self.commands.get_nowait()
+            except Empty:
+                return
+            fn(*args)
+
+    def advance(self, now=None):
+        """Run one tick and publish its snapshot"""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            start = time.perf_counter()
+            self.run_pending()
+            notices = self.step(now)
+            self.tick += 1
+            snapshot = self.take_snapshot(self.tick)
+            self.last_tick_seconds = time.perf_counter() - start
+        if notices:
+            self.notices.extend(notices)
+        self.tick_times.append(now)
+        self.snapshot = snapshot  # the one write the renderer ever sees
+        return snapshot
+
+    def drain_notices(self):
+        notices = []
+        while self.notices:
+            notices.append(self.notices.popleft())
+        return notices
+
+    def measured_tps(self):
+        if len(self.tick_times) < 2:
+            return 0.0
+        span = self.tick_times[-1] - self.tick_times[0]
+        return (len(self.tick_times) - 1) / span if span > 0 else 0.0
+
+    def _loop(self):
+        next_tick = time.monotonic()
+        while not self.stop_flag.is_set():
+            interval = 1.0 / self.tick_rate
+            wait = next_tick - time.monotonic()
+            if wait > 0:
+                self.stop_flag.wait(wait)
+                continue
+            try:
+                self.advance()
+            except Exception:
+                # Keep ticking; a bad command or event should not freeze the colony
+                self.error = traceback.format_exc()
+                print("[simulation] tick failed:\n" + self.error)
+            next_tick += interval
+            behind = time.monotonic() - next_tick
+            if behind > interval * self.max_catch_up:
+                next_tick = time.monotonic()
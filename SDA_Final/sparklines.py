@@ -0,0 +1,111 @@
+# sparklines.py
+"""
+In-game sparkline panel for a TimeSeriesRecorder.
+
+Each resource keeps its own small surface. When the tier stores a new
+bucket the surface scrolls left by one column and only the new segment is
+drawn; the whole line is redrawn only when a value leaves the current
+vertical scale or the tier changes:
+
+    panel = SparklinePanel(history, ["food", "water", "energy"], font)
+    panel.draw(screen, (x, y))      # every frame, cheap when nothing is new
+    panel.set_tier("minute")
+"""
+
+import pygame
+
+LINE_COLORS = {
+    "food": (120, 220, 120),
+    "water": (90, 170, 255),
+    "energy": (255, 220, 80),
+    "marsOre": (220, 120, 80),
+    "materials": (200, 200, 200),
+    "manpower": (230, 150, 230),
+    "population": (255, 255, 255),
+    "populationLimit": (150, 150, 150),
+}
+
+
+class Sparkline:
+    def __init__(self, field, width, height):
+        self.field = field
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.color = LINE_COLORS.get(field, (255, 255, 255))
+        self.version = None  # tier version last drawn
+        self.low = self.high = 0.0
+        self.last_y = None
+
+    def _y(self, value):
+        h = self.surface.get_height() - 2
+        span = self.high - self.low or 1.0
+        return 1 + int(h - (value - self.low) / span * h)
+
+    def redraw(self, values):
+        width = self.surface.get_width()
+        values = values[-width:]
+        self.surface.fill((0, 0, 0, 0))
+        self.last_y = None
+        if not values:
+            return
+        low, high = min(values), max(values)
+        pad = (high - low) * 0.1 or 1.0
+        self.low, self.high = low - pad, high + pad
+        x0 = width - len(values)
+        points = [(x0 + i, self._y(v)) for i, v in enumerate(values)]
+        if len(points) > 1:
+            pygame.draw.lines(self.surface, self.color, False, points)
+        else:
+            self.surface.set_at(points[0], self.color)
+        self.last_y = points[-1][1]
+
+    def append(self, value):
+        """Scroll one column and draw the newest segment; False if out of scale"""
+        if self.last_y is None or not (self.low <= value <= self.high):
+            return False
+        width = self.surface.get_width()
+        self.surface.scroll(-1, 0)
+        self.surface.fill((0, 0, 0, 0), (width - 1, 0, 1, self.surface.get_height()))
+        y = self._y(value)
+        pygame.draw.line(self.surface, self.color, (width - 2, self.last_y), (width - 1, y))
+        self.last_y = y
+        return True
+
+
+class SparklinePanel:
+    def __init__(self, history, fields, font, width=220, row_height=28, tier="tick"):
+        self.history = history
+        self.font = font
+        self.width = width
+        self.row_height = row_height
+        self.tier = tier
+        self.lines = [Sparkline(field, width - 90, row_height - 6) for field in fields]
+
+    def set_tier(self, tier):
+        self.tier = tier
+        for line in self.lines:
+            line.version = None  # forces a full redraw
+
+    def refresh(self):
+        tier = self.history.tiers[self.tier]
+        for line in self.lines:
+            if line.version == tier.version:
+                continue
+            if line.version is not None and line.version == tier.version - 1 and line.append(tier.latest(line.field)):
+                line.version = tier.version
+                continue
+            line.redraw(tier.series(line.field))
+            line.version = tier.version
+
+    def draw(self, surf, pos):
+        self.refresh()
+        x, y = pos
+        height = self.row_height * len(self.lines) + 22
+        pygame.draw.rect(surf, (10, 10, 10), (x, y, self.width, height))
+        pygame.draw.rect(surf, (90, 90, 90), (x, y, self.width, height), 1)
+        surf.blit(self.font.render(f"History ({self.tier})", True, (220, 220, 220)), (x + 6, y + 4))
+        for i, line in enumerate(self.lines):
+            row_y = y + 20 + i * self.row_height
+            latest = self.history.latest(line.field, self.tier)
+            label = f"{line.field[:9]} {latest:.0f}" if latest is not None else line.field[:9]
+            surf.blit(self.font.render(label, True, line.color), (x + 6, row_y + 6))
+            surf.blit(line.surface, (x + 86, row_y + 2))
@@ -0,0 +1,485 @@
+# spectator.py
+"""
+Read-only spectator stream and fan-out relay.
+
+The host publishes its colony as a stream of small frames: a keyframe with
+the whole visible state every keyframe_interval captures, and deltas
+(changed ledger fields, placed and removed cells, event list) in between.
+Every frame is zlib-compressed on its own, so anything downstream can
+forward it byte for byte without decoding it:
+
+    host (SpectatorFeed) --> relay (SpectatorRelay) --> dozens of SpectatorClients
+                                 \\--> another relay --> more viewers
+
+    # host: capture from the render loop, never from the simulation
+    hub = FrameHub()
+    hub.serve("0.0.0.0", 5001)
+    feed = SpectatorFeed(hub)
+    feed.capture(tick, ledger, active_events, placed, placed.drain_changes())   # a few times a second
+
+    # relay process, with a 30 second broadcast delay
+    python spectator.py relay --upstream host:5001 --port 5001 --delay 30
+
+    # viewer
+    spectator = SpectatorClient()
+    spectator.connect("relay-host", 5001)
+    spectator.view().water, spectator.placed_copy()
+    spectator.take_changes()     # {(x, y): type or None} since the last call
+
+Spectators never send anything upstream. The host only compresses a frame
+per capture and hands the bytes to FrameHub, whose per-viewer threads do
+the sending; relays take even that off the host by holding the viewers.
+A late joiner receives the latest keyframe plus the deltas since. A viewer
+that falls too far behind is skipped to the next keyframe instead of
+buffering without bound. With delay > 0 a hub holds each frame back that
+long before anyone sees it.
+
+Frame layout: '<BI' (kind, payload length), then the zlib payload of a
+JSON object.
+"""
+
+import argparse
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+FRAME = struct.Struct("<BI")  # kind, payload length
+KEYFRAME = 1
+DELTA = 2
+MAX_PAYLOAD = 16 * 1024 * 1024
+# Preset dictionary: the keys every frame repeats, so even tiny deltas compress
+ZDICT = (b'{"tick": , "ledger": {"food": "water": "energy": "marsOre": "materials": "manpower": '
+         b'"population": "populationLimit": }, "placed": [], "removed": [], "events": []}')
+
+
+def encode_frame(kind, state):
+    compressor = zlib.compressobj(6, zdict=ZDICT)
+    payload = compressor.compress(json.dumps(state, separators=(",", ":")).encode("utf-8")) + compressor.flush()
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+def decode_payload(payload):
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    return json.loads(decompressor.decompress(payload, MAX_PAYLOAD))
+
+
+def read_frames(sock):
+    """Yield (kind, raw frame bytes, payload) from a socket until it closes"""
+    buf = b""
+    while True:
+        while len(buf) < FRAME.size:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return
+            buf += chunk
+        kind, length = FRAME.unpack_from(buf)
+        if length > MAX_PAYLOAD:
+            return
+        end = FRAME.size + length
+        while len(buf) < end:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return
+            buf += chunk
+        yield kind, buf[:end], buf[FRAME.size:end]
+        buf = buf[end:]
+
+
+class _Viewer:
+    """One downstream socket with its own bounded send queue and thread"""
+
+    def __init__(self, sock, backlog):
+        self.sock = sock
+        self.queue = queue.Queue(maxsize=backlog)
+        self.synced = False  # False until a keyframe is queued
+        self.alive = True
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+        self.thread.start()
+
+    def push(self, kind, frame):
+        if kind == KEYFRAME:
+            self.synced = True
+        elif not self.synced:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            # Too slow: drop the backlog and pick up again at the next keyframe
+            while not self.queue.empty():
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.synced = kind == KEYFRAME
+            if self.synced:
+                self.queue.put_nowait(frame)
+
+    def _send_loop(self):
+        try:
+            while self.alive:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                self.sock.sendall(frame)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.alive = False
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class FrameHub:
+    def __init__(self, delay=0.0, backlog=256):
+        self.delay = delay  # seconds every frame is held back
+        self.backlog = backlog  # frames queued per viewer before it is resynced
+        self.viewers = []
+        self.keyframe = None  # last released keyframe, for late joiners
+        self.since_keyframe = []  # deltas released after it
+        self.pending = deque()  # (release time, kind, frame) waiting out the delay
+        self.lock = threading.Lock()
+        self.listener = None
+        self.running = True
+        self.frames_out = 0
+        if delay > 0:
+            threading.Thread(target=self._pump, daemon=True).start()
+
+    def publish(self, kind, frame, now=None):
+        if now is None:
+            now = time.time()
+        if self.delay <= 0:
+            self._fan_out(kind, frame)
+            return
+        with self.lock:
+            self.pending.append((now + self.delay, kind, frame))
+
+    def release(self, now=None):
+        """Send every delayed frame whose time has come"""
+        if now is None:
+            now = time.time()
+        while True:
+            with self.lock:
+                if not self.pending or self.pending[0][0] > now:
+                    return
+                _, kind, frame = self.pending.popleft()
+            self._fan_out(kind, frame)
+
+    def _pump(self):
+        while self.running:
+            self.release()
+            time.sleep(0.05)
+
+    def _fan_out(self, kind, frame):
+        with self.lock:
+            if kind == KEYFRAME:
+                self.keyframe = frame
+                self.since_keyframe = []
+            else:
+                self.since_keyframe.append(frame)
+            self.viewers = [v for v in self.viewers if v.alive]
+            for viewer in self.viewers:
+                viewer.push(kind, frame)
+            self.frames_out += len(self.viewers)
+
+    def add_viewer(self, sock):
+        viewer = _Viewer(sock, self.backlog)
+        with self.lock:
+            if self.keyframe is not None:
+                viewer.push(KEYFRAME, self.keyframe)
+                for frame in self.since_keyframe:
+                    viewer.push(DELTA, frame)
+            self.viewers.append(viewer)
+        return viewer
+
+    def serve(self, host="0.0.0.0", port=5001):
+        """Accept viewers (or downstream relays) on a background thread"""
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(64)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.listener.getsockname()[1]
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.add_viewer(sock)
+
+    def viewer_count(self):
+        with self.lock:
+            return sum(1 for v in self.viewers if v.alive)
+
+    def close(self):
+        self.running = False
+        if self.listener:
+            try:
+                self.listener.close()
+            except OSError:
+                pass
+        with self.lock:
+            for viewer in self.viewers:
+                viewer.close()
+            self.viewers = []
+
+
+class SpectatorFeed:
+    def __init__(self, hub, keyframe_interval=30):
+        self.hub = hub
+        self.keyframe_interval = keyframe_interval  # captures between keyframes
+        self.ledger = {}
+        self.placed = {}
+        self.events = []
+        self.captures = 0
+
+    def capture(self, tick, ledger, events, placed, changes=None):
+        """Publish what changed since the last capture
+        Args:
+            tick (int): Simulation tick
+            ledger (dict): Resource name -> value
+            events (list): Active event names
+            placed (dict): (x, y) -> structure type
+            changes (dict): (x, y) -> type or None for the cells changed since
+                the last capture, e.g. ChunkedWorld.drain_changes(); None
+                compares all of placed
+        Returns:
+            int: Bytes published (0 if nothing changed)
+        """
+        events = list(events)
+        added, removed = self._diff(placed, changes)
+        if self.captures % self.keyframe_interval == 0:
+            # From the feed's own copy, so placed is not read in full again
+            self.ledger = dict(ledger)
+            self.events = events
+            kind = KEYFRAME
+            frame = encode_frame(kind, {
+                "tick": tick,
+                "ledger": self.ledger,
+                "placed": [[x, y, t] for (x, y), t in self.placed.items()],
+                "events": events,
+            })
+        else:
+            delta = {"tick": tick}
+            changed = {k: v for k, v in ledger.items() if self.ledger.get(k) != v}
+            if changed:
+                delta["ledger"] = changed
+                self.ledger.update(changed)
+            if added:
+                delta["placed"] = added
+            if removed:
+                delta["removed"] = removed
+            if events != self.events:
+                delta["events"] = events
+                self.events = events
+            if len(delta) == 1:
+                self.captures += 1
+                return 0
+            kind = DELTA
+            frame = encode_frame(kind, delta)
+        self.captures += 1
+        self.hub.publish(kind, frame)
+        return len(frame)
+
+    def _diff(self, placed, changes):
+        """Bring self.placed up to date; returns the ([x, y, type] added, [x, y] removed) cells"""
+        if changes is None or not self.captures:
+            current = dict(placed.items())
+            added = [[x, y, t] for (x, y), t in current.items() if self.placed.get((x, y)) != t]
+            removed = [[x, y] for (x, y) in self.placed if (x, y) not in current]
+            self.placed = current
+            return added, removed
+        added, removed = [], []
+        for (x, y), t in changes.items():
+            if t is None:
+                if self.placed.pop((x, y), None) is not None:
+                    removed.append([x, y])
+            elif self.placed.get((x, y)) != t:
+                self.placed[(x, y)] = t
+                added.append([x, y, t])
+        return added, removed
+
+
+class SpectatorRelay:
+    """Forward one upstream feed to many viewers, optionally delayed"""
+
+    def __init__(self, upstream_host, upstream_port, delay=0.0, backlog=256):
+        self.upstream = (upstream_host, upstream_port)
+        self.hub = FrameHub(delay, backlog)
+        self.frames_in = 0
+
+    def serve(self, host="0.0.0.0", port=5001):
+        port = self.hub.serve(host, port)
+        threading.Thread(target=self._upstream_loop, daemon=True).start()
+        return port
+
+    def _upstream_loop(self):
+        while self.hub.running:
+            try:
+                with socket.create_connection(self.upstream, timeout=5.0) as sock:
+                    sock.settimeout(None)
+                    for kind, frame, _ in read_frames(sock):
+                        self.frames_in += 1
+                        self.hub.publish(kind, frame)
+            except OSError:
+                pass
+            time.sleep(1.0)  # upstream gone: retry
+
+    def close(self):
+        self.hub.close()
+
+
+class SpectatorView:
+    """Attribute access to a spectator's ledger, like ResourceManager"""
+
+    def __init__(self, ledger):
+        self.__dict__.update(ledger)
+
+    def __getattr__(self, name):
+        return 0
+
+
+class SpectatorClient:
+    def __init__(self):
+        self.spectator_mode = False
+        self.socket = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.tick = 0
+        self.ledger = {}
+        self.placed = {}
+        self.changes = {}  # (x, y) -> type or None since take_changes
+        self.events = []
+        self.synced = False
+
+    @property
+    def connected(self):
+        return self.spectator_mode
+
+    def connect(self, host, port=5001):
+        self.disconnect()
+        try:
+            self.socket = socket.create_connection((host, port), timeout=4.0)
+            self.socket.settimeout(None)
+        except OSError as e:
+            self.socket = None
+            return False, str(e)
+        with self.lock:
+            self.placed, self.changes, self.synced = {}, {}, False
+        self.spectator_mode = True
+        self.thread = threading.Thread(target=self._recv_loop, daemon=True)
+        self.thread.start()
+        return True, None
+
+    def _recv_loop(self):
+        try:
+            for kind, _, payload in read_frames(self.socket):
+                self.apply(kind, decode_payload(payload))
+        except (OSError, ValueError, zlib.error):
+            pass
+        finally:
+            self.disconnect()
+
+    def apply(self, kind, state):
+        with self.lock:
+            if kind == KEYFRAME:
+                self.ledger = dict(state["ledger"])
+                placed = {(x, y): t for x, y, t in state["placed"]}
+                for cell in self.placed.keys() - placed.keys():
+                    self.changes[cell] = None
+                for cell, t in placed.items():
+                    if self.placed.get(cell) != t:
+                        self.changes[cell] = t
+                self.placed = placed
+                self.events = state["events"]
+                self.synced = True
+            elif self.synced:
+                self.ledger.update(state.get("ledger", {}))
+                for x, y in state.get("removed", ()):
+                    self.placed.pop((x, y), None)
+                    self.changes[(x, y)] = None
+                for x, y, t in state.get("placed", ()):
+                    self.placed[(x, y)] = t
+                    self.changes[(x, y)] = t
+                if "events" in state:
+                    self.events = state["events"]
+            self.tick = state["tick"]
+
+    def view(self):
+        with self.lock:
+            return SpectatorView(self.ledger)
+
+    def placed_copy(self):
+        with self.lock:
+            return dict(self.placed)
+
+    def take_changes(self):
+        """Cells placed or removed since the last call, {(x, y): type or None}"""
+        with self.lock:
+            changes, self.changes = self.changes, {}
+            return changes
+
+    def disconnect(self):
+        self.spectator_mode = False
+        if self.socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+        self.socket = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spectator relay and viewer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    relay = sub.add_parser("relay", help="Fan one upstream feed out to many viewers")
+    relay.add_argument("--upstream", required=True, help="host:port of the host feed or another relay")
+    relay.add_argument("--port", type=int, default=5001)
+    relay.add_argument("--delay", type=float, default=0.0, help="Broadcast delay in seconds")
+    watch = sub.add_parser("watch", help="Print the ledger of a spectated colony")
+    watch.add_argument("address", help="host:port of a relay or feed")
+    args = parser.parse_args()
+
+    if args.command == "relay":
+        host, port = args.upstream.rsplit(":", 1)
+        relay = SpectatorRelay(host, int(port), delay=args.delay)
+        print(f"[relay] serving on {relay.serve(port=args.port)}, upstream {args.upstream}, delay {args.delay}s")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"[relay] {relay.hub.viewer_count()} viewers, {relay.frames_in} frames in")
+        except KeyboardInterrupt:
+            relay.close()
+    else:
+        host, port = args.address.rsplit(":", 1)
+        spectator = SpectatorClient()
+        ok, err = spectator.connect(host, int(port))
+        if not ok:
+            raise SystemExit(f"connect failed: {err}")
+        try:
+            while spectator.connected:
+                time.sleep(1)
+                with spectator.lock:
+                    print(spectator.tick, spectator.ledger, len(spectator.placed), "structures")
+        except KeyboardInterrupt:
+            spectator.disconnect()
+
+
+if __name__ == "__main__":
+    main()
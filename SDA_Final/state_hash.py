@@ -0,0 +1,179 @@
+# state_hash.py
+"""
+Incremental (Zobrist-style) hash of the colony.
+
+Every structure and every ledger value has its own pseudo-random 64-bit
+key, and the colony hash is the XOR of the keys of everything in it.
+Placing or removing a structure XORs its key in or out, and changing a
+resource XORs out the key of the old amount and in the key of the new one,
+so the hash is kept up to date in O(1) per change, never by walking the
+colony:
+
+    resource_manager.state_hash          # current value, an int
+    resource_manager.tick_hash           # value after the last stepResources
+
+    # desync check: two peers that ran the same ticks must agree
+    if their_hash != resource_manager.tick_hash:
+        ...
+
+    # cache key: anything derived from the colony only
+    if key != resource_manager.state_hash:
+        key, value = resource_manager.state_hash, recompute()
+
+Ledger fields of ResourceManager are HashedField descriptors, so every
+write, including += in the simulation and setattr when loading a save, is
+hashed. rebuild() recomputes the same value from scratch, for checking.
+Equal hashes mean equal colonies with overwhelming probability, not
+certainty; two identical structures on one cell would cancel out, which
+placement never allows.
+"""
+
+import struct
+import zlib
+from itertools import chain
+from operator import attrgetter
+
+MASK = (1 << 64) - 1
+DOUBLE = struct.Struct("<d")
+BITS = struct.Struct("<Q")
+
+
+def mix64(x):
+    """splitmix64 finalizer: a well-spread 64-bit key from any 64-bit integer"""
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+def _mix64_array(np, v):
+    """mix64 over a uint64 array; NumPy's array arithmetic wraps like & MASK"""
+    v = v + np.uint64(0x9E3779B97F4A7C15)
+    v = (v ^ (v >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    v = (v ^ (v >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return v ^ (v >> np.uint64(31))
+
+
+def name_salt(name):
+    return mix64(zlib.crc32(name.encode("utf-8")))
+
+
+def structure_key(seed, structure_type, x, y):
+    return mix64(mix64(mix64(seed ^ name_salt(structure_type)) ^ (x & MASK)) ^ (y & MASK))
+
+
+def field_key(seed, salt, value):
+    # 5 and 5.0 hash alike; "or 0.0" folds -0.0 into 0.0
+    bits = BITS.unpack(DOUBLE.pack(float(value) or 0.0))[0]
+    return mix64(seed ^ salt ^ bits)
+
+
+class StateHash:
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._value = 0
+        self._bases = {}  # structure type -> mix64(seed ^ name_salt(type)), the first round of its keys
+        self._pending = []  # structure lists toggled by toggle_structures, keyed on the next read
+
+    @property
+    def value(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            for structures in pending:
+                self._value ^= self._keys(structures)
+        return self._value
+
+    def _base(self, structure_type):
+        base = self._bases.get(structure_type)
+        if base is None:
+            base = self._bases[structure_type] = mix64(self.seed ^ name_salt(structure_type))
+        return base
+
+    def toggle_structure(self, structure_type, location):
+        """XOR a structure in (placed) or out (removed); the same call does both"""
+        self._value ^= mix64(mix64(self._base(structure_type) ^ (location[0] & MASK)) ^ (location[1] & MASK))
+
+    def toggle_structures(self, structures):
+        """toggle_structure for every one of structures (a list it keeps). The
+        keys are worked out when value is next read, so a bulk load costs
+        nothing here; XOR does not care that later toggles come first.
+        """
+        self._pending.append(structures)
+
+    def _keys(self, structures):
+        """XOR of the keys of structures: structure_key with the type round
+        cached and mix64 inlined, or vectorized when NumPy is installed
+        """
+        if len(structures) >= 4096:
+            try:
+                import numpy
+            except ImportError:
+                pass
+            else:
+                return self._keys_array(numpy, structures)
+        bases = {}
+        value = 0
+        for structure in structures:
+            base = bases.get(structure.type)
+            if base is None:
+                base = bases[structure.type] = self._base(structure.type)
+            x, y = structure.location
+            v = (base ^ (x & MASK)) + 0x9E3779B97F4A7C15 & MASK
+            v = (v ^ (v >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+            v = (v ^ (v >> 27)) * 0x94D049BB133111EB & MASK
+            v = (v ^ (v >> 31) ^ (y & MASK)) + 0x9E3779B97F4A7C15 & MASK
+            v = (v ^ (v >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+            v = (v ^ (v >> 27)) * 0x94D049BB133111EB & MASK
+            value ^= v ^ (v >> 31)
+        return value
+
+    def _keys_array(self, np, structures):
+        types = list(map(attrgetter('type'), structures))
+        bases = {structure_type: self._base(structure_type) for structure_type in set(types)}
+        n = len(structures)
+        v = np.fromiter(map(bases.__getitem__, types), np.uint64, count=n)
+        # int64 viewed as uint64 is the same as & MASK
+        xy = np.fromiter(chain.from_iterable(map(attrgetter('location'), structures)), np.int64, count=2 * n).view(np.uint64)
+        v = _mix64_array(np, _mix64_array(np, v ^ xy[0::2]) ^ xy[1::2])
+        return int(np.bitwise_xor.reduce(v))
+
+    def change_field(self, salt, old, new):
+        if old is not None:
+            self._value ^= field_key(self.seed, salt, old)
+        self._value ^= field_key(self.seed, salt, new)
+
+    def rebuild(self, resource_manager):
+        """Recompute the hash of resource_manager from scratch, O(structures)
+        Returns:
+            int: The value the incremental hash should have
+        """
+        value = 0
+        for structure in resource_manager.structureList:
+            value ^= structure_key(self.seed, structure.type, structure.location[0], structure.location[1])
+        for field in vars(type(resource_manager)).values():
+            if isinstance(field, HashedField):
+                value ^= field_key(self.seed, field.salt, getattr(resource_manager, field.name))
+        return value
+
+    def hex(self):
+        return f"{self.value:016x}"
+
+
+class HashedField:
+    """Ledger attribute that keeps its owner's StateHash (owner.zobrist) current"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.salt = name_salt(name)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.__dict__[self.name]
+
+    def __set__(self, instance, value):
+        values = instance.__dict__
+        state = values.get("zobrist")
+        if state is not None:
+            state.change_field(self.salt, values.get(self.name), value)
+        values[self.name] = value
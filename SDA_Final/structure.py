@@ -3,7 +3,11 @@
 How to use Structure classes in your main game:
 
 1. Importing the necessary classes:
-   from structure import Hydroponic, WaterHarvester, Mine, SolarPanel, Dome
+   from structure import Hydroponic, WaterHarvester, Mine, Refinery, SolarPanel, Dome
+
+   # Or look a class up by its type identifier
+   from structure import STRUCTURE_TYPES
+   STRUCTURE_TYPES['S']  # SolarPanel
 
 2. Creating structures:
    # Structures need a location tuple (x, y) when created
@@ -21,15 +25,22 @@ How to use Structure classes in your main game:
    # If you have a list of all structures
    all_structures = [solar_panel, hydroponic, water_harvester]
    counts = Structure.count_structure_types(all_structures)
-   # counts will return: {'H': 1, 'W': 1, 'M': 0, 'S': 1, 'D': 0}
+   # counts will return: {'H': 1, 'W': 1, 'M': 0, 'F': 0, 'S': 1, 'D': 0, 'T': 0}
 
 5. Structure Properties:
-   - Each structure has a type identifier (H, W, M, S, D)
-   - Production rates are predefined for each type
+   - Each structure has a type identifier (H, W, M, F, S, D, T)
+   - A Refinery turns Mars Ore from Mines into materials
+   - Production rates are predefined for each type, as read-only tables
+     shared by every instance (structures use __slots__, so a type's rates
+     and image are never copied per structure)
    - Structures require manpower to operate
    - Structures can be enabled/disabled (self.enabled)
    - Efficiency can be modified (self.efficiency_modifiers)
+   - Higher scheduling_priority types get workers and inputs first
+   - run_fraction throttles a single structure (1.0 = full speed)
    - Domes have population capacity management
+   - Roads carry ore from Mines to Refineries when a colony uses
+     logistics (see logistics.py)
 
 6. Example of full implementation:
    # In your main game loop:
@@ -39,8 +50,9 @@ How to use Structure classes in your main game:
    new_solar = SolarPanel((10, 20))
    structures.append(new_solar)
    
-   # Loading images (if using pygame)
-   new_solar.load_image("path/to/solar_image.png")
+   # Loading images (if using pygame) - the surface is shared by every
+   # SolarPanel, so this only needs doing once per type
+   SolarPanel.load_image("path/to/solar_image.png")
    
    # Getting production counts
    structure_counts = Structure.count_structure_types(structures)
@@ -51,19 +63,27 @@ How to use Structure classes in your main game:
        dome.add_population(5)
 
 Note: The Structure system is designed to work with ResourceManager
-for handling resource production and consumption cycles.
+for handling resource production and consumption cycles. It does not
+import pygame; load_image goes through render_adapter only when called,
+so structures can be simulated headless.
 """
 
-import pygame
 import os
+from types import MappingProxyType
 
 class Structure:
-    def __init__(self, structure_type, location):
-        self.type = structure_type
+    # Per-instance state only; everything that is the same for a whole type
+    # (identifier, rates, image) is a class attribute shared by every instance.
+    __slots__ = ('location', 'enabled')
+
+    type = None
+    scheduling_priority = 1
+    image = None  # shared per-type surface, see load_image
+    image_path = None
+
+    def __init__(self, location):
         self.location = location
-        self.image = None
         self.enabled = True
-        self.scheduling_priority = 1
     
     @staticmethod
     def count_structure_types(structures):
@@ -78,8 +98,10 @@ class Structure:
             'H': 0,  # Hydroponic
             'W': 0,  # WaterHarvester
             'M': 0,  # Mine
+            'F': 0,  # Refinery
             'S': 0,  # SolarPanel
-            'D': 0   # Dome
+            'D': 0,  # Dome
+            'T': 0   # Road
         }
         
         for structure in structures:
@@ -88,10 +110,18 @@ class Structure:
                 
         return structure_counts
         
-    def load_image(self, image_path):
+    @classmethod
+    def load_image(cls, image_path):
+        """Load the image shared by every structure of this type
+        Only the first call for a given path decodes the file.
+        """
+        if cls.image is not None and cls.image_path == image_path:
+            return True
         if os.path.exists(image_path):
             try:
-                self.image = pygame.image.load(image_path).convert_alpha()
+                from render_adapter import load_surface
+                cls.image = load_surface(image_path)
+                cls.image_path = image_path
                 return True
             except Exception:
                 return False
@@ -102,11 +132,17 @@ class Structure:
     def tick(self): pass
 
 class Harvester(Structure):
-    def __init__(self, structure_type, location):
-        super().__init__(structure_type, location)
-        self.production_rates = {}
-        self.consumption_rates = {}
-        self.manpower_required = 0
+    __slots__ = ('run_fraction', 'efficiency_modifiers')
+
+    # Read-only rate tables, one per type
+    production_rates = MappingProxyType({})
+    consumption_rates = MappingProxyType({})
+    manpower_required = 0
+
+    def __init__(self, location):
+        # Structure.__init__ inlined: harvesters are built in bulk on load
+        self.location = location
+        self.enabled = True
         self.run_fraction = 1.0
         self.efficiency_modifiers = 1.0
         
@@ -125,40 +161,53 @@ class Harvester(Structure):
         return actual_consumption
 
 class Hydroponic(Harvester):
-    def __init__(self, location):
-        super().__init__('H', location)
-        self.production_rates = {'food': 3}
-        self.consumption_rates = {'water': 1, 'energy': 1}
-        self.manpower_required = 2
+    __slots__ = ()
+    type = 'H'
+    production_rates = MappingProxyType({'food': 3})
+    consumption_rates = MappingProxyType({'water': 1, 'energy': 1})
+    manpower_required = 2
+    scheduling_priority = 2
 
 class WaterHarvester(Harvester):
-    def __init__(self, location):
-        super().__init__('W', location)
-        self.production_rates = {'water': 4}
-        self.consumption_rates = {'energy': 1}
-        self.manpower_required = 1
+    __slots__ = ()
+    type = 'W'
+    production_rates = MappingProxyType({'water': 4})
+    consumption_rates = MappingProxyType({'energy': 1})
+    manpower_required = 1
+    scheduling_priority = 2
 
 class Mine(Harvester):
-    def __init__(self, location):
-        super().__init__('M', location)
-        self.production_rates = {'marsOre': 4}
-        self.consumption_rates = {'energy': 2}
-        self.manpower_required = 3
+    __slots__ = ()
+    type = 'M'
+    production_rates = MappingProxyType({'marsOre': 4})
+    consumption_rates = MappingProxyType({'energy': 2})
+    manpower_required = 3
+
+class Refinery(Harvester):
+    __slots__ = ()
+    type = 'F'
+    production_rates = MappingProxyType({'materials': 1})
+    consumption_rates = MappingProxyType({'marsOre': 2, 'energy': 1})
+    manpower_required = 2
 
 class SolarPanel(Harvester):
-    def __init__(self, location):
-        super().__init__('S', location)
-        self.production_rates = {'energy': 5}
-        self.consumption_rates = {}
-        self.manpower_required = 1
+    __slots__ = ()
+    type = 'S'
+    production_rates = MappingProxyType({'energy': 5})
+    consumption_rates = MappingProxyType({})
+    manpower_required = 1
+    scheduling_priority = 3  # Power first, everything else needs it
 
 class Dome(Structure):
+    __slots__ = ('population',)
+    type = 'D'
+    capacity = 10
+    consumption_rates = MappingProxyType({'food': 2, 'water': 2, 'energy': 1})
+    production_rates = MappingProxyType({'manpower': 2})
+
     def __init__(self, location):
-        super().__init__('D', location)
-        self.capacity = 10
+        super().__init__(location)
         self.population = 0
-        self.consumption_rates = {'food': 2, 'water': 2, 'energy': 1}
-        self.production_rates = {'manpower': 2}
         
     def can_accommodate(self, additional_people=1):
         return self.population + additional_people <= self.capacity
@@ -167,4 +216,19 @@ class Dome(Structure):
         if self.can_accommodate(count):
             self.population += count
             return True
-        return False
\ No newline at end of file
+        return False
+
+class Road(Structure):
+    __slots__ = ()
+    type = 'T'  # 'R' is the client's remove tool
+
+# Structure classes by type identifier, as used by the build menu and /place
+STRUCTURE_TYPES = {
+    'H': Hydroponic,
+    'W': WaterHarvester,
+    'M': Mine,
+    'F': Refinery,
+    'S': SolarPanel,
+    'D': Dome,
+    'T': Road
+}
\ No newline at end of file
@@ -0,0 +1,117 @@
+# supply.py
+"""
+Rocket supply runs for the Launchpad.
+
+A supply run is a Shipment that is scheduled now and arrives after a fixed
+flight time. Every launch costs launch_cost (fuel and hull ore), debited
+from the colony's ledger when it is scheduled, so supply runs turn energy
+and ore into food and water rather than coming free. Shipments in flight
+sit in a heap keyed by arrival time, so a frame where nothing has landed
+only looks at the head of the heap:
+
+    schedule = SupplySchedule(rocket_capacity=100, max_in_flight=3)
+    ok, message = schedule.schedule({'food': 40, 'water': 40}, ledger=resource_manager)
+
+    # every frame
+    cargo = schedule.collect_arrivals()
+    if cargo:
+        resource_manager.addResources(cargo)
+"""
+
+import heapq
+import time
+
+LAUNCH_COST = {'energy': 50, 'marsOre': 20}  # per launch, whatever the cargo
+
+
+class Shipment:
+    def __init__(self, cargo, launch_time, arrival_time):
+        self.cargo = dict(cargo)
+        self.launch_time = launch_time
+        self.arrival_time = arrival_time
+
+    @property
+    def payload(self):
+        return sum(self.cargo.values())
+
+
+class SupplySchedule:
+    def __init__(self, rocket_capacity=100, max_in_flight=3, flight_time=20, launch_cost=None):
+        self.rocket_capacity = rocket_capacity  # cargo units per rocket
+        self.max_in_flight = max_in_flight
+        self.flight_time = flight_time  # seconds
+        self.launch_cost = dict(LAUNCH_COST if launch_cost is None else launch_cost)
+        self._in_flight = []  # heap of (arrival_time, seq, Shipment)
+        self._seq = 0
+
+    def validate_shipment(self, cargo):
+        """Check a cargo manifest against the capacity model
+        Args:
+            cargo (dict): Resource name -> amount
+        Returns:
+            tuple: (bool, message)
+        """
+        if not cargo or any(amount <= 0 for amount in cargo.values()):
+            return False, "Empty cargo"
+        if sum(cargo.values()) > self.rocket_capacity:
+            return False, f"Cargo exceeds rocket capacity of {self.rocket_capacity}"
+        if len(self._in_flight) >= self.max_in_flight:
+            return False, "No rockets available"
+        return True, "Valid"
+
+    def schedule(self, cargo, now=None, flight_time=None, ledger=None):
+        """Schedule a supply run
+        Args:
+            cargo (dict): Resource name -> amount
+            now (float): Launch time, defaults to time.time()
+            flight_time (float): Overrides the default flight time
+            ledger: ResourceManager that pays launch_cost; the run is refused
+                if it cannot
+        Returns:
+            tuple: (bool, message)
+        """
+        valid, message = self.validate_shipment(cargo)
+        if not valid:
+            return False, message
+        if ledger is not None:
+            if not ledger.can_afford(self.launch_cost):
+                cost = ", ".join(f"{amount} {resource}" for resource, amount in self.launch_cost.items())
+                return False, f"A launch costs {cost}"
+            ledger.subtractResources(self.launch_cost)
+
+        if now is None:
+            now = time.time()
+        if flight_time is None:
+            flight_time = self.flight_time
+        shipment = Shipment(cargo, now, now + flight_time)
+        heapq.heappush(self._in_flight, (shipment.arrival_time, self._seq, shipment))
+        self._seq += 1
+        return True, "Shipment scheduled"
+
+    def next_arrival(self):
+        """Return the arrival time of the next shipment, or None"""
+        return self._in_flight[0][0] if self._in_flight else None
+
+    def collect_arrivals(self, now=None):
+        """Pop every shipment that has arrived and merge their cargo
+        Args:
+            now (float): Current time, defaults to time.time()
+        Returns:
+            dict: Combined cargo of all arrivals (empty if none landed)
+        """
+        if not self._in_flight:
+            return {}
+        if now is None:
+            now = time.time()
+        if self._in_flight[0][0] > now:
+            return {}
+
+        cargo = {}
+        while self._in_flight and self._in_flight[0][0] <= now:
+            _, _, shipment = heapq.heappop(self._in_flight)
+            for resource, amount in shipment.cargo.items():
+                cargo[resource] = cargo.get(resource, 0) + amount
+        return cargo
+
+    def __len__(self):
+        return len(self._in_flight)
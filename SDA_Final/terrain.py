@@ -0,0 +1,198 @@
+# terrain.py
+"""
+Procedural Mars terrain.
+
+Elevation, ice deposits and ore richness come from fractal value noise,
+computed with NumPy for a whole chunk (world.CHUNK_SIZE cells square) at
+a time. A chunk depends only on the seed and its coordinates, so chunks
+are generated lazily in any order, line up seamlessly, and are memoized
+by (seed, chunk):
+
+    terrain = load_terrain(seed=7)       # None when NumPy is not installed
+    elevation, ice, ore = terrain.cell(10, 4)
+    terrain.multiplier("M", 10, 4)       # Mine output factor from ore richness
+
+    # render thread: never waits for generation
+    terrain.request(cx, cy)              # queue chunks coming into view
+    terrain.generate_pending(0.002)      # spend at most 2 ms per frame
+    colors = terrain.ready_colors(cx, cy)   # (size, size, 3) uint8, or None
+
+Mines yield 0.5x to 1.5x by ore richness and water harvesters by ice, 1x
+on average ground; the factor goes into the structure's
+efficiency_modifiers when it is added to a ResourceManager that has a
+terrain (see ResourceManager.set_terrain).
+
+NumPy is imported only when a Terrain is created, so the rest of the game
+starts, and runs, without it.
+"""
+
+import time
+from collections import OrderedDict, namedtuple
+
+from world import CHUNK_SIZE
+
+TerrainChunk = namedtuple("TerrainChunk", ("elevation", "ice", "ore"))
+
+# structure type -> (field, output at 0, output at 1)
+YIELD_FIELDS = {
+    "M": ("ore", 0.5, 1.5),
+    "W": ("ice", 0.5, 1.5),
+}
+
+
+def load_terrain(seed=0, **options):
+    """A Terrain, or None if NumPy is missing"""
+    try:
+        return Terrain(seed, **options)
+    except ImportError:
+        return None
+
+
+class Terrain:
+    def __init__(self, seed=0, chunk_size=CHUNK_SIZE, max_chunks=1024):
+        import numpy
+        self.np = numpy
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks  # memoized chunks; 12 KB each at 32x32
+        self.chunks = OrderedDict()  # (seed, cx, cy) -> TerrainChunk, least recently used first
+        self.colors = OrderedDict()  # same keys -> uint8 colour arrays
+        self.pending = OrderedDict()  # (cx, cy) queued by request()
+
+    # --- noise -------------------------------------------------------
+
+    def _lattice(self, salt, ix, iy):
+        """Uniform [0, 1) value per integer lattice point (splitmix64 of the coordinates)"""
+        np = self.np
+        with np.errstate(over="ignore"):
+            h = (ix.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+                 ^ iy.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+                 ^ np.uint64((self.seed * 0x632BE59BD9B4E019 + salt) & 0xFFFFFFFFFFFFFFFF))
+            h ^= h >> np.uint64(30)
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(27)
+            h *= np.uint64(0x94D049BB133111EB)
+            h ^= h >> np.uint64(31)
+        return (h >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def _fbm(self, salt, xs, ys, scale, octaves):
+        """Fractal value noise in [0, 1] at world cells xs, ys"""
+        np = self.np
+        total = np.zeros(xs.shape)
+        amplitude, norm = 1.0, 0.0
+        frequency = 1.0 / scale
+        for octave in range(octaves):
+            x, y = xs * frequency, ys * frequency
+            x0, y0 = np.floor(x), np.floor(y)
+            tx, ty = x - x0, y - y0
+            tx = tx * tx * (3 - 2 * tx)  # smoothstep
+            ty = ty * ty * (3 - 2 * ty)
+            ix, iy = x0.astype(np.int64), y0.astype(np.int64)
+            layer = salt * 16 + octave
+            v00 = self._lattice(layer, ix, iy)
+            v10 = self._lattice(layer, ix + 1, iy)
+            v01 = self._lattice(layer, ix, iy + 1)
+            v11 = self._lattice(layer, ix + 1, iy + 1)
+            top = v00 + (v10 - v00) * tx
+            bottom = v01 + (v11 - v01) * tx
+            total += amplitude * (top + (bottom - top) * ty)
+            norm += amplitude
+            amplitude *= 0.5
+            frequency *= 2.0
+        return total / norm
+
+    def _generate(self, cx, cy):
+        np = self.np
+        size = self.chunk_size
+        ys, xs = np.mgrid[0:size, 0:size].astype(np.float64)
+        xs += cx * size + 0.5
+        ys += cy * size + 0.5
+        elevation = self._fbm(1, xs, ys, 96.0, 5)
+        # Ice collects in low ground, ore is richest on the highlands
+        ice = np.clip(0.5 + (self._fbm(2, xs, ys, 24.0, 3) - 0.5) * 2.5 + (0.5 - elevation) * 1.5, 0.0, 1.0)
+        ore = np.clip(0.5 + (self._fbm(3, xs, ys, 16.0, 3) - 0.5) * 2.5 + (elevation - 0.5) * 1.5, 0.0, 1.0)
+        return TerrainChunk(elevation.astype(np.float32), ice.astype(np.float32), ore.astype(np.float32))
+
+    # --- chunks ------------------------------------------------------
+
+    def chunk(self, cx, cy):
+        """Terrain of chunk (cx, cy), generated now if it is not memoized"""
+        key = (self.seed, cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self._generate(cx, cy)
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def cell(self, x, y):
+        """(elevation, ice, ore) of one cell, each in [0, 1]"""
+        size = self.chunk_size
+        chunk = self.chunk(x // size, y // size)
+        i, j = y % size, x % size
+        return float(chunk.elevation[i, j]), float(chunk.ice[i, j]), float(chunk.ore[i, j])
+
+    def multiplier(self, structure_type, x, y):
+        """Output factor of a structure_type on cell (x, y); 1.0 for types terrain does not affect"""
+        spec = YIELD_FIELDS.get(structure_type)
+        if spec is None:
+            return 1.0
+        field, low, high = spec
+        size = self.chunk_size
+        value = getattr(self.chunk(x // size, y // size), field)[y % size, x % size]
+        return low + (high - low) * float(value)
+
+    def affects(self, structure_type):
+        return structure_type in YIELD_FIELDS
+
+    def apply(self, structure):
+        """Set a structure's efficiency_modifiers from the ground under it"""
+        if structure.type in YIELD_FIELDS:
+            structure.efficiency_modifiers = self.multiplier(structure.type, *structure.location)
+
+    # --- rendering ---------------------------------------------------
+
+    def request(self, cx, cy):
+        """Queue a chunk for generate_pending"""
+        if (self.seed, cx, cy) not in self.colors:
+            self.pending[(cx, cy)] = None
+
+    def generate_pending(self, budget=0.002):
+        """Generate queued chunks until budget seconds have passed
+        Returns:
+            int: Chunks generated
+        """
+        deadline = time.perf_counter() + budget
+        done = 0
+        while self.pending and time.perf_counter() < deadline:
+            (cx, cy), _ = self.pending.popitem(last=False)
+            self._colorize(cx, cy)
+            done += 1
+        return done
+
+    def ready_colors(self, cx, cy):
+        """Colour array of a chunk if it has been generated, else None (and queue it)"""
+        key = (self.seed, cx, cy)
+        colors = self.colors.get(key)
+        if colors is None:
+            self.request(cx, cy)
+        else:
+            self.colors.move_to_end(key)
+        return colors
+
+    def _colorize(self, cx, cy):
+        np = self.np
+        chunk = self.chunk(cx, cy)
+        e, ice, ore = chunk.elevation, chunk.ice, chunk.ore
+        # Rust plains and highlands, darkened by ore, frosted where ice is rich
+        frost = np.clip((ice - 0.65) * 1.5, 0.0, 0.5)
+        r = (95 + 110 * e) * (1 - 0.35 * ore)
+        g = (40 + 55 * e) * (1 - 0.2 * ore)
+        b = (25 + 30 * e) * (1 - 0.1 * ore) + 25 * ore
+        colors = np.stack([r + (215 - r) * frost, g + (225 - g) * frost, b + (235 - b) * frost], axis=-1)
+        key = (self.seed, cx, cy)
+        self.colors[key] = np.clip(colors, 0, 255).astype(np.uint8)
+        if len(self.colors) > self.max_chunks:
+            self.colors.popitem(last=False)
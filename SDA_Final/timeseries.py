@@ -0,0 +1,141 @@
+# timeseries.py
+"""
+Fixed-memory resource history.
+
+TimeSeriesRecorder samples the ledger once per tick into ring buffers at
+several resolutions. Each tier averages the samples of one bucket before
+storing it, so the per-tick tier covers the last hour in full detail while
+coarser tiers cover days at a fraction of the memory. Memory is allocated
+up front and never grows, however long the session runs:
+
+    history = TimeSeriesRecorder(tick_seconds=1.0)
+    ...
+    resource_manager.stepResources()
+    history.record(resource_manager)
+
+    history.series("water", "minute")   # oldest first
+    history.export_csv("history.csv", "hour")
+
+Default tiers (name, seconds per bucket, buckets kept):
+    tick    0     3600    every tick; the last hour at 1 tick/s
+    minute  60    1440    last day
+    hour    3600  720     last 30 days
+
+With 8 fields that is under 500 KB of doubles in total.
+"""
+
+import csv
+import json
+from array import array
+
+from savegame import RESOURCE_FIELDS
+
+DEFAULT_TIERS = (
+    ("tick", 0, 3600),  # 0: every tick, whatever the tick rate
+    ("minute", 60, 1440),
+    ("hour", 3600, 720),
+)
+
+
+class Tier:
+    """One resolution: a ring of bucket averages per field"""
+
+    def __init__(self, name, bucket_ticks, capacity, fields):
+        self.name = name
+        self.bucket_ticks = bucket_ticks
+        self.capacity = capacity
+        self.fields = fields
+        self.rings = {field: array('d', bytes(8 * capacity)) for field in fields}
+        self.head = 0  # next slot to write
+        self.count = 0  # filled slots, up to capacity
+        self.version = 0  # bumped on every stored bucket, for incremental redraws
+        self.first_tick = 0  # tick of the oldest stored bucket's first sample
+        self.sums = dict.fromkeys(fields, 0.0)
+        self.pending = 0  # samples summed into the current bucket
+
+    def add(self, values, tick):
+        """Add one sample; returns True if it completed a bucket"""
+        sums = self.sums
+        for field in self.fields:
+            sums[field] += values[field]
+        self.pending += 1
+        if self.pending < self.bucket_ticks:
+            return False
+
+        head = self.head
+        for field in self.fields:
+            self.rings[field][head] = sums[field] / self.pending
+            sums[field] = 0.0
+        self.pending = 0
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.first_tick = tick + 1 - self.count * self.bucket_ticks
+        self.version += 1
+        return True
+
+    def series(self, field):
+        """Stored bucket averages for field, oldest first"""
+        ring = self.rings[field]
+        if self.count < self.capacity:
+            return ring[:self.count].tolist()
+        return ring[self.head:].tolist() + ring[:self.head].tolist()
+
+    def latest(self, field):
+        if not self.count:
+            return None
+        return self.rings[field][self.head - 1]
+
+
+class TimeSeriesRecorder:
+    def __init__(self, fields=RESOURCE_FIELDS, tiers=DEFAULT_TIERS, tick_seconds=1.0):
+        self.fields = tuple(fields)
+        self.tick_seconds = tick_seconds
+        self.tick = 0
+        self.tiers = {}
+        for name, seconds, capacity in tiers:
+            bucket_ticks = max(1, round(seconds / tick_seconds))
+            self.tiers[name] = Tier(name, bucket_ticks, capacity, self.fields)
+
+    def record(self, ledger):
+        """Sample every field of ledger (a ResourceManager or snapshot)"""
+        values = {field: float(getattr(ledger, field)) for field in self.fields}
+        for tier in self.tiers.values():
+            tier.add(values, self.tick)
+        self.tick += 1
+
+    def series(self, field, tier="tick"):
+        return self.tiers[tier].series(field)
+
+    def latest(self, field, tier="tick"):
+        return self.tiers[tier].latest(field)
+
+    def memory_bytes(self):
+        return sum(tier.capacity * 8 * len(self.fields) for tier in self.tiers.values())
+
+    def rows(self, tier="tick"):
+        """Yield (tick, seconds, {field: value}) for each stored bucket, oldest first"""
+        t = self.tiers[tier]
+        columns = {field: t.series(field) for field in self.fields}
+        for i in range(t.count):
+            tick = t.first_tick + i * t.bucket_ticks
+            yield tick, tick * self.tick_seconds, {field: columns[field][i] for field in self.fields}
+
+    def export_csv(self, path, tier="tick"):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tick", "seconds", *self.fields])
+            for tick, seconds, values in self.rows(tier):
+                writer.writerow([tick, round(seconds, 3), *(round(values[field], 4) for field in self.fields)])
+
+    def export_json(self, path):
+        """Every tier, as columns, in one document"""
+        document = {"tick_seconds": self.tick_seconds, "ticks_recorded": self.tick, "tiers": {}}
+        for name, tier in self.tiers.items():
+            document["tiers"][name] = {
+                "bucket_ticks": tier.bucket_ticks,
+                "first_tick": tier.first_tick,
+                "series": {field: tier.series(field) for field in self.fields},
+            }
+        with open(path, "w") as f:
+            json.dump(document, f)
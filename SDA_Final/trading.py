@@ -2,16 +2,18 @@
 import time
 
 class Trading:
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.clock = clock if clock is not None else time.time  # a tick clock in lockstep
         self.price_people = 100
         self.price_materials = 50
         self.cool_down_length = 30  # seconds
         self.time_last_trade = 0
         self.available_resources = {}
         self.rocket_present = False
+        self.journal = None  # Journal recording trades, see journal.py
         
     def can_trade(self):
-        current_time = time.time()
+        current_time = self.clock()
         return current_time - self.time_last_trade >= self.cool_down_length
         
     def validate_trade(self, resource_type, amount, available_resources):
@@ -37,5 +39,7 @@ class Trading:
             return False, message
             
         # Apply trade logic here
-        self.time_last_trade = time.time()
+        if self.journal is not None:
+            self.journal.record("trade", resource_type, amount)
+        self.time_last_trade = self.clock()
         return True, "Trade successful"
\ No newline at end of file
@@ -0,0 +1,251 @@
+# undo.py
+"""
+Undo and redo of building.
+
+Every place, build and remove the player makes is recorded as a Change:
+the cells it touched, encoded like a blueprint (see blueprints.py), plus
+the ledger deltas it caused, such as the materials a build cost. Undoing a
+build removes what it put down and refunds the cost; undoing a removal
+puts the structures back:
+
+    history = UndoHistory()
+    built = resource_manager.build_structures(placements)
+    history.record("place", [(s.type, s.location) for s in built], {"materials": -10 * len(built)})
+    history.seal()                 # e.g. on mouse up; see coalescing below
+
+    ok, message = history.undo(resource_manager)
+    ok, message = history.redo(resource_manager)
+
+    # multiplayer: one line reverses the whole change on every client
+    change = history.pop_undo()
+    network_client.send(inverse_message(change))   # "/unstamp ..." or "/stamp ..."
+
+Records of the same kind within coalesce_seconds of each other, with no
+seal() in between, join one Change, so one drag across fifty cells is one
+undo. A sealed Change keeps only its blueprint code (a 10x10 block is a
+few dozen bytes), and the oldest changes are forgotten once undo and redo
+together pass budget_bytes. Undo only touches cells that still hold what
+the change left there, and refunds that share of the cost.
+"""
+
+import time
+from collections import deque
+
+from blueprints import Blueprint, stamp_message, unstamp_message
+from structure import STRUCTURE_TYPES
+
+PLACE = "place"
+REMOVE = "remove"
+CHANGE_OVERHEAD = 200  # bytes per Change beyond its code, roughly
+
+
+class Change:
+    __slots__ = ('kind', 'x', 'y', 'code', 'count', 'cells', 'ledger', 'time')
+
+    def __init__(self, kind, cells, ledger, now):
+        self.kind = kind  # PLACE: structures added, REMOVE: structures taken away
+        self.cells = list(cells)  # (structure type, (x, y)) while open, None once sealed
+        self.ledger = dict(ledger or {})  # resource -> total change the command made
+        self.time = now
+        self.x = self.y = 0
+        self.code = None
+        self.count = 0
+
+    def seal(self):
+        """Encode the cells as a blueprint and drop the list"""
+        if self.cells is None:
+            return
+        self.count = len(self.cells)
+        self.x = min(location[0] for _, location in self.cells)
+        self.y = min(location[1] for _, location in self.cells)
+        self.code = Blueprint([(x - self.x, y - self.y, t) for t, (x, y) in self.cells]).encode()
+        self.cells = None
+
+    def blueprint(self):
+        self.seal()
+        return Blueprint.decode(self.code)
+
+    def placements(self):
+        """(structure type, (x, y)) for every cell"""
+        if self.cells is not None:
+            return list(self.cells)
+        return [(t, (self.x + dx, self.y + dy)) for dx, dy, t in self.blueprint().cells]
+
+    @property
+    def nbytes(self):
+        if self.cells is not None:
+            return CHANGE_OVERHEAD + 48 * len(self.cells)
+        return CHANGE_OVERHEAD + len(self.code)
+
+
+class UndoHistory:
+    def __init__(self, budget_bytes=256 * 1024, coalesce_seconds=0.75, clock=time.monotonic):
+        """
+        Args:
+            budget_bytes (int): Memory kept for undo and redo together
+            coalesce_seconds (float): Records this close together (and unsealed) join one Change
+            clock (callable): Time source for coalescing
+        """
+        self.budget_bytes = budget_bytes
+        self.coalesce_seconds = coalesce_seconds
+        self.clock = clock
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0  # of the sealed changes on both stacks
+
+    def record(self, kind, cells, ledger=None):
+        """Note a change the player made
+        Args:
+            kind (str): PLACE or REMOVE
+            cells (list): (structure type, (x, y)) of every structure placed or removed
+            ledger (dict): Resource -> change it caused, e.g. {"materials": -10}
+        """
+        cells = [(t, tuple(location)) for t, location in cells]
+        if not cells:
+            return
+        now = self.clock()
+        last = self.undo_stack[-1] if self.undo_stack else None
+        self._clear_redo()
+        if last is not None and last.cells is not None and last.kind == kind and now - last.time <= self.coalesce_seconds:
+            last.cells.extend(cells)
+            for resource, amount in (ledger or {}).items():
+                last.ledger[resource] = last.ledger.get(resource, 0) + amount
+            last.time = now
+            return
+        self.seal()
+        self.undo_stack.append(Change(kind, cells, ledger, now))
+
+    def seal(self):
+        """Close the open Change, so the next record starts a new one"""
+        if self.undo_stack and self.undo_stack[-1].cells is not None:
+            change = self.undo_stack[-1]
+            change.seal()
+            self.nbytes += change.nbytes
+            self._trim()
+
+    def _trim(self):
+        while self.nbytes > self.budget_bytes and len(self.undo_stack) > 1:
+            self.nbytes -= self.undo_stack.popleft().nbytes
+
+    def _clear_redo(self):
+        for change in self.redo_stack:
+            self.nbytes -= change.nbytes
+        self.redo_stack.clear()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def pop_undo(self):
+        """The latest Change, moved to the redo stack; None if there is nothing to undo"""
+        self.seal()
+        if not self.undo_stack:
+            return None
+        change = self.undo_stack.pop()
+        self.redo_stack.append(change)
+        return change
+
+    def pop_redo(self):
+        """The latest undone Change, moved back to the undo stack; None if there is none"""
+        if not self.redo_stack:
+            return None
+        change = self.redo_stack.pop()
+        self.undo_stack.append(change)
+        return change
+
+    def undo(self, resource_manager):
+        change = self.pop_undo()
+        if change is None:
+            return False, "Nothing to undo"
+        return revert(resource_manager, change)
+
+    def redo(self, resource_manager):
+        change = self.pop_redo()
+        if change is None:
+            return False, "Nothing to redo"
+        ok, message = reapply(resource_manager, change)
+        if not ok:
+            # Could not afford it again: leave it redoable
+            self.redo_stack.append(self.undo_stack.pop())
+        return ok, message
+
+
+def _apply_ledger(resource_manager, ledger, scale):
+    for resource, amount in ledger.items():
+        amount *= scale
+        if amount < 0:
+            resource_manager.subtractResource(resource, -amount)
+        elif amount > 0:
+            resource_manager.addResource(resource, amount)
+
+
+def _present(resource_manager, cells):
+    """The (type, (x, y)) of cells that still hold that type"""
+    wanted = dict((location, t) for t, location in cells)
+    return [(s.type, tuple(s.location)) for s in resource_manager.structureList
+            if wanted.get(tuple(s.location)) == s.type]
+
+
+def _place_back(resource_manager, cells):
+    occupied = {tuple(s.location) for s in resource_manager.structureList}
+    free = [(t, location) for t, location in cells if location not in occupied]
+    resource_manager.place_structures(STRUCTURE_TYPES[t](location) for t, location in free)
+    return free
+
+
+def revert(resource_manager, change):
+    """Undo change on a local colony
+    Returns:
+        tuple: (bool, message)
+    """
+    cells = change.placements()
+    if change.kind == PLACE:
+        present = _present(resource_manager, cells)
+        resource_manager.remove_structures([location for _, location in present])
+        if present:
+            _apply_ledger(resource_manager, change.ledger, -len(present) / len(cells))
+        return bool(present), f"Undid {len(present)} of {len(cells)} placements"
+    restored = _place_back(resource_manager, cells)
+    if restored:
+        _apply_ledger(resource_manager, change.ledger, -len(restored) / len(cells))
+    return bool(restored), f"Restored {len(restored)} of {len(cells)} structures"
+
+
+def reapply(resource_manager, change):
+    """Redo change on a local colony; a build is charged again
+    Returns:
+        tuple: (bool, message)
+    """
+    cells = change.placements()
+    if change.kind == REMOVE:
+        present = _present(resource_manager, cells)
+        resource_manager.remove_structures([location for _, location in present])
+        if present:
+            _apply_ledger(resource_manager, change.ledger, len(present) / len(cells))
+        return bool(present), f"Removed {len(present)} structures again"
+    occupied = {tuple(s.location) for s in resource_manager.structureList}
+    free = [(t, location) for t, location in cells if location not in occupied]
+    scale = len(free) / len(cells)
+    for resource, amount in change.ledger.items():
+        if amount < 0 and getattr(resource_manager, resource) < -amount * scale:
+            return False, f"Not enough {resource} to redo"
+    resource_manager.place_structures(STRUCTURE_TYPES[t](location) for t, location in free)
+    if free:
+        _apply_ledger(resource_manager, change.ledger, scale)
+    return bool(free), f"Placed {len(free)} structures again"
+
+
+def inverse_message(change):
+    """One server line that undoes change for everyone"""
+    if change.kind == PLACE:
+        return unstamp_message(change.blueprint(), change.x, change.y)
+    return stamp_message(change.blueprint(), change.x, change.y)
+
+
+def forward_message(change):
+    """One server line that redoes change for everyone"""
+    if change.kind == PLACE:
+        return stamp_message(change.blueprint(), change.x, change.y)
+    return unstamp_message(change.blueprint(), change.x, change.y)
@@ -0,0 +1,223 @@
+# weather.py
+"""
+Dust-storm weather.
+
+Dust density is a NumPy grid over the map, one weather cell per cell_size
+x cell_size map cells (wrapping at the edges), stepped as a cellular
+automaton: the wind carries dust along, neighbours diffuse into each other
+and it slowly settles out. While the dust_storm event is active a storm
+front drifts with the wind and lifts more dust where it passes:
+
+    weather = load_weather(seed=7)         # None when NumPy is not installed
+    resource_manager.set_weather(weather)  # solar panels built so far are tracked too
+
+    # once per simulation tick (journaled, see ResourceManager.advance_weather)
+    resource_manager.advance_weather(tick_seconds, storm="dust_storm" in event_manager.active_events)
+    weather.density_at(10, 4)              # 0 clear .. 1 opaque
+    weather.solar_factor()                 # colony-wide solar output multiplier
+
+    state = weather.state()                # JSON-able, kept in saves and checkpoints
+    weather = restore_weather(state)
+
+The grid steps at steps_per_second of game time, carrying the remainder
+from tick to tick, so neither the frame rate nor the wall clock changes
+the weather and a replay or lockstep peer steps it identically.
+
+A solar panel loses DUST_DIMMING of its output at full density. Panels are
+counted per weather cell as they are built, so solar_factor is one array
+product over the grid, not a loop over panels. The grid size is fixed, so a
+bigger map costs nothing extra; cell_size trades detail for reach.
+
+NumPy is imported only when a Weather is created, so the rest of the game
+starts, and runs, without it.
+"""
+
+import base64
+
+DUST_DIMMING = 0.8  # share of solar output lost under full dust
+
+
+def load_weather(seed=0, **options):
+    """A Weather, or None if NumPy is missing"""
+    try:
+        return Weather(seed, **options)
+    except ImportError:
+        return None
+
+
+def restore_weather(state):
+    """The Weather that state() described, or None if NumPy is missing"""
+    try:
+        weather = Weather(state["seed"], **state["options"])
+    except ImportError:
+        return None
+    np = weather.np
+    weather.density = np.frombuffer(base64.b64decode(state["density"]), "<f4").astype(np.float32).reshape(
+        weather.height, weather.width)
+    weather.rng.bit_generator.state = state["rng"]
+    weather.storm = state["storm"]
+    weather.steps = state["steps"]
+    weather.pending = state["pending"]
+    return weather
+
+
+class Weather:
+    def __init__(self, seed=0, cell_size=8, width=64, height=64, steps_per_second=4.0,
+                 wind=(1.2, 0.4), diffusion=0.15, settling=0.01, storm_radius=6.0, storm_strength=0.12,
+                 max_catch_up=8):
+        """
+        Args:
+            seed (int): Seeds where storms start
+            cell_size (int): Map cells per weather cell side
+            width, height (int): Weather cells; the grid wraps around
+            steps_per_second (float): Automaton steps per second of game time
+            wind (tuple): Weather cells the dust moves per second, (x, y)
+            diffusion (float): Share exchanged with the neighbours per step, at most 0.25
+            settling (float): Share that settles out per step
+            storm_radius (float): Storm front radius in weather cells
+            storm_strength (float): Density the front lifts at its centre per step
+            max_catch_up (int): Steps run back to back after a stall before skipping ahead
+        """
+        import numpy
+        self.np = numpy
+        self.seed = seed
+        self.options = dict(cell_size=cell_size, width=width, height=height, steps_per_second=steps_per_second,
+                            wind=list(wind), diffusion=diffusion, settling=settling, storm_radius=storm_radius,
+                            storm_strength=storm_strength, max_catch_up=max_catch_up)
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+        self.step_seconds = 1.0 / steps_per_second
+        self.wind = wind
+        self.diffusion = diffusion
+        self.settling = settling
+        self.storm_radius = storm_radius
+        self.storm_strength = storm_strength
+        self.max_catch_up = max_catch_up
+        self.density = numpy.zeros((height, width), numpy.float32)
+        self.panels = numpy.zeros((height, width), numpy.float32)  # solar panels per weather cell
+        self.panel_count = 0
+        self.rng = numpy.random.default_rng(seed)
+        self.storm = None  # [x, y] of the storm front in weather cells, None when calm
+        self.steps = 0
+        self.pending = 0.0  # game seconds not stepped yet
+        self._solar = None  # cached solar_factor(), dropped on every step and panel change
+
+    # --- panels ------------------------------------------------------
+
+    def _index(self, x, y):
+        return (y // self.cell_size) % self.height, (x // self.cell_size) % self.width
+
+    def add(self, structure):
+        if structure.type == "S":
+            self.panels[self._index(*structure.location)] += 1
+            self.panel_count += 1
+            self._solar = None
+
+    def remove(self, structure):
+        if structure.type == "S":
+            self.panels[self._index(*structure.location)] -= 1
+            self.panel_count -= 1
+            self._solar = None
+
+    def clear_panels(self):
+        self.panels.fill(0)
+        self.panel_count = 0
+        self._solar = None
+
+    # --- simulation --------------------------------------------------
+
+    def advance(self, seconds, storm=False):
+        """Run the steps that fit in seconds of game time (the remainder carries over)
+        Args:
+            seconds (float): Game time passed
+            storm (bool): Whether the dust_storm event is active
+        Returns:
+            int: Steps run
+        """
+        if storm and self.storm is None:
+            self.storm = [self.rng.uniform(0, self.width), self.rng.uniform(0, self.height)]
+        elif not storm:
+            self.storm = None
+        self.pending += seconds
+        steps = int(self.pending / self.step_seconds)
+        self.pending -= steps * self.step_seconds
+        if steps > self.max_catch_up:
+            steps = self.max_catch_up
+            self.pending = 0.0
+        for _ in range(steps):
+            self.step()
+        return steps
+
+    def step(self):
+        """One automaton step: advect, diffuse, settle, then lift dust under the storm"""
+        np = self.np
+        d = self.density
+        dt = self.step_seconds
+
+        # Advection: sample upwind, blending the four cells around the fractional offset
+        sx, sy = self.wind[0] * dt, self.wind[1] * dt
+        ix, iy = int(np.floor(sx)), int(np.floor(sy))
+        fx, fy = sx - ix, sy - iy
+        shifted = np.roll(d, (iy, ix), axis=(0, 1))
+        right = np.roll(shifted, 1, axis=1)
+        d = ((1 - fy) * ((1 - fx) * shifted + fx * right)
+             + fy * ((1 - fx) * np.roll(shifted, 1, axis=0) + fx * np.roll(right, 1, axis=0)))
+
+        # Diffusion over the 4-neighbourhood, then settling
+        neighbours = np.roll(d, 1, 0) + np.roll(d, -1, 0) + np.roll(d, 1, 1) + np.roll(d, -1, 1)
+        d = (d + self.diffusion * (neighbours - 4 * d)) * (1 - self.settling)
+
+        if self.storm is not None:
+            self.storm[0] = (self.storm[0] + sx) % self.width
+            self.storm[1] = (self.storm[1] + sy) % self.height
+            d += self.storm_strength * self._blob(*self.storm)
+
+        self.density = np.clip(d, 0.0, 1.0).astype(np.float32)
+        self.steps += 1
+        self._solar = None
+
+    def _blob(self, cx, cy):
+        """Gaussian around (cx, cy), wrapping at the grid edges"""
+        np = self.np
+        dx = np.abs(np.arange(self.width) + 0.5 - cx)
+        dy = np.abs(np.arange(self.height) + 0.5 - cy)
+        dx = np.minimum(dx, self.width - dx)
+        dy = np.minimum(dy, self.height - dy)
+        r2 = self.storm_radius * self.storm_radius
+        return np.exp(-(dy[:, None] ** 2) / r2) * np.exp(-(dx[None, :] ** 2) / r2)
+
+    def state(self):
+        """Everything restore_weather needs to carry on identically, as JSON-able values"""
+        return {
+            "seed": self.seed,
+            "options": self.options,
+            "density": base64.b64encode(self.density.astype("<f4").tobytes()).decode("ascii"),
+            "rng": self.rng.bit_generator.state,
+            "storm": self.storm and [float(v) for v in self.storm],
+            "steps": self.steps,
+            "pending": self.pending,
+        }
+
+    # --- reading -----------------------------------------------------
+
+    def density_at(self, x, y):
+        """Dust density over map cell (x, y)"""
+        return float(self.density[self._index(x, y)])
+
+    def solar_factor(self):
+        """Output multiplier of all solar panels together, from the dust over each"""
+        if self._solar is None:
+            if self.panel_count <= 0:
+                self._solar = 1.0
+            else:
+                dimmed = float((self.panels * self.density).sum()) / self.panel_count
+                self._solar = 1.0 - DUST_DIMMING * dimmed
+        return self._solar
+
+    def region(self, x0, y0, width, height):
+        """Density over a block of map cells, (height, width) float32, for drawing"""
+        np = self.np
+        rows = ((y0 + np.arange(height)) // self.cell_size) % self.height
+        cols = ((x0 + np.arange(width)) // self.cell_size) % self.width
+        return self.density[np.ix_(rows, cols)]
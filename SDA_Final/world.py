@@ -0,0 +1,248 @@
+# world.py
+"""
+Chunked map storage.
+
+ChunkedWorld is a drop-in replacement for the client's flat placed dict
+({(x, y): structure type}) that splits the map into fixed-size chunks. Each
+chunk holds its cells in one bytearray. Only chunks with at least one
+structure exist, so an empty map costs nothing however large it is:
+
+    world = ChunkedWorld()
+    world[(3, 4)] = "H"
+    world.pop((3, 4), None)
+    for (x, y), structure_type in world.region(0, 0, 39, 19):   # only chunks on screen
+        ...
+
+    world.drain_changes()          # None the first time; from then on the cells
+    world.drain_changes()          # set or cleared since the last call: {(x, y): type or None}
+
+Chunks nobody has read or written for a while can be evicted to disk and
+come back transparently the next time they are touched, so memory follows
+the part of the map in use, not its area:
+
+    world.advance()                # once a frame: the idle clock
+    world.evict_idle(600)          # chunks untouched for 600 frames go to disk
+
+Evicted chunks are written to a private temporary directory (or store)
+that is removed with the world. Their structure counts stay in memory, so
+len() never loads them; items() reads every one back, so prefer region()
+or drain_changes() on hot paths.
+
+Chunk file layout: '<iiH' header (chunk x, chunk y, chunk size), then the
+zlib-compressed cells, one byte per cell (0 empty, else the type's ASCII
+code).
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import weakref
+import zlib
+from collections.abc import MutableMapping
+
+CHUNK_SIZE = 32
+CHUNK_HEADER = struct.Struct("<iiH")
+EMPTY = 0
+
+
+class Chunk:
+    __slots__ = ('cx', 'cy', 'cells', 'count', 'last_used', 'dirty')
+
+    def __init__(self, cx, cy, size, cells=None):
+        self.cx = cx
+        self.cy = cy
+        self.cells = cells if cells is not None else bytearray(size * size)
+        self.count = len(cells) - cells.count(EMPTY) if cells is not None else 0
+        self.last_used = 0
+        self.dirty = True  # differs from its file on disk, if any
+
+    def get(self, i):
+        code = self.cells[i]
+        return chr(code) if code else None
+
+    def set(self, i, structure_type):
+        """Put structure_type (or None to clear) in cell i; returns the previous type"""
+        previous = self.get(i)
+        if previous == structure_type:
+            return previous
+        self.count += (structure_type is not None) - (previous is not None)
+        self.cells[i] = ord(structure_type) if structure_type is not None else EMPTY
+        self.dirty = True
+        return previous
+
+
+class ChunkedWorld(MutableMapping):
+    def __init__(self, cells=(), chunk_size=CHUNK_SIZE, store=None):
+        """
+        Args:
+            cells: Optional mapping or (x, y), type pairs to start with, like dict()
+            chunk_size (int): Cells per chunk side
+            store (str): Directory for evicted chunks; a temporary one by default
+        """
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (cx, cy) -> Chunk, resident only
+        self.evicted = {}  # (cx, cy) -> structures in it
+        self.store = store
+        self.clock = 0
+        self.count = 0
+        self.changes = None  # (x, y) -> type or None since drain_changes, once it has been called
+        self._cleanup = None
+        self.update(cells)
+
+    # --- chunk bookkeeping -------------------------------------------
+
+    def _locate(self, key):
+        x, y = key
+        size = self.chunk_size
+        return (x // size, y // size), (y % size) * size + (x % size)
+
+    def _chunk(self, coords, create=False):
+        chunk = self.chunks.get(coords)
+        if chunk is None:
+            if coords in self.evicted:
+                chunk = self._load(coords)
+            elif create:
+                chunk = self.chunks[coords] = Chunk(coords[0], coords[1], self.chunk_size)
+            else:
+                return None
+        chunk.last_used = self.clock
+        return chunk
+
+    def _path(self, coords):
+        return os.path.join(self.store, "chunk_%d_%d.bin" % coords)
+
+    def _read(self, coords):
+        with open(self._path(coords), "rb") as f:
+            data = f.read()
+        cx, cy, size = CHUNK_HEADER.unpack_from(data)
+        if (cx, cy) != coords or size != self.chunk_size:
+            raise ValueError(f"Chunk file for {coords} holds chunk {(cx, cy)} of size {size}")
+        return Chunk(cx, cy, size, bytearray(zlib.decompress(data[CHUNK_HEADER.size:])))
+
+    def _load(self, coords):
+        chunk = self._read(coords)
+        chunk.dirty = False  # the file still matches until it is written to
+        del self.evicted[coords]
+        self.chunks[coords] = chunk
+        return chunk
+
+    def _ensure_store(self):
+        if self.store is None:
+            self.store = tempfile.mkdtemp(prefix="world-")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.store, True)
+        else:
+            os.makedirs(self.store, exist_ok=True)
+
+    def advance(self, ticks=1):
+        """Move the idle clock on; call once per frame or tick"""
+        self.clock += ticks
+
+    def evict_idle(self, idle):
+        """Write chunks untouched for more than idle clock steps to disk and
+        drop them from memory
+        Returns:
+            int: Chunks evicted
+        """
+        stale = [coords for coords, chunk in self.chunks.items() if self.clock - chunk.last_used > idle]
+        if stale:
+            self._ensure_store()
+        for coords in stale:
+            chunk = self.chunks.pop(coords)
+            if chunk.dirty or not os.path.exists(self._path(coords)):
+                with open(self._path(coords), "wb") as f:
+                    f.write(CHUNK_HEADER.pack(chunk.cx, chunk.cy, self.chunk_size) + zlib.compress(bytes(chunk.cells)))
+            self.evicted[coords] = chunk.count
+        return len(stale)
+
+    def close(self):
+        """Delete the temporary chunk store, if one was created"""
+        if self._cleanup is not None:
+            self._cleanup()
+
+    # --- mapping interface -------------------------------------------
+
+    def __getitem__(self, key):
+        coords, i = self._locate(key)
+        chunk = self._chunk(coords)
+        structure_type = chunk.get(i) if chunk is not None else None
+        if structure_type is None:
+            raise KeyError(key)
+        return structure_type
+
+    def __setitem__(self, key, structure_type):
+        if len(structure_type) != 1 or not 0 < ord(structure_type) < 128:
+            raise ValueError(f"Structure type must be one ASCII character, not {structure_type!r}")
+        coords, i = self._locate(key)
+        if self._chunk(coords, create=True).set(i, structure_type) is None:
+            self.count += 1
+        if self.changes is not None:
+            self.changes[tuple(key)] = structure_type
+
+    def __delitem__(self, key):
+        coords, i = self._locate(key)
+        chunk = self._chunk(coords)
+        if chunk is None or chunk.set(i, None) is None:
+            raise KeyError(key)
+        self.count -= 1
+        if self.changes is not None:
+            self.changes[tuple(key)] = None
+        if not chunk.count:
+            # Empty chunks cost nothing, on disk included
+            del self.chunks[coords]
+            if self.store is not None and os.path.exists(self._path(coords)):
+                os.remove(self._path(coords))
+
+    def __contains__(self, key):
+        coords, i = self._locate(key)
+        chunk = self._chunk(coords)
+        return chunk is not None and chunk.cells[i] != EMPTY
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for (x, y), _ in self.items():
+            yield x, y
+
+    def items(self):
+        """Every (x, y), type; evicted chunks are read but stay on disk"""
+        for coords in list(self.chunks):
+            yield from self._cells(self.chunks[coords])
+        for coords in list(self.evicted):
+            yield from self._cells(self._read(coords))
+
+    def _cells(self, chunk, x0=None, y0=None, x1=None, y1=None):
+        size = self.chunk_size
+        left, top = chunk.cx * size, chunk.cy * size
+        cells = chunk.cells
+        for i in range(len(cells)):
+            code = cells[i]
+            if code:
+                x, y = left + i % size, top + i // size
+                if x0 is None or (x0 <= x <= x1 and y0 <= y <= y1):
+                    yield (x, y), chr(code)
+
+    # --- regions and changes -----------------------------------------
+
+    def region(self, x0, y0, x1, y1):
+        """(x, y), type for every structure in the rectangle, visiting only
+        the chunks it overlaps (and loading any evicted ones)
+        """
+        size = self.chunk_size
+        for cy in range(min(y0, y1) // size, max(y0, y1) // size + 1):
+            for cx in range(min(x0, x1) // size, max(x0, x1) // size + 1):
+                chunk = self._chunk((cx, cy))
+                if chunk is not None:
+                    yield from self._cells(chunk, min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+    def drain_changes(self):
+        """Cells set or cleared since the last call, {(x, y): type or None};
+        None on the first call, which starts the tracking
+        """
+        changes, self.changes = self.changes, {}
+        return changes
+
+    def memory_bytes(self):
+        """Cell storage held in memory"""
+        return len(self.chunks) * self.chunk_size * self.chunk_size
@@ -0,0 +1,71 @@
+# _common.py
+"""Shared helpers for the benchmark scripts."""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, "SDA_Final")
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+
+def time_call(fn, repeat=20, warmup=2):
+    """Time fn() repeatedly
+    Returns:
+        dict: min/median/mean/max in milliseconds and the repeat count
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(max(samples), 4),
+    }
+
+
+def build_colony(count):
+    """A headless ResourceManager with count structures, round-robin over every type"""
+    from resource_manager import ResourceManager
+    from structure import STRUCTURE_TYPES
+
+    classes = [STRUCTURE_TYPES[key] for key in sorted(STRUCTURE_TYPES)]
+    rm = ResourceManager()
+    rm.add_structures(classes[i % len(classes)]((i % 1024, i // 1024)) for i in range(count))
+    return rm
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def emit(results, output=None):
+    """Print results as JSON, and write them to output if given"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
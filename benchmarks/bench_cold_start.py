@@ -0,0 +1,72 @@
+# bench_cold_start.py
+"""
+Cold-start cost of a headless process.
+
+Each sample is a fresh interpreter that imports the core simulation modules
+(structure, resource_manager, event_manager, trading, random_event) and
+checks pygame was never loaded. If pygame is installed the same is measured
+for `import client`, which brings up the whole UI stack, for comparison.
+Run from the repository root:
+
+    python benchmarks/bench_cold_start.py --repeat 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _common import SOURCES, emit
+
+CORE_MODULES = ("structure", "resource_manager", "event_manager", "trading", "random_event")
+
+HEADLESS = (
+    "import sys\n"
+    + "".join(f"import {name}\n" for name in CORE_MODULES)
+    + "assert 'pygame' not in sys.modules, 'pygame imported by a core module'\n"
+)
+CLIENT = "import client\n"
+ENV = {**os.environ, "PYGAME_HIDE_SUPPORT_PROMPT": "1", "SDL_VIDEODRIVER": "dummy"}
+
+
+def _time_import(code, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=SOURCES, check=True,
+                       capture_output=True, env=ENV)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(samples), 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def run(repeat=10):
+    results = [
+        {"benchmark": "cold_start.interpreter", **_time_import("pass\n", repeat)},
+        {"benchmark": "cold_start.headless_core", **_time_import(HEADLESS, repeat)},
+    ]
+    try:
+        import pygame  # noqa: F401  (only checking it is installed)
+    except ImportError:
+        results.append({"benchmark": "cold_start.client", "skipped": "missing dependency: pygame"})
+    else:
+        results.append({"benchmark": "cold_start.client", **_time_import(CLIENT, repeat)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
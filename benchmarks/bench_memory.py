@@ -0,0 +1,53 @@
+# bench_memory.py
+"""
+Peak memory of a headless colony.
+
+Builds N structures (round-robin over every structure type) into a
+ResourceManager with no display and reports the tracemalloc peak, plus the
+bytes each structure costs. Run from the repository root:
+
+    python benchmarks/bench_memory.py --count 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from _common import emit
+
+from resource_manager import ResourceManager
+from structure import STRUCTURE_TYPES
+
+
+def bench_memory(count):
+    classes = [STRUCTURE_TYPES[key] for key in sorted(STRUCTURE_TYPES)]
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    rm = ResourceManager()
+    for i in range(count):
+        rm.add_structure(classes[i % len(classes)]((i % 1024, i // 1024)))
+
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "benchmark": "colony_memory",
+        "structures": count,
+        "peak_bytes": peak,
+        "current_bytes": current,
+        "bytes_per_structure": round(current / max(1, count), 1),
+        "build_seconds": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(bench_memory(args.count), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench_network.py
+"""
+NetworkClient receive path against a local loopback server.
+
+A throwaway server thread accepts one connection, reads the username line
+and then streams N protocol lines ("/place", "/remove" and chat) as fast as
+the socket allows. The benchmark measures how long NetworkClient takes to
+split, decode and queue all of them. Run from the repository root:
+
+    python benchmarks/bench_network.py --messages 200000
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+from _common import emit
+
+
+def _serve(listener, payload, ready):
+    ready.set()
+    conn, _ = listener.accept()
+    with conn:
+        conn.settimeout(5.0)
+        buf = b""
+        while b"\n" not in buf:  # username line
+            chunk = conn.recv(1024)
+            if not chunk:
+                return
+            buf += chunk
+        conn.sendall(payload)
+        # Keep the socket open until the client hangs up
+        try:
+            while conn.recv(1024):
+                pass
+        except OSError:
+            pass
+
+
+def make_payload(count):
+    lines = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            lines.append(f"/place H {i % 30} {i % 11}")
+        elif kind == 1:
+            lines.append(f"/remove {i % 30} {i % 11}")
+        else:
+            lines.append(f"Player{i % 8}: hello {i}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def bench_network(count=200_000, poll_interval=0.001, timeout=60.0):
+    from network import NetworkClient
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    payload = make_payload(count)
+    ready = threading.Event()
+    server = threading.Thread(target=_serve, args=(listener, payload, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    client = NetworkClient()
+    ok, err = client.connect("127.0.0.1", port, username="bench")
+    if not ok:
+        raise RuntimeError(f"Loopback connect failed: {err}")
+
+    received = 0
+    polls = 0
+    start = time.perf_counter()
+    deadline = start + timeout
+    while received < count and time.perf_counter() < deadline:
+        received += len(client.get_messages())
+        polls += 1
+        time.sleep(poll_interval)
+    elapsed = time.perf_counter() - start
+    client.disconnect()
+    listener.close()
+
+    return {
+        "benchmark": "NetworkClient.receive",
+        "messages": count,
+        "received": received,
+        "bytes": len(payload),
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(received / elapsed),
+        "polls": polls,
+    }
+
+
+def run(count=200_000):
+    return [bench_network(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.messages), args.output)
+
+
+if __name__ == "__main__":
+    main()
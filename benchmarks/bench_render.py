@@ -0,0 +1,66 @@
+# bench_render.py
+"""
+Frame-time of the client's draw calls under SDL's dummy video driver.
+
+Times GameManager.draw_background, draw_game_elements and draw_resources
+with a full grid of placed buildings. Needs pygame; no window is opened.
+Run from the repository root:
+
+    python benchmarks/bench_render.py --repeat 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from _common import SOURCES, emit, time_call
+
+
+def bench_render(repeat=50):
+    # load_assets resolves image paths against the working directory
+    cwd = os.getcwd()
+    os.chdir(SOURCES)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            from client import GameManager
+            from world import ChunkedWorld
+            game = GameManager()
+            # Images load in the background; time the frames with them in place
+            game.assets.wait()
+    finally:
+        os.chdir(cwd)
+
+    game.in_game = True
+    game.draw_game_elements()  # sets grid_origin / cell_size
+    gx0, gy0 = game.grid_origin
+    grid_w = (game.game_engine.W - gx0 - 8) // game.cell_size
+    grid_h = (game.game_engine.H - gy0 - 8) // game.cell_size
+    kinds = "DSHMWF"
+    game.placed = ChunkedWorld(((x, y), kinds[(x + y) % len(kinds)]) for x in range(grid_w) for y in range(grid_h))
+
+    results = []
+    for name in ("draw_background", "draw_game_elements", "draw_resources"):
+        results.append({"call": name, **time_call(getattr(game, name), repeat=repeat)})
+    game.assets.shutdown()
+    game.game_engine.cleanup()
+    return {"benchmark": "render", "placed": len(game.placed), "results": results}
+
+
+def run(repeat=50):
+    return [bench_render(repeat)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
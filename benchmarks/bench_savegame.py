@@ -0,0 +1,71 @@
+# bench_savegame.py
+"""
+Save/load round trip for a headless colony.
+
+Builds N structures, saves them, loads them back and checks the loaded
+colony matches (types, coordinates, ledger). Reports file size and save and
+load times. Run from the repository root:
+
+    python benchmarks/bench_savegame.py --count 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from _common import build_colony, emit
+
+from event_manager import EventManager
+from savegame import RESOURCE_FIELDS, load_colony, save_colony
+
+
+def bench_savegame(count):
+    rm = build_colony(count)
+    rm.setResource("water", 123.5)
+    rm.stepResources()
+    events = EventManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        events.activate_event("dust_storm")
+
+    fd, path = tempfile.mkstemp(suffix=".sav")
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        size = save_colony(path, rm, events)
+        save_seconds = time.perf_counter() - start
+
+        loaded_events = EventManager()
+        start = time.perf_counter()
+        loaded = load_colony(path, loaded_events)
+        load_seconds = time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+    assert len(loaded.structureList) == len(rm.structureList)
+    key = lambda s: (s.type, tuple(s.location))
+    assert sorted(map(key, loaded.structureList)) == sorted(map(key, rm.structureList))
+    assert all(getattr(loaded, name) == getattr(rm, name) for name in RESOURCE_FIELDS)
+    assert loaded_events.active_events == ["dust_storm"]
+
+    return {
+        "benchmark": "savegame_round_trip",
+        "structures": count,
+        "file_bytes": size,
+        "save_seconds": round(save_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(bench_savegame(args.count), args.output)
+
+
+if __name__ == "__main__":
+    main()
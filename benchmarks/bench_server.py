@@ -0,0 +1,144 @@
+# bench_server.py
+"""
+Sharded server scaling on this machine.
+
+Starts server.ShardedServer in rooms mode with 1, 2, 4, ... shards (up to
+the core count) on a loopback port, fills every room with structures from
+one /area line each, then measures two things per shard count:
+
+    room ticks per second   every shard steps its rooms flat out (tps 0),
+                            counted from each room's /status before and after
+    command round trips/s   clients send /place lines and wait for the echoes
+
+Room ticks should scale with shards up to the number of cores; commands all
+pass through the one front-end, so they measure its routing cost. Run from
+the repository root:
+
+    python benchmarks/bench_server.py --rooms 32 --seconds 2
+"""
+
+import argparse
+import os
+import re
+import socket
+import threading
+import time
+
+from _common import emit
+
+TICK = re.compile(r"\[server\] room (\S+) shard \d+ tick (\d+)")
+
+
+class _Line:
+    """Blocking line reader over a raw socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+
+    def read(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self.buf:
+            self.sock.settimeout(max(0.01, deadline - time.monotonic()))
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.buf += data
+        line, self.buf = self.buf.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def until(self, predicate, timeout=10.0):
+        while True:
+            line = self.read(timeout)
+            if predicate(line):
+                return line
+
+
+def _connect(port, name, room):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(f"{name}\n/join {room}\n".encode("utf-8"))
+    return sock, _Line(sock)
+
+
+def _room_ticks(clients):
+    total = 0
+    for sock, reader in clients:
+        sock.sendall(b"/status\n")
+        total += int(TICK.match(reader.until(lambda line: line.startswith("[server] room"))).group(2))
+    return total
+
+
+def bench_shards(shards, rooms=32, side=50, seconds=2.0, commands=2000):
+    from server import ShardedServer
+
+    server = ShardedServer("127.0.0.1", 0, shards=shards, tick_rate=0)
+    server.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        clients = [_connect(server.port, f"bench{i}", f"room{i}") for i in range(rooms)]
+        for sock, reader in clients:
+            sock.sendall(f"/area H 0 0 {side - 1} {side - 1}\n".encode("utf-8"))
+            reader.until(lambda line: line.startswith("/area"))
+
+        start_ticks = _room_ticks(clients)
+        start = time.perf_counter()
+        time.sleep(seconds)
+        ticks = _room_ticks(clients) - start_ticks
+        tick_seconds = time.perf_counter() - start
+
+        # Round trips: every client places its share, then waits for all its echoes
+        per_client = max(1, commands // rooms)
+        start = time.perf_counter()
+        for sock, _ in clients:
+            sock.sendall("".join(f"/place S {side + i} 0\n" for i in range(per_client)).encode("utf-8"))
+        for sock, reader in clients:
+            for _ in range(per_client):
+                reader.until(lambda line: line.startswith("/place"))
+        command_seconds = time.perf_counter() - start
+        for sock, _ in clients:
+            sock.close()
+    finally:
+        server.stop()
+        thread.join()
+
+    return {
+        "benchmark": "ShardedServer",
+        "shards": shards,
+        "rooms": rooms,
+        "structures_per_room": side * side,
+        "room_ticks_per_second": round(ticks / tick_seconds),
+        "commands": per_client * rooms,
+        "commands_per_second": round(per_client * rooms / command_seconds),
+    }
+
+
+def run(rooms=32, seconds=2.0, max_shards=None):
+    cores = os.cpu_count() or 1
+    max_shards = max_shards or max(cores, 2)
+    counts = []
+    shards = 1
+    while shards <= max_shards:
+        counts.append(shards)
+        shards *= 2
+    results = [bench_shards(count, rooms, seconds=seconds) for count in counts]
+    base = results[0]["room_ticks_per_second"] or 1
+    for result in results:
+        result["cores"] = cores
+        result["speedup"] = round(result["room_ticks_per_second"] / base, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--max-shards", type=int, help="Default: the core count (at least 2)")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.rooms, args.seconds, args.max_shards), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_simulation.py
+"""
+Simulation hot paths: ResourceManager.stepResources at several colony sizes
+and EventManager.update throughput. Run from the repository root:
+
+    python benchmarks/bench_simulation.py --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from _common import build_colony, emit, time_call
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def bench_step_resources(sizes=DEFAULT_SIZES, repeat=20):
+    results = []
+    for size in sizes:
+        rm = build_colony(size)
+        rm.setResource("materials", 10**9)
+        stats = time_call(rm.stepResources, repeat=repeat)
+        results.append({"structures": size, **stats})
+    return {"benchmark": "stepResources", "results": results}
+
+
+def bench_event_manager(seconds=1.0):
+    from event_manager import EventManager
+
+    random.seed(0)
+    manager = EventManager()
+    calls = 0
+    # Event (de)activation prints; keep it out of the JSON output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            for _ in range(1000):
+                manager.update()
+            calls += 1000
+        elapsed = time.perf_counter() - start
+    return {
+        "benchmark": "EventManager.update",
+        "calls": calls,
+        "calls_per_second": round(calls / elapsed),
+        "us_per_call": round(elapsed / calls * 1e6, 3),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeat=20):
+    return [bench_step_resources(sizes, repeat), bench_event_manager()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.sizes, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# run_all.py
+"""
+Run every benchmark and write one JSON document, for comparing commits:
+
+    python benchmarks/run_all.py --output bench_output.json
+    python benchmarks/run_all.py --quick     # smaller sizes, for a smoke test
+
+A benchmark whose dependencies are missing (pygame for rendering) is
+recorded as skipped rather than failing the whole run.
+"""
+
+import argparse
+import traceback
+
+from _common import emit, environment
+
+import bench_cold_start
+import bench_memory
+import bench_network
+import bench_render
+import bench_savegame
+import bench_server
+import bench_simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Use small sizes")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        suites = [
+            ("simulation", lambda: bench_simulation.run(sizes=(1_000, 10_000), repeat=5)),
+            ("network", lambda: bench_network.run(count=20_000)),
+            ("render", lambda: bench_render.run(repeat=5)),
+            ("memory", lambda: [bench_memory.bench_memory(10_000)]),
+            ("savegame", lambda: [bench_savegame.bench_savegame(10_000)]),
+            ("cold_start", lambda: bench_cold_start.run(repeat=3)),
+            ("server", lambda: bench_server.run(rooms=8, seconds=0.5, max_shards=2)),
+        ]
+    else:
+        suites = [
+            ("simulation", bench_simulation.run),
+            ("network", bench_network.run),
+            ("render", bench_render.run),
+            ("memory", lambda: [bench_memory.bench_memory(1_000_000)]),
+            ("savegame", lambda: [bench_savegame.bench_savegame(1_000_000)]),
+            ("cold_start", bench_cold_start.run),
+            ("server", bench_server.run),
+        ]
+
+    results = {"environment": environment(), "suites": {}}
+    for name, suite in suites:
+        try:
+            results["suites"][name] = suite()
+        except ImportError as e:
+            results["suites"][name] = {"skipped": f"missing dependency: {e.name or e}"}
+        except Exception:
+            results["suites"][name] = {"error": traceback.format_exc(limit=3)}
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()